@@ -0,0 +1,419 @@
+"""Asyncio HTTP/JSON API over the EMS service layer.
+
+    python -m api              # listens on DEMS_API_HOST:DEMS_API_PORT
+
+Every request (except /health) uses HTTP Basic auth against the users
+collection. Admins can reach everything; employees only their own employee
+record, leaves and salaries, plus the department list. All clients share one
+AsyncDatabaseService, so hundreds of users use a few pooled connections per
+fragment, and read-mostly responses come from short-lived server-side caches.
+
+Routes:
+    GET    /health
+    GET    /employees?department=&limit=&offset=     admin
+    GET    /employees/{emp_id}                       admin or self
+    POST   /employees                                admin
+    PATCH  /employees/{emp_id}                       admin
+    DELETE /employees/{emp_id}                       admin
+    GET    /departments                              any user
+    GET    /departments/{name}/members               admin
+    GET    /leaves?status=&emp_id=                   admin (employees: their own)
+    POST   /leaves                                   admin or self
+    POST   /leaves/{leave_id}/approve                admin
+    POST   /leaves/{leave_id}/reject                 admin
+    GET    /salaries?emp_id=                         admin (employees: their own)
+    GET    /stats                                    admin
+
+List responses carry an "unavailable" list of fragments that did not answer
+(empty when the result is complete); such partial results are never cached.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, date
+from urllib.parse import urlsplit, parse_qs, unquote
+from bson import ObjectId
+from config.api_config import ApiConfig
+from database.async_services import AsyncDatabaseService
+from database.instrumentation import get_query_monitor
+
+# Employee fields a PATCH may change
+EMPLOYEE_UPDATE_FIELDS = ("name", "email", "phone", "department", "position", "salary", "date_of_birth", "status")
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def unavailable_fragments(value):
+    """Fragments a service result is missing (a PartialResult's, or a stats dict's "unavailable")"""
+    if isinstance(value, dict):
+        return list(value.get("unavailable") or [])
+    return list(getattr(value, "unavailable", None) or [])
+
+
+class TTLCache:
+    """Per-process response cache; concurrent misses on one key share a single load.
+
+    Partial results (some fragment did not answer) are handed to the waiting
+    requests but not stored, so the next request tries every fragment again.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._loading = {}
+
+    async def get_or_load(self, key, loader):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        if key in self._loading:
+            return await asyncio.shield(self._loading[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+            if not unavailable_fragments(value):
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't leave "exception never retrieved" behind
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+class Request:
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.user = None
+
+    def param(self, name, cast=str, default=None):
+        values = self.query.get(name)
+        if not values or values[0] == "":
+            return default
+        try:
+            return cast(values[0])
+        except ValueError:
+            raise HttpError(400, f"Invalid value for {name}: {values[0]}")
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Request body must be a JSON object")
+        return data
+
+
+class ApiServer:
+    def __init__(self, service=None, cache_ttl=None, auth_cache_ttl=None):
+        self.service = service or AsyncDatabaseService(max_pool_size=ApiConfig.POOL_SIZE)
+        self.cache = TTLCache(ApiConfig.CACHE_TTL if cache_ttl is None else cache_ttl)
+        self.auth_cache_ttl = ApiConfig.AUTH_CACHE_TTL if auth_cache_ttl is None else auth_cache_ttl
+        self._credentials = {}
+        self.monitor = get_query_monitor()
+        self.routes = [
+            ("GET", r"/health", self.health, None),
+            ("GET", r"/employees", self.list_employees, "admin"),
+            ("GET", r"/employees/(?P<emp_id>\d+)", self.get_employee, "self"),
+            ("POST", r"/employees", self.create_employee, "admin"),
+            ("PATCH", r"/employees/(?P<emp_id>\d+)", self.update_employee, "admin"),
+            ("DELETE", r"/employees/(?P<emp_id>\d+)", self.delete_employee, "admin"),
+            ("GET", r"/departments", self.list_departments, "any"),
+            ("GET", r"/departments/(?P<name>[^/]+)/members", self.department_members, "admin"),
+            ("GET", r"/leaves", self.list_leaves, "any"),
+            ("POST", r"/leaves", self.apply_leave, "any"),
+            ("POST", r"/leaves/(?P<leave_id>[0-9a-f]{24})/(?P<decision>approve|reject)", self.decide_leave, "admin"),
+            ("GET", r"/salaries", self.list_salaries, "any"),
+            ("GET", r"/stats", self.stats, "admin"),
+        ]
+        self.routes = [(method, re.compile(pattern + r"/?$"), handler, role)
+                       for method, pattern, handler, role in self.routes]
+
+    # Authentication and authorization
+    async def authenticate(self, request):
+        header = request.headers.get("authorization", "")
+        if not header.lower().startswith("basic "):
+            raise HttpError(401, "Authentication required")
+        try:
+            username, _, password = base64.b64decode(header[6:]).decode("utf-8").partition(":")
+        except ValueError:
+            raise HttpError(401, "Malformed Authorization header")
+
+        try:
+            user = await self.service.get_user(username)
+        except Exception as e:
+            print(f"Authentication error: {e}")
+            user = None
+        if not user:
+            raise HttpError(401, "Invalid username or password")
+
+        # bcrypt is deliberately slow; remember verified credentials for a while. The stored hash is
+        # part of the key, so a changed password or a removed account stops working on the next request
+        key = hashlib.sha256(f"{username}\0{password}\0{user['password']}".encode("utf-8")).hexdigest()
+        expires = self._credentials.get(key)
+        if not expires or expires <= time.monotonic():
+            if not await self.service.check_password(user, password):
+                raise HttpError(401, "Invalid username or password")
+            self._credentials[key] = time.monotonic() + self.auth_cache_ttl
+        return {"username": user["username"], "role": user.get("role"), "emp_id": user.get("emp_id")}
+
+    @staticmethod
+    def is_admin(user):
+        return user["role"] == "admin"
+
+    def own_emp_id(self, request, requested=None):
+        """The emp_id a request may act on: any for admins, only their own for employees"""
+        user = request.user
+        if requested is not None:
+            try:
+                requested = int(requested)
+            except (TypeError, ValueError):
+                raise HttpError(400, "emp_id must be an integer")
+        if self.is_admin(user):
+            return requested
+        if user.get("emp_id") is None:
+            raise HttpError(403, "This account is not linked to an employee")
+        if requested is not None and requested != int(user["emp_id"]):
+            raise HttpError(403, "Employees can only access their own records")
+        return int(user["emp_id"])
+
+    # Handlers
+    async def health(self, request):
+        return 200, {"status": "ok"}
+
+    async def _employees(self):
+        return await self.cache.get_or_load("employees", self.service.get_all_employees)
+
+    async def list_employees(self, request):
+        employees = await self._employees()
+        unavailable = unavailable_fragments(employees)
+        department = request.param("department")
+        if department:
+            employees = [e for e in employees if e.get("department") == department]
+        offset = request.param("offset", int, 0)
+        limit = request.param("limit", int, 100)
+        return 200, {"total": len(employees), "offset": offset, "employees": employees[offset:offset + limit],
+                     "unavailable": unavailable}
+
+    async def get_employee(self, request, emp_id):
+        self.own_emp_id(request, emp_id)
+        employee = await self.service.get_employee(int(emp_id))
+        if not employee:
+            raise HttpError(404, f"Employee {emp_id} not found")
+        return 200, employee
+
+    async def create_employee(self, request):
+        data = request.json()
+        try:
+            success, message = await self.service.create_employee(
+                int(data["emp_id"]), data["name"], data.get("email"), data.get("phone"), data.get("date_of_birth"),
+                data.get("department"), data.get("position"), float(data.get("salary") or 0)
+            )
+        except (KeyError, ValueError) as e:
+            raise HttpError(400, f"Invalid employee: {e}")
+        if not success:
+            raise HttpError(409, message)
+        self.cache.invalidate("employees", "stats")
+        return 201, {"message": message}
+
+    async def update_employee(self, request, emp_id):
+        data = request.json()
+        update = {field: data[field] for field in EMPLOYEE_UPDATE_FIELDS if field in data}
+        if not update:
+            raise HttpError(400, f"Nothing to update; allowed fields: {', '.join(EMPLOYEE_UPDATE_FIELDS)}")
+        if not await self.service.update_employee(int(emp_id), update):
+            raise HttpError(404, f"Employee {emp_id} not found or unchanged")
+        self.cache.invalidate("employees")
+        return 200, {"message": "Employee updated"}
+
+    async def delete_employee(self, request, emp_id):
+        if not await self.service.delete_employee(int(emp_id)):
+            raise HttpError(404, f"Employee {emp_id} not found")
+        self.cache.invalidate("employees", "stats")
+        return 200, {"message": "Employee deleted"}
+
+    async def list_departments(self, request):
+        return 200, await self.cache.get_or_load("departments", self.service.get_all_departments)
+
+    async def department_members(self, request, name):
+        return 200, {"department": name, "members": await self.service.get_department_member_count(name)}
+
+    async def list_leaves(self, request):
+        emp_id = self.own_emp_id(request, request.param("emp_id", int))
+        if emp_id is not None:
+            leaves = await self.service.get_employee_leaves(emp_id)
+        else:
+            leaves = await self.cache.get_or_load("leaves", self.service.get_all_leaves)
+        unavailable = unavailable_fragments(leaves)
+        status = request.param("status")
+        if status:
+            leaves = [leave for leave in leaves if leave.get("status") == status]
+        return 200, {"items": leaves, "unavailable": unavailable}
+
+    async def apply_leave(self, request):
+        data = request.json()
+        emp_id = self.own_emp_id(request, data.get("emp_id"))
+        if emp_id is None:
+            raise HttpError(400, "emp_id is required")
+        try:
+            start_date, end_date = data["start_date"], data["end_date"]
+            datetime.strptime(start_date, "%Y-%m-%d")
+            datetime.strptime(end_date, "%Y-%m-%d")
+        except (KeyError, TypeError, ValueError):
+            raise HttpError(400, "start_date and end_date are required as YYYY-MM-DD")
+        if not await self.service.apply_leave(int(emp_id), start_date, end_date,
+                                              data.get("leave_type", "Vacation"), data.get("reason", "")):
+            raise HttpError(409, "Leave could not be applied (invalid dates or overlaps an existing leave)")
+        self.cache.invalidate("leaves", "stats")
+        return 201, {"message": "Leave applied"}
+
+    async def decide_leave(self, request, leave_id, decision):
+        action = self.service.approve_leave if decision == "approve" else self.service.reject_leave
+        if not await action(ObjectId(leave_id), request.user["username"]):
+            raise HttpError(404, f"Leave {leave_id} not found")
+        self.cache.invalidate("leaves", "stats")
+        return 200, {"message": f"Leave {decision}d"}
+
+    async def list_salaries(self, request):
+        emp_id = self.own_emp_id(request, request.param("emp_id", int))
+        if emp_id is not None:
+            salaries = await self.service.get_employee_salaries(emp_id)
+        else:
+            salaries = await self.cache.get_or_load("salaries", self.service.get_all_salary_records)
+        return 200, {"items": salaries, "unavailable": unavailable_fragments(salaries)}
+
+    async def stats(self, request):
+        return 200, await self.cache.get_or_load("stats", self.service.get_dashboard_stats)
+
+    # Dispatch
+    async def dispatch(self, request):
+        allowed = []
+        for method, pattern, handler, role in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            if role is not None:
+                request.user = await self.authenticate(request)
+                if role == "admin" and not self.is_admin(request.user):
+                    raise HttpError(403, "Admin role required")
+            params = {key: unquote(value) for key, value in match.groupdict().items()}
+            # Each connection runs in its own task, so actions of concurrent requests don't mix
+            with self.monitor.action(f"api {handler.__name__}"):
+                return await handler(request, **params)
+        if allowed:
+            raise HttpError(405, f"Method not allowed; use {', '.join(allowed)}")
+        raise HttpError(404, f"No route for {request.path}")
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, _, value = line.partition(":")
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Malformed Content-Length header"}, keep_alive=False)
+                    break
+                if length > ApiConfig.MAX_BODY:
+                    await self.respond(writer, 413, {"error": "Request body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                url = urlsplit(target)
+                request = Request(method.upper(), url.path, parse_qs(url.query), headers, body)
+                try:
+                    status, payload = await self.dispatch(request)
+                except HttpError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    print(f"❌ API error on {method} {target}: {e}")
+                    status, payload = 500, {"error": "Internal server error"}
+                await self.respond(writer, status, payload, keep_alive,
+                                   extra_headers={"WWW-Authenticate": 'Basic realm="DEMS"'} if status == 401 else None)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def respond(writer, status, payload, keep_alive=True, extra_headers=None):
+        body = json.dumps(payload, default=_json_default).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **(extra_headers or {}),
+        }
+        head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n" + \
+            "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host=None, port=None):
+        server = await asyncio.start_server(self.handle_connection, host or ApiConfig.HOST, port or ApiConfig.PORT)
+        address = server.sockets[0].getsockname()
+        print(f"🌐 DEMS API listening on http://{address[0]}:{address[1]}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    try:
+        asyncio.run(ApiServer().serve())
+    except KeyboardInterrupt:
+        print("\n👋 API server stopped")
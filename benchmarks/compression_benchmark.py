@@ -0,0 +1,202 @@
+"""Bytes and latency saved by wire compression on the list reads.
+
+Against a local mongod (--backend mongodb) every list endpoint is run once per
+compressor with its own MongoClient; the bytes the server sent are taken from
+serverStatus network.bytesOut, so they are what actually crossed the wire.
+Without a server (--backend memory, the default) the same replies are encoded
+to BSON and compressed in-process with each codec, which estimates the wire
+bytes and measures the CPU the compression costs.
+
+Loopback has no bandwidth limit, so the time saved on an office link is
+modelled on top of the measured latency: transfer time = bytes / --link-mbps.
+Like the other benchmarks the generated data is reset and refilled first.
+
+    python -m benchmarks.compression_benchmark --employees 3000 --years 3
+    python -m benchmarks.compression_benchmark --backend mongodb --link-mbps 5 --json compression.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import zlib
+from datetime import datetime
+
+# Backend selection has to happen before DatabaseConfig is imported
+if "--backend" in sys.argv:
+    os.environ["DEMS_BACKEND"] = sys.argv[sys.argv.index("--backend") + 1]
+os.environ.setdefault("DEMS_BACKEND", "memory")
+
+import bson
+from config.database_config import DatabaseConfig
+from database.connection_manager import DatabaseManager
+from database.data_generator import DataGenerator
+from database.services import DatabaseService
+from benchmarks.service_benchmark import percentile
+
+# Service methods behind the list views and API list endpoints
+LIST_ENDPOINTS = ("get_all_employees", "get_all_leaves", "get_all_salary_records", "get_all_departments")
+
+ALL_COMPRESSORS = ("zstd", "snappy", "zlib")
+
+
+def _codec(name):
+    """bytes -> compressed bytes for one wire compressor (its package must be installed)"""
+    if name == "zlib":
+        return lambda data: zlib.compress(data, DatabaseConfig.CONNECTION.zlib_compression_level)
+    if name == "snappy":
+        import snappy
+        return snappy.compress
+    if name == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor().compress
+    raise ValueError(f"Unknown compressor {name!r}")
+
+
+def link_ms(num_bytes, link_mbps):
+    """Time to move num_bytes over a link of link_mbps megabits per second"""
+    return num_bytes * 8 / (link_mbps * 1_000_000) * 1000
+
+
+class CompressionBenchmark:
+    def __init__(self, repeat=5, link_mbps=10.0, compressors=None):
+        self.repeat = repeat
+        self.link_mbps = link_mbps
+        requested = compressors or ALL_COMPRESSORS
+        self.compressors = DatabaseConfig.available_compressors(requested)
+        self.skipped = [name for name in requested if name not in self.compressors]
+
+    def prepare(self, employees, years):
+        service = DatabaseService(db_manager=DatabaseManager())
+        generator = DataGenerator(service, years=years)
+        generator.reset()
+        generator.generate(employees)
+        return service
+
+    def _row(self, timings, wire_bytes, raw_bytes):
+        p50 = percentile(timings, 0.50)
+        return {
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "wire_bytes": int(wire_bytes),
+            "ratio": round(raw_bytes / wire_bytes, 2) if wire_bytes else None,
+            "link_ms": round(p50 + link_ms(wire_bytes, self.link_mbps), 3),
+        }
+
+    def run_memory(self, service):
+        """Estimate: BSON size of each reply, compressed in-process by every codec"""
+        results = {}
+        for endpoint in LIST_ENDPOINTS:
+            method = getattr(service, endpoint)
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                documents = method()
+                timings.append((time.perf_counter() - started) * 1000)
+            payload = b"".join(bson.encode(document) for document in documents)
+
+            rows = {"none": self._row(timings, len(payload), len(payload))}
+            for name in self.compressors:
+                compress = _codec(name)
+                compress_timings = []
+                for _ in range(self.repeat):
+                    started = time.perf_counter()
+                    compressed = compress(payload)
+                    compress_timings.append((time.perf_counter() - started) * 1000)
+                # The server compresses and the client decompresses; count the compression side only
+                with_compression = [t + c for t, c in zip(timings, compress_timings)]
+                rows[name] = self._row(with_compression, len(compressed), len(payload))
+            results[endpoint] = {"documents": len(documents), "raw_bytes": len(payload), "compressors": rows}
+        return results
+
+    def run_mongodb(self):
+        """Measure: one client per compressor, wire bytes from the server's network counters"""
+        results = {endpoint: {"compressors": {}} for endpoint in LIST_ENDPOINTS}
+        for name in ["none"] + self.compressors:
+            manager = DatabaseManager(client_options={"compressors": None if name == "none" else name})
+            service = DatabaseService(db_manager=manager)
+            for endpoint in LIST_ENDPOINTS:
+                method = getattr(service, endpoint)
+                method()  # warm the pool and the server cache
+                timings = []
+                before = manager.client.admin.command("serverStatus")["network"]["bytesOut"]
+                for _ in range(self.repeat):
+                    started = time.perf_counter()
+                    documents = method()
+                    timings.append((time.perf_counter() - started) * 1000)
+                after = manager.client.admin.command("serverStatus")["network"]["bytesOut"]
+                raw_bytes = sum(len(bson.encode(document)) for document in documents)
+                wire_bytes = (after - before) / self.repeat
+                results[endpoint]["documents"] = len(documents)
+                results[endpoint]["raw_bytes"] = raw_bytes
+                results[endpoint]["compressors"][name] = self._row(timings, wire_bytes, raw_bytes)
+            manager.close_connection()
+        return results
+
+    def run(self, employees, years):
+        print(f"📦 Generating {employees} employees ({years} year(s) of history)...")
+        service = self.prepare(employees, years)
+        if self.skipped:
+            print(f"⚠️ Skipping {', '.join(self.skipped)}: codec package not installed")
+        measured = DatabaseConfig.BACKEND != "memory"
+        results = self.run_mongodb() if measured else self.run_memory(service)
+        return {
+            "meta": {
+                "backend": DatabaseConfig.BACKEND,
+                "mode": "measured" if measured else "estimated",
+                "python": platform.python_version(),
+                "employees": employees,
+                "years": years,
+                "repeat": self.repeat,
+                "link_mbps": self.link_mbps,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            },
+            "results": results,
+        }
+
+
+def print_results(results):
+    link_mbps = results["meta"]["link_mbps"]
+    print(f"📊 {results['meta']['mode']} wire bytes; link time modelled at {link_mbps:g} Mbit/s")
+    for endpoint, result in results["results"].items():
+        rows = result["compressors"]
+        baseline = rows["none"]
+        print(f"   {endpoint} ({result['documents']} documents, {result['raw_bytes'] / 1024:.0f} KiB BSON)")
+        for name, row in rows.items():
+            saved_bytes = 1 - row["wire_bytes"] / baseline["wire_bytes"] if baseline["wire_bytes"] else 0
+            saved_ms = baseline["link_ms"] - row["link_ms"]
+            print(f"     {name:<7} {row['wire_bytes'] / 1024:>9.1f} KiB ({saved_bytes:>4.0%} saved)   "
+                  f"p50 {row['p50_ms']:>8.2f} ms   on link {row['link_ms']:>9.1f} ms ({saved_ms:>+8.1f} ms saved)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark wire compression on the list reads")
+    parser.add_argument("--backend", choices=["memory", "mongodb"], default="memory",
+                        help="memory (estimate) or mongodb for a local mongod at MONGO_URI (its generated data is reset)")
+    parser.add_argument("--employees", type=int, default=3000)
+    parser.add_argument("--years", type=int, default=1, help="years of salary/leave history in the fixture")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--link-mbps", type=float, default=10.0, help="office link bandwidth for the modelled time")
+    parser.add_argument("--compressors", nargs="+", choices=ALL_COMPRESSORS, help="default: all installed")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if DatabaseConfig.BACKEND != "memory" and "localhost" not in (DatabaseConfig.MONGO_URI or "") \
+            and "127.0.0.1" not in (DatabaseConfig.MONGO_URI or ""):
+        print("❌ Refusing to benchmark (and reset) a non-local MongoDB; point MONGO_URI at a local mongod")
+        return 2
+
+    benchmark = CompressionBenchmark(repeat=args.repeat, link_mbps=args.link_mbps, compressors=args.compressors)
+    results = benchmark.run(args.employees, args.years)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""Multi-user load test of DatabaseService with a mixed workload.
+
+Simulates concurrent users (one thread each) issuing a weighted mix of logins,
+dashboard loads, leave applications and approvals, salary history queries and
+employee edits. Each stage runs for a fixed time at one concurrency level, so
+running several stages shows where throughput stops growing and latency takes
+off. As with the service benchmark, the generated data is reset and refilled
+by the synthetic data generator: use the in-memory backend or a local mongod.
+
+    python -m benchmarks.load_test --users 1 4 16 64 --duration 20
+    python -m benchmarks.load_test --backend mongodb --mix login=1,dashboard=4,salary_history=4 --json load.json
+    DEMS_FAULTS="db2/*:latency=300,jitter=100" DEMS_FAULT_SEED=1 python -m benchmarks.load_test --users 4 16
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+# Backend selection has to happen before DatabaseConfig is imported
+if "--backend" in sys.argv:
+    os.environ["DEMS_BACKEND"] = sys.argv[sys.argv.index("--backend") + 1]
+os.environ.setdefault("DEMS_BACKEND", "memory")
+
+from config.database_config import DatabaseConfig
+from database.connection_manager import DatabaseManager
+from database.data_generator import DataGenerator
+from database.services import DatabaseService
+from benchmarks.service_benchmark import percentile
+
+LOAD_PASSWORD = "load-pass"
+
+DEFAULT_MIX = {
+    "login": 1,
+    "dashboard": 3,
+    "apply_leave": 2,
+    "approve_leave": 1,
+    "salary_history": 3,
+    "employee_edit": 1,
+}
+
+# Stop calling it scaling once doubling the users buys less than this much throughput
+SATURATION_GAIN = 0.10
+
+
+def parse_mix(text):
+    """"login=1,dashboard=3" -> {"login": 1.0, "dashboard": 3.0}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LatencyRecorder:
+    """Thread-safe latency samples keyed by (group, name)"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, group, name, elapsed_ms, ok=True):
+        with self._lock:
+            self.samples[(group, name)].append(elapsed_ms)
+            if not ok:
+                self.errors[(group, name)] += 1
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.errors.clear()
+
+    def summary(self, group, duration):
+        rows = {}
+        with self._lock:
+            items = [(key, list(values)) for key, values in self.samples.items() if key[0] == group]
+        for (_, name), values in sorted(items):
+            rows[name] = {
+                "count": len(values),
+                "errors": self.errors.get((group, name), 0),
+                "per_sec": round(len(values) / duration, 1),
+                "p50_ms": round(percentile(values, 0.50), 3),
+                "p95_ms": round(percentile(values, 0.95), 3),
+                "p99_ms": round(percentile(values, 0.99), 3),
+            }
+        return rows
+
+
+class TimedCollection:
+    def __init__(self, collection, fragment, recorder):
+        self._collection = collection
+        self._fragment = fragment
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                self._recorder.add("command", self._fragment, (time.perf_counter() - started) * 1000)
+        return timed
+
+
+class TimedDatabase:
+    """Times every collection call per fragment (cursor iteration is not included)"""
+
+    def __init__(self, database, fragment, recorder):
+        self._database = database
+        self._fragment = fragment
+        self._recorder = recorder
+
+    def __getitem__(self, name):
+        return TimedCollection(self._database[name], self._fragment, self._recorder)
+
+    def with_options(self, **kwargs):
+        return TimedDatabase(self._database.with_options(**kwargs), self._fragment, self._recorder)
+
+    def __getattr__(self, name):
+        return getattr(self._database, name)
+
+
+class VirtualUser:
+    """One simulated user: an employee with a login, picking operations from the mix"""
+
+    def __init__(self, test, index, emp_id, username, seed):
+        self.test = test
+        self.index = index
+        self.emp_id = emp_id
+        self.username = username
+        self.fragment = test.manager.get_fragment_for_employee(emp_id)
+        self.random = random.Random(seed)
+
+    # Operations return (fragment the work went to, success)
+    def login(self):
+        # Users are replicated; logins read db1
+        return "db1", self.test.service.authenticate_user(self.username, LOAD_PASSWORD) is not None
+
+    def dashboard(self):
+        return "all", bool(self.test.service.get_dashboard_stats())
+
+    def apply_leave(self):
+        start, end = self.test.next_leave_dates(self.emp_id)
+        ok = self.test.service.apply_leave(self.emp_id, start, end, "Vacation", "load test")
+        if ok:
+            self.test.queue_for_approval(self.emp_id, start, end)
+        return self.fragment, ok
+
+    def approve_leave(self):
+        pending = self.test.next_pending_leave()
+        if pending is None:
+            return None, True  # nothing to approve yet; not counted
+        leave_id, fragment = pending
+        return fragment, self.test.service.approve_leave(leave_id, self.username)
+
+    def salary_history(self):
+        return self.fragment, isinstance(self.test.service.get_employee_salaries(self.emp_id), list)
+
+    def employee_edit(self):
+        phone = f"017{self.random.randrange(10 ** 8):08d}"
+        return self.fragment, self.test.service.update_employee(self.emp_id, {"phone": phone})
+
+    def run(self, deadline):
+        names = list(self.test.mix)
+        weights = [self.test.mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            name = self.random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                fragment, ok = getattr(self, name)()
+            except Exception as e:
+                print(f"Error in {name}: {e}")
+                fragment, ok = self.fragment, False
+            elapsed = (time.perf_counter() - started) * 1000
+            if fragment is not None:
+                self.test.operations.add("operation", name, elapsed, ok)
+                self.test.operations.add(f"fragment:{fragment}", name, elapsed, ok)
+            if self.test.think_ms:
+                time.sleep(self.random.expovariate(1000 / self.test.think_ms))
+
+
+class LoadTest:
+    def __init__(self, mix=None, think_ms=0, years=1, seed=7):
+        self.mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+        self.think_ms = think_ms
+        self.years = years
+        self.seed = seed
+        self.operations = LatencyRecorder()
+        self.commands = LatencyRecorder()
+
+        self.manager = DatabaseManager()
+        self.manager.databases = {
+            fragment: TimedDatabase(database, fragment, self.commands)
+            for fragment, database in self.manager.databases.items()
+        }
+        self.service = DatabaseService(db_manager=self.manager)
+        self.generator = DataGenerator(self.service, years=years)
+
+        self._lock = threading.Lock()
+        self._leave_days = {}
+        self._pending = deque()
+
+    def prepare(self, employees, max_users):
+        """Fixture of the given size, and one login per simulated user spread over the fragments"""
+        self.generator.reset()
+        self.generator.generate(employees)
+        emp_ids = sorted(self.generator.employee_ids(employees))
+        by_fragment = defaultdict(list)
+        for emp_id in emp_ids:
+            by_fragment[self.manager.get_fragment_for_employee(emp_id)].append(emp_id)
+        # Round-robin over the fragments so every concurrency level loads all of them
+        spread = [emp_id for group in itertools.zip_longest(*by_fragment.values()) for emp_id in group if emp_id is not None]
+        if max_users > len(spread):
+            raise ValueError(f"{max_users} users need at least as many employees (have {len(spread)})")
+
+        self.accounts = []
+        for emp_id in spread[:max_users]:
+            username = f"load{emp_id}"
+            self.service.create_user(username, LOAD_PASSWORD, "employee", emp_id)
+            self.accounts.append((emp_id, username))
+
+    def next_leave_dates(self, emp_id):
+        # Leaves go far in the future, one week apart per employee, so they never overlap
+        with self._lock:
+            start = self._leave_days.get(emp_id, datetime(2100, 1, 1))
+            self._leave_days[emp_id] = start + timedelta(days=7)
+        return start.strftime("%Y-%m-%d"), (start + timedelta(days=2)).strftime("%Y-%m-%d")
+
+    def queue_for_approval(self, emp_id, start, end):
+        leaves = self.service.check_leave_overlap(emp_id, start, end)
+        if leaves:
+            with self._lock:
+                self._pending.append((leaves[0]["_id"], self.manager.get_fragment_for_employee(emp_id)))
+
+    def next_pending_leave(self):
+        with self._lock:
+            return self._pending.popleft() if self._pending else None
+
+    def run_stage(self, users, duration):
+        self.operations.reset()
+        self.commands.reset()
+        virtual_users = [
+            VirtualUser(self, index, emp_id, username, seed=self.seed * 1000 + index)
+            for index, (emp_id, username) in enumerate(self.accounts[:users])
+        ]
+        started = time.perf_counter()
+        deadline = started + duration
+        threads = [threading.Thread(target=user.run, args=(deadline,), daemon=True) for user in virtual_users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        operations = self.operations.summary("operation", elapsed)
+        total = sum(row["count"] for row in operations.values())
+        fragments = sorted({group.split(":", 1)[1] for group, _ in self.operations.samples if group.startswith("fragment:")})
+        return {
+            "users": users,
+            "seconds": round(elapsed, 2),
+            "operations_total": total,
+            "errors": sum(row["errors"] for row in operations.values()),
+            "throughput_per_sec": round(total / elapsed, 1),
+            "operations": operations,
+            "fragments": {fragment: self.operations.summary(f"fragment:{fragment}", elapsed) for fragment in fragments},
+            "commands": self.commands.summary("command", elapsed),
+        }
+
+    def run(self, stages, duration, employees):
+        print(f"📦 Generating {employees} employees ({self.years} year(s) of history), {max(stages)} logins...")
+        self.prepare(employees, max(stages))
+        results = []
+        for users in stages:
+            print(f"🚦 {users} concurrent user(s) for {duration:g}s...")
+            stage = self.run_stage(users, duration)
+            print_stage(stage)
+            results.append(stage)
+        return {
+            "meta": {
+                "backend": DatabaseConfig.BACKEND,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "employees": employees,
+                "years": self.years,
+                "duration": duration,
+                "think_ms": self.think_ms,
+                "mix": self.mix,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            },
+            "stages": results,
+            "saturation": find_saturation(results),
+        }
+
+
+def find_saturation(stages):
+    """First stage where adding users raised throughput by under SATURATION_GAIN of the proportional gain"""
+    for previous, stage in zip(stages, stages[1:]):
+        if previous["throughput_per_sec"] <= 0 or stage["users"] <= previous["users"]:
+            continue
+        gain = stage["throughput_per_sec"] / previous["throughput_per_sec"] - 1
+        expected = stage["users"] / previous["users"] - 1
+        if gain < expected * SATURATION_GAIN:
+            return {"users": stage["users"], "after_users": previous["users"],
+                    "throughput_per_sec": previous["throughput_per_sec"]}
+    return None
+
+
+def _print_table(title, rows):
+    print(f"   {title}")
+    for name, row in rows.items():
+        print(f"     {name:<16} {row['count']:>7} ops {row['per_sec']:>9.1f}/s   p50 {row['p50_ms']:>9.3f}   "
+              f"p95 {row['p95_ms']:>9.3f}   p99 {row['p99_ms']:>9.3f} ms   {row['errors']:>4} errors")
+
+
+def print_stage(stage):
+    print(f"   {stage['operations_total']} operations in {stage['seconds']}s = "
+          f"{stage['throughput_per_sec']} ops/s ({stage['errors']} errors)")
+    _print_table("per operation", stage["operations"])
+    for fragment, rows in stage["fragments"].items():
+        _print_table(f"fragment {fragment}", rows)
+    _print_table("database commands per fragment", stage["commands"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-user load test of DatabaseService")
+    parser.add_argument("--backend", choices=["memory", "mongodb"], default="memory",
+                        help="memory, or mongodb for a local mongod at MONGO_URI (its generated data is reset)")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16], help="concurrency levels, one stage each")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per stage")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=1, help="years of salary/leave history in the fixture")
+    parser.add_argument("--mix", type=parse_mix, help="weighted operations, e.g. login=1,dashboard=3,apply_leave=2,"
+                                                      "approve_leave=1,salary_history=3,employee_edit=1")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's operations")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if DatabaseConfig.BACKEND != "memory" and "localhost" not in (DatabaseConfig.MONGO_URI or "") \
+            and "127.0.0.1" not in (DatabaseConfig.MONGO_URI or ""):
+        print("❌ Refusing to load test (and reset) a non-local MongoDB; point MONGO_URI at a local mongod")
+        return 2
+
+    test = LoadTest(mix=args.mix, think_ms=args.think_ms, years=args.years, seed=args.seed)
+    try:
+        results = test.run(sorted(set(args.users)), args.duration, args.employees)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    saturation = results["saturation"]
+    if saturation:
+        print(f"📈 Throughput stops scaling past {saturation['after_users']} users "
+              f"(~{saturation['throughput_per_sec']} ops/s)")
+    else:
+        print("📈 Throughput kept scaling across all stages")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
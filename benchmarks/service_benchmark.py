@@ -0,0 +1,279 @@
+"""Benchmark DatabaseService operations at several data scales.
+
+Runs against the in-memory backend by default (DEMS_BACKEND=memory) or a local
+mongod (--backend mongodb with MONGO_URI pointing at it). Each scale is filled
+by the synthetic data generator, so its earlier generated data is reset first:
+never point this at a database you care about.
+
+    python -m benchmarks.service_benchmark --scales 300 1000 3000 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.service_benchmark --baseline benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Backend selection has to happen before DatabaseConfig is imported
+if "--backend" in sys.argv:
+    os.environ["DEMS_BACKEND"] = sys.argv[sys.argv.index("--backend") + 1]
+os.environ.setdefault("DEMS_BACKEND", "memory")
+
+from config.database_config import DatabaseConfig
+from database.connection_manager import DatabaseManager
+from database.data_generator import DataGenerator
+from database.services import DatabaseService
+
+BENCH_USERNAME = "bench_user"
+BENCH_PASSWORD = "bench-pass"
+
+
+class RoundTripCounter:
+    """Thread-safe count of collection calls (each one is a server round trip)"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.count += 1
+
+
+class CountingCollection:
+    def __init__(self, collection, counter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            self._counter.hit()
+            return attribute(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, database, counter):
+        self._database = database
+        self._counter = counter
+
+    def __getitem__(self, name):
+        return CountingCollection(self._database[name], self._counter)
+
+    def with_options(self, **kwargs):
+        return CountingDatabase(self._database.with_options(**kwargs), self._counter)
+
+    def __getattr__(self, name):
+        return getattr(self._database, name)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ServiceBenchmark:
+    def __init__(self, repeat=20, warmup=2, years=1):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.years = years
+        self.counter = RoundTripCounter()
+
+        manager = DatabaseManager()
+        manager.databases = {
+            fragment: CountingDatabase(database, self.counter)
+            for fragment, database in manager.databases.items()
+        }
+        self.service = DatabaseService(db_manager=manager)
+        self.generator = DataGenerator(self.service, years=years)
+
+    def prepare(self, employees):
+        """Reset the fragments and generate a fixture of the given size"""
+        self.generator.reset()
+        self.generator.generate(employees)
+        if not self.service.authenticate_user(BENCH_USERNAME, BENCH_PASSWORD):
+            self.service.create_user(BENCH_USERNAME, BENCH_PASSWORD, "admin")
+
+        used = set(self.generator.employee_ids(employees))
+        self.free_ids = [
+            emp_id
+            for low, high in (DatabaseConfig.DB1_RANGE, DatabaseConfig.DB2_RANGE, DatabaseConfig.DB3_RANGE)
+            for emp_id in range(low, high + 1)
+            if emp_id not in used
+        ]
+        self.leave_emp_ids = sorted(used)
+        self.leave_day = datetime(2100, 1, 1)
+
+    # Operations; each returns a callable so setup/teardown stay outside the timed call
+    def _create_employee(self):
+        emp_id = self.free_ids.pop()
+
+        def run():
+            self.service.create_employee(emp_id, "Bench Person", f"bench{emp_id}@company.com", "0170000000",
+                                         "1990-01-01", "Information Technology", "Software Developer", 70000)
+        return run, lambda: (self.service.delete_employee(emp_id), self.free_ids.append(emp_id))
+
+    def _next_leave_dates(self):
+        start = self.leave_day
+        self.leave_day += timedelta(days=7)
+        return start.strftime("%Y-%m-%d"), (start + timedelta(days=2)).strftime("%Y-%m-%d")
+
+    def _apply_leave(self):
+        emp_id = self.leave_emp_ids[len(self.leave_emp_ids) // 2]
+        start, end = self._next_leave_dates()
+        return lambda: self.service.apply_leave(emp_id, start, end, "Vacation", "benchmark"), None
+
+    def _approve_leave(self):
+        emp_id = self.leave_emp_ids[len(self.leave_emp_ids) // 2]
+        start, end = self._next_leave_dates()
+        self.service.apply_leave(emp_id, start, end, "Vacation", "benchmark")
+        leave = self.service.check_leave_overlap(emp_id, start, end)[0]
+        return lambda: self.service.approve_leave(leave["_id"], "admin"), None
+
+    def operations(self):
+        static = {
+            "get_all_employees": self.service.get_all_employees,
+            "get_dashboard_stats": self.service.get_dashboard_stats,
+            "get_department_member_count": lambda: self.service.get_department_member_count("Information Technology"),
+            "get_all_leaves": self.service.get_all_leaves,
+            "get_all_salary_records": self.service.get_all_salary_records,
+            "authenticate_user": lambda: self.service.authenticate_user(BENCH_USERNAME, BENCH_PASSWORD),
+        }
+        operations = {name: (lambda fn=fn: (fn, None)) for name, fn in static.items()}
+        operations.update({
+            "create_employee": self._create_employee,
+            "apply_leave": self._apply_leave,
+            "approve_leave": self._approve_leave,
+        })
+        return operations
+
+    def measure(self, make_call):
+        """p50/p95 latency, round trips per call and peak traced allocation of one operation"""
+        for _ in range(self.warmup):
+            call, cleanup = make_call()
+            call()
+            if cleanup:
+                cleanup()
+
+        timings = []
+        round_trips = []
+        for _ in range(self.repeat):
+            call, cleanup = make_call()
+            before = self.counter.count
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+            round_trips.append(self.counter.count - before)
+            if cleanup:
+                cleanup()
+
+        # Allocation tracing slows everything down, so it gets its own untimed run
+        call, cleanup = make_call()
+        tracemalloc.start()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if cleanup:
+            cleanup()
+
+        return {
+            "p50_ms": round(percentile(timings, 0.50), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "round_trips": max(round_trips),
+            "peak_alloc_kib": round(peak / 1024, 1),
+        }
+
+    def run(self, scales, only=None):
+        results = {}
+        for employees in scales:
+            print(f"📦 Generating {employees} employees ({self.years} year(s) of history)...")
+            self.prepare(employees)
+            results[str(employees)] = {}
+            for name, make_call in self.operations().items():
+                if only and name not in only:
+                    continue
+                results[str(employees)][name] = self.measure(make_call)
+                stats = results[str(employees)][name]
+                print(f"   {name:<28} p50 {stats['p50_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms   "
+                      f"{stats['round_trips']:>4} trips   {stats['peak_alloc_kib']:>10.1f} KiB")
+        return {
+            "meta": {
+                "backend": DatabaseConfig.BACKEND,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "repeat": self.repeat,
+                "years": self.years,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            },
+            "results": results,
+        }
+
+
+def compare(current, baseline, threshold, min_ms):
+    """Regressions of current vs baseline, as human-readable lines"""
+    regressions = []
+    for scale, operations in current["results"].items():
+        for name, stats in operations.items():
+            reference = baseline.get("results", {}).get(scale, {}).get(name)
+            if not reference:
+                continue
+            if stats["p95_ms"] > reference["p95_ms"] * (1 + threshold) and stats["p95_ms"] - reference["p95_ms"] > min_ms:
+                regressions.append(f"{scale}/{name}: p95 {reference['p95_ms']} -> {stats['p95_ms']} ms")
+            if stats["round_trips"] > reference["round_trips"]:
+                regressions.append(f"{scale}/{name}: round trips {reference['round_trips']} -> {stats['round_trips']}")
+            if stats["peak_alloc_kib"] > reference["peak_alloc_kib"] * (1 + threshold) and \
+                    stats["peak_alloc_kib"] - reference["peak_alloc_kib"] > 64:
+                regressions.append(f"{scale}/{name}: peak alloc {reference['peak_alloc_kib']} -> {stats['peak_alloc_kib']} KiB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseService operations")
+    parser.add_argument("--backend", choices=["memory", "mongodb"], default="memory",
+                        help="memory, or mongodb for a local mongod at MONGO_URI (its generated data is reset)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[300, 1000, 3000], help="employee counts")
+    parser.add_argument("--years", type=int, default=1, help="years of salary/leave history per fixture")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", nargs="+", help="benchmark only these operations")
+    parser.add_argument("--baseline", help="compare against this baseline JSON and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="ignore p95 differences smaller than this")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if DatabaseConfig.BACKEND != "memory" and "localhost" not in (DatabaseConfig.MONGO_URI or "") \
+            and "127.0.0.1" not in (DatabaseConfig.MONGO_URI or ""):
+        print("❌ Refusing to benchmark (and reset) a non-local MongoDB; point MONGO_URI at a local mongod")
+        return 2
+
+    results = ServiceBenchmark(repeat=args.repeat, years=args.years).run(args.scales, args.only)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✅ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
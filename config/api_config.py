@@ -0,0 +1,19 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class ApiConfig:
+    # Address the HTTP API listens on
+    HOST = os.getenv('DEMS_API_HOST', '127.0.0.1')
+    PORT = int(os.getenv('DEMS_API_PORT', '8080'))
+    
+    # Connections per fragment shared by every API client
+    POOL_SIZE = int(os.getenv('DEMS_API_POOL_SIZE', '10'))
+    
+    # Server-side caches (seconds): read-mostly responses and verified credentials
+    CACHE_TTL = float(os.getenv('DEMS_API_CACHE_TTL', '5'))
+    AUTH_CACHE_TTL = float(os.getenv('DEMS_API_AUTH_CACHE_TTL', '300'))
+    
+    # Largest request body accepted (bytes)
+    MAX_BODY = int(os.getenv('DEMS_API_MAX_BODY', str(1024 * 1024)))
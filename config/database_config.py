@@ -1,12 +1,103 @@
+import importlib.util
 import os
+from dataclasses import dataclass
 from dotenv import load_dotenv
 
 load_dotenv()
 
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default) != '0'
+
+
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """MongoClient settings (offices reach Atlas over high-latency links)"""
+    # Wire compression in order of preference; the server picks the first it also supports.
+    # zstd needs the zstandard package and snappy python-snappy; unavailable ones are skipped.
+    compressors: tuple = ("zstd", "snappy", "zlib")
+    zlib_compression_level: int = 6  # -1 (default) to 9
+    connect_timeout_ms: int = 10000
+    socket_timeout_ms: int = 60000
+    server_selection_timeout_ms: int = 5000
+    max_pool_size: int = 50
+    min_pool_size: int = 0
+    max_idle_time_ms: int = 300000
+    wait_queue_timeout_ms: int = 10000  # waiting for a pooled connection
+    retry_reads: bool = True
+    retry_writes: bool = True
+    app_name: str = "DEMS"  # shows up in Atlas logs and currentOp
+    
+    @classmethod
+    def from_env(cls):
+        """Profile from the DEMS_MONGO_* environment variables (unset ones keep the defaults)"""
+        return cls(
+            compressors=tuple(c.strip() for c in os.getenv('DEMS_MONGO_COMPRESSORS', 'zstd,snappy,zlib').split(',') if c.strip()),
+            zlib_compression_level=int(os.getenv('DEMS_MONGO_ZLIB_LEVEL', '6')),
+            connect_timeout_ms=int(os.getenv('DEMS_MONGO_CONNECT_TIMEOUT_MS', '10000')),
+            socket_timeout_ms=int(os.getenv('DEMS_MONGO_SOCKET_TIMEOUT_MS', '60000')),
+            server_selection_timeout_ms=int(os.getenv('DEMS_MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+            max_pool_size=int(os.getenv('DEMS_MONGO_MAX_POOL_SIZE', '50')),
+            min_pool_size=int(os.getenv('DEMS_MONGO_MIN_POOL_SIZE', '0')),
+            max_idle_time_ms=int(os.getenv('DEMS_MONGO_MAX_IDLE_TIME_MS', '300000')),
+            wait_queue_timeout_ms=int(os.getenv('DEMS_MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000')),
+            retry_reads=_env_flag('DEMS_MONGO_RETRY_READS', '1'),
+            retry_writes=_env_flag('DEMS_MONGO_RETRY_WRITES', '1'),
+            app_name=os.getenv('DEMS_MONGO_APP_NAME', 'DEMS'),
+        )
+    
+    def available_compressors(self, compressors=None):
+        """The profile's (or the given) compressors whose Python codec is installed (zlib always is)"""
+        return [
+            name for name in (self.compressors if compressors is None else compressors)
+            if name in COMPRESSOR_MODULES and importlib.util.find_spec(COMPRESSOR_MODULES[name]) is not None
+        ]
+    
+    def client_options(self, **overrides):
+        """MongoClient keyword arguments (overrides win; None drops an option)"""
+        options = {
+            "appname": self.app_name,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "retryReads": self.retry_reads,
+            "retryWrites": self.retry_writes,
+        }
+        compressors = self.available_compressors()
+        if compressors:
+            options["compressors"] = ",".join(compressors)
+            if "zlib" in compressors:
+                options["zlibCompressionLevel"] = self.zlib_compression_level
+        options.update(overrides)
+        return {name: value for name, value in options.items() if value is not None}
+
+
 class DatabaseConfig:
     # Single MongoDB URI for the cluster
     MONGO_URI = os.getenv('MONGO_URI')
     
+    # Storage backend: "mongodb" (Atlas via MONGO_URI) or "memory" (in-process, for offline testing and benchmarks)
+    BACKEND = os.getenv('DEMS_BACKEND', 'mongodb').lower()
+    
+    # Connection profile for MongoClient, from the DEMS_MONGO_* variables (see ConnectionProfile)
+    CONNECTION = ConnectionProfile.from_env()
+    
+    @classmethod
+    def available_compressors(cls, compressors=None):
+        """The configured compressors whose Python codec is installed (zlib always is)"""
+        return cls.CONNECTION.available_compressors(compressors)
+    
+    @classmethod
+    def client_options(cls, **overrides):
+        """MongoClient keyword arguments for the connection profile (overrides win; None drops an option)"""
+        return cls.CONNECTION.client_options(**overrides)
+    
     # Database names (3 databases in the same cluster)
     DB1_NAME = "ems_db1"
     DB2_NAME = "ems_db2"
@@ -22,4 +113,63 @@ class DatabaseConfig:
     DEPARTMENTS_COLLECTION = "departments"
     USERS_COLLECTION = "users"
     LEAVES_COLLECTION = "leaves"
-    SALARIES_COLLECTION = "salaries"
\ No newline at end of file
+    SALARIES_COLLECTION = "salaries"
+    PAYROLL_ROLLUPS_COLLECTION = "payroll_rollups"
+    STATS_COLLECTION = "stats"
+    LEAVE_LEDGER_COLLECTION = "leave_ledger"
+    LEAVE_BALANCES_COLLECTION = "leave_balances"
+    
+    # Offline write-behind journal (local SQLite file used while Atlas is unreachable)
+    JOURNAL_PATH = os.getenv('DEMS_JOURNAL_PATH', 'dems_journal.sqlite3')
+    JOURNAL_REPLAY_INTERVAL = int(os.getenv('DEMS_JOURNAL_REPLAY_INTERVAL', '15'))  # seconds
+    JOURNAL_BATCH_SIZE = int(os.getenv('DEMS_JOURNAL_BATCH_SIZE', '100'))
+    JOURNAL_MAX_FAILURES = int(os.getenv('DEMS_JOURNAL_MAX_FAILURES', '5'))  # rejected replays before dead-lettering
+    
+    # Salary history snapshot: refreshes older than this reload everything (picks up edits, deletes and late inserts)
+    SALARY_SNAPSHOT_MAX_AGE = float(os.getenv('DEMS_SALARY_SNAPSHOT_MAX_AGE', '300'))  # seconds
+    
+    # Query instrumentation (per-command timings tagged with the GUI action that issued them)
+    QUERY_INSTRUMENTATION = os.getenv('DEMS_QUERY_INSTRUMENTATION', '1') != '0'
+    SLOW_QUERY_MS = float(os.getenv('DEMS_SLOW_QUERY_MS', '100'))  # logged as a warning
+    VERY_SLOW_QUERY_MS = float(os.getenv('DEMS_VERY_SLOW_QUERY_MS', '500'))  # logged as an error
+    ACTION_QUERY_WARN = int(os.getenv('DEMS_ACTION_QUERY_WARN', '25'))  # queries per action before flagging N+1
+    SLOW_QUERY_LOG = os.getenv('DEMS_SLOW_QUERY_LOG')  # optional log file for slow queries and action summaries
+    
+    # Fault injection for resilience testing, e.g. DEMS_FAULTS="db2:down" (spec syntax in database/fault_injection.py)
+    FAULTS = os.getenv('DEMS_FAULTS')
+    FAULT_INJECTION = bool(FAULTS) or os.getenv('DEMS_FAULT_INJECTION') == '1'
+    FAULT_SEED = os.getenv('DEMS_FAULT_SEED')  # fixes the jitter/error draws for reproducible runs
+    
+    # Cross-fragment reads: per-fragment deadline for reaching a fragment and its first batch (long cursors
+    # drain without it) and a circuit breaker (an open breaker skips the fragment)
+    FRAGMENT_DEADLINE_MS = float(os.getenv('DEMS_FRAGMENT_DEADLINE_MS', '1500'))
+    BREAKER_FAILURES = int(os.getenv('DEMS_BREAKER_FAILURES', '3'))  # consecutive failures before opening
+    BREAKER_RESET_SECONDS = float(os.getenv('DEMS_BREAKER_RESET_SECONDS', '30'))  # before a trial call
+    
+    # Replicated reads (users, departments): fastest healthy replica, hedged to a second one when slow
+    HEDGED_READS = os.getenv('DEMS_HEDGED_READS', '1') != '0'
+    HEDGE_MIN_DELAY_MS = float(os.getenv('DEMS_HEDGE_MIN_DELAY_MS', '25'))  # floor for the p95-based hedge delay
+    
+    # Read routing per operation class (Atlas replica sets). read_preference is one of primary,
+    # primaryPreferred, secondary, secondaryPreferred, nearest; max_staleness is in seconds
+    # (-1 = no limit, otherwise at least 90); read_concern is local, available, majority, ...
+    #   interactive: GUI reads (the default for fragment handles)
+    #   reporting: report-style scans (all salaries/leaves, trends, exports), offloaded to secondaries
+    #   write: reads that feed a write (leave lookups, transactions); must stay on the primary
+    READ_PROFILES = {
+        "interactive": {
+            "read_preference": os.getenv('DEMS_INTERACTIVE_READ_PREFERENCE', 'primary'),
+            "max_staleness": int(os.getenv('DEMS_INTERACTIVE_MAX_STALENESS', '-1')),
+            "read_concern": os.getenv('DEMS_INTERACTIVE_READ_CONCERN', 'local'),
+        },
+        "reporting": {
+            "read_preference": os.getenv('DEMS_REPORTING_READ_PREFERENCE', 'secondaryPreferred'),
+            "max_staleness": int(os.getenv('DEMS_REPORTING_MAX_STALENESS', '120')),
+            "read_concern": os.getenv('DEMS_REPORTING_READ_CONCERN', 'local'),
+        },
+        "write": {
+            "read_preference": "primary",
+            "max_staleness": -1,
+            "read_concern": os.getenv('DEMS_WRITE_READ_CONCERN', 'local'),
+        },
+    }
@@ -0,0 +1,23 @@
+import os
+import json
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class LeaveConfig:
+    # Working days as a NumPy weekmask, Monday first ("1111100" = Mon-Fri, "1111001" = Sun-Thu)
+    WEEKMASK = os.getenv('DEMS_LEAVE_WEEKMASK', '1111100')
+    
+    # Public holidays excluded from leave durations:
+    # comma-separated YYYY-MM-DD dates and/or a file with one date per line
+    HOLIDAYS = os.getenv('DEMS_HOLIDAYS', '')
+    HOLIDAYS_FILE = os.getenv('DEMS_HOLIDAYS_FILE')
+    
+    # Annual leave entitlement (working days) per leave type, overridable with a JSON object
+    ENTITLEMENTS = json.loads(os.getenv('DEMS_LEAVE_ENTITLEMENTS', '{}')) or {
+        "Sick Leave": 14,
+        "Vacation": 20,
+        "Personal": 5,
+        "Emergency": 3,
+        "Maternity/Paternity": 90
+    }
\ No newline at end of file
@@ -0,0 +1,132 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config.database_config import DatabaseConfig
+from database.instrumentation import bind_action
+
+
+def month_range(start, end):
+    """(year, month) tuples from start to end inclusive"""
+    year, month = start
+    months = []
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def shift_month(period, offset):
+    """Move a (year, month) period by a number of months"""
+    index = period[0] * 12 + (period[1] - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+class WorkforceAnalytics:
+    """Monthly headcount, hires and payroll cost per department.
+
+    Each fragment reduces its own employees to (year, month, department) hire
+    counts with an aggregation pipeline and payroll comes from the per-fragment
+    department_month rollups, so only a few hundred small buckets cross the wire
+    regardless of history length. Buckets from all fragments are merged on the
+    client and results are cached per period for `ttl` seconds.
+
+    Headcount for a month is the number of current employees who had joined by
+    the end of it; employees are deleted rather than end-dated, so departures
+    are not visible in the history.
+    """
+
+    def __init__(self, db_manager, ttl=300):
+        self.db_manager = db_manager
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Forget every cached period"""
+        with self._lock:
+            self._cache.clear()
+
+    def _hire_buckets(self, db):
+        pipeline = [
+            {"$match": {"join_date": {"$type": "date"}}},
+            {"$group": {
+                "_id": {
+                    "year": {"$year": "$join_date"},
+                    "month": {"$month": "$join_date"},
+                    "department": "$department",
+                },
+                "hires": {"$sum": 1},
+            }},
+        ]
+        return list(db[DatabaseConfig.EMPLOYEES_COLLECTION].aggregate(pipeline))
+
+    def _payroll_buckets(self, db, start, end):
+        return list(db[DatabaseConfig.PAYROLL_ROLLUPS_COLLECTION].find(
+            {"scope": "department_month", "year": {"$gte": start[0], "$lte": end[0]}},
+            {"year": 1, "month": 1, "department": 1, "net_salary": 1}
+        ))
+
+    def _scan_fragment(self, db, start, end):
+        return self._hire_buckets(db), self._payroll_buckets(db, start, end)
+
+    def _compute(self, start, end):
+        databases = self.db_manager.get_all_databases("reporting")
+        with ThreadPoolExecutor(max_workers=len(databases)) as executor:
+            scans = list(executor.map(bind_action(lambda db: self._scan_fragment(db, start, end)), databases))
+
+        hires = {}
+        payroll = {}
+        for hire_buckets, payroll_buckets in scans:
+            for bucket in hire_buckets:
+                key = (bucket["_id"]["year"], bucket["_id"]["month"], bucket["_id"].get("department") or "N/A")
+                hires[key] = hires.get(key, 0) + bucket["hires"]
+            for bucket in payroll_buckets:
+                key = (bucket["year"], bucket["month"], bucket.get("department") or "N/A")
+                payroll[key] = payroll.get(key, 0) + bucket.get("net_salary", 0)
+
+        months = month_range(start, end)
+        departments = sorted({key[2] for key in hires} | {key[2] for key in payroll})
+        series = {"hires": {}, "headcount": {}, "payroll": {}}
+        for department in departments:
+            # Everyone who joined before the window is already on the books in its first month
+            on_books = sum(count for (y, m, d), count in hires.items() if d == department and (y, m) < start)
+            series["hires"][department] = []
+            series["headcount"][department] = []
+            series["payroll"][department] = []
+            for year, month in months:
+                joined = hires.get((year, month, department), 0)
+                on_books += joined
+                series["hires"][department].append(joined)
+                series["headcount"][department].append(on_books)
+                series["payroll"][department].append(round(payroll.get((year, month, department), 0), 2))
+
+        return {
+            "months": [f"{year}-{month:02d}" for year, month in months],
+            "departments": departments,
+            **series,
+            "totals": {
+                name: [sum(values) for values in zip(*by_department.values())] if by_department else [0] * len(months)
+                for name, by_department in series.items()
+            },
+        }
+
+    def monthly_series(self, start=None, end=None):
+        """Headcount, hires and payroll per department for each month in [start, end].
+
+        start and end are (year, month) tuples; by default the last 12 months.
+        """
+        today = datetime.now()
+        end = end or (today.year, today.month)
+        start = start or shift_month(end, -11)
+
+        key = (tuple(start), tuple(end))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+
+        result = self._compute(tuple(start), tuple(end))
+        with self._lock:
+            self._cache[key] = (time.monotonic(), result)
+        return result
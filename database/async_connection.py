@@ -0,0 +1,140 @@
+import inspect
+from config.database_config import DatabaseConfig
+from database.connection_manager import DatabaseManager
+from database.memory_backend import get_memory_client
+from database.instrumentation import get_query_monitor, QueryListener
+
+# Motor when installed, else pymongo's own asyncio client (pymongo >= 4.9)
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient as AsyncClient
+except ImportError:
+    try:
+        from pymongo import AsyncMongoClient as AsyncClient
+    except ImportError:
+        AsyncClient = None
+
+
+def async_available():
+    """True if AsyncDatabaseManager can connect (the memory backend, or motor / pymongo >= 4.9 installed)"""
+    return DatabaseConfig.BACKEND == "memory" or AsyncClient is not None
+
+
+async def resolve(value):
+    """Await value if it is awaitable (Motor and pymongo's async client differ on e.g. aggregate)"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def to_list(cursor):
+    """All documents of an async cursor"""
+    return await resolve(cursor.to_list(None))
+
+
+class _AsyncMemoryCursor:
+    """Async view of a MemoryCursor (or a plain iterator, for aggregate)"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit):
+        self._cursor.limit(limit)
+        return self
+
+    def skip(self, skip):
+        self._cursor.skip(skip)
+        return self
+
+    async def to_list(self, length=None):
+        documents = []
+        for document in self._cursor:
+            documents.append(document)
+            if length and len(documents) >= length:
+                break
+        return documents
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _AsyncMemoryCollection:
+    """Motor-shaped wrapper over a MemoryCollection; operations run inline (they never block on I/O)"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return _AsyncMemoryCursor(self._collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, **kwargs):
+        return _AsyncMemoryCursor(self._collection.aggregate(pipeline, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class _AsyncMemoryDatabase:
+    def __init__(self, database):
+        self._database = database
+        self.name = database.name
+
+    def __getitem__(self, name):
+        return _AsyncMemoryCollection(self._database[name])
+
+
+class AsyncDatabaseManager(DatabaseManager):
+    """DatabaseManager whose fragments are asyncio databases (same ranges and routing).
+
+    Uses Motor or pymongo's AsyncMongoClient against MongoDB, and a thin async
+    wrapper over the shared in-memory client for DEMS_BACKEND=memory.
+    """
+
+    def __init__(self, max_pool_size=None):
+        self.max_pool_size = max_pool_size
+        super().__init__()
+
+    def _connect_to_cluster(self):
+        monitor = get_query_monitor() if DatabaseConfig.QUERY_INSTRUMENTATION else None
+        if DatabaseConfig.BACKEND == "memory":
+            memory_client = get_memory_client()
+            if monitor:
+                memory_client.add_event_listener(monitor)
+            self.client = None
+            names = {"db1": DatabaseConfig.DB1_NAME, "db2": DatabaseConfig.DB2_NAME, "db3": DatabaseConfig.DB3_NAME}
+            self.databases = {key: _AsyncMemoryDatabase(memory_client[name]) for key, name in names.items()}
+            return
+
+        if AsyncClient is None:
+            raise RuntimeError("The async API needs motor or pymongo >= 4.9 (pip install motor)")
+        options = DatabaseConfig.client_options(**self.client_options)
+        if self.max_pool_size:
+            options["maxPoolSize"] = self.max_pool_size
+        if monitor:
+            options["event_listeners"] = [QueryListener(monitor)]
+        self.client = AsyncClient(DatabaseConfig.MONGO_URI, **options)
+        self.databases['db1'] = self.client[DatabaseConfig.DB1_NAME]
+        self.databases['db2'] = self.client[DatabaseConfig.DB2_NAME]
+        self.databases['db3'] = self.client[DatabaseConfig.DB3_NAME]
+
+    async def ping(self):
+        if self.client is not None:
+            await self.client.admin.command('ping')
+        return True
+
+    async def aclose(self):
+        if self.client is not None:
+            await resolve(self.client.close())
@@ -0,0 +1,386 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import bcrypt
+from config.database_config import DatabaseConfig
+from models.user import User
+from models.department import Department
+from database.async_connection import AsyncDatabaseManager, to_list
+from database.fragment_health import get_fragment_health, PartialResult
+from database.replica_reads import ReplicaReader
+from database.instrumentation import bind_action
+
+
+# Leave statuses that block the employee's calendar (as in DatabaseService)
+ACTIVE_LEAVE_STATUSES = ["Pending", "Approved"]
+
+
+class AsyncDatabaseService:
+    """asyncio counterpart of DatabaseService, with the same method names (as coroutines).
+
+    Every operation touching more than one fragment is issued to all fragments
+    concurrently with asyncio.gather: the get_all_* reads, replicated user and
+    department writes, member counts, dashboard stats and the probe for the
+    fragment holding a leave. Cross-fragment reads share the sync service's
+    circuit breakers and per-fragment deadline and return PartialResults;
+    user and department reads go to the fastest healthy replica, hedged and
+    failed over as in DatabaseService. Writes with single-fragment side effects
+    (dashboard counters, leave ledger, payroll rollups, offline journal) and
+    any method without a native version here run on the sync DatabaseService
+    on a small thread pool, so their semantics stay identical to the desktop app.
+    """
+
+    def __init__(self, db_manager=None, sync_service=None, max_pool_size=None, write_workers=4):
+        self.db_manager = db_manager or AsyncDatabaseManager(max_pool_size=max_pool_size)
+        self._sync_service = sync_service
+        self.fragment_health = get_fragment_health()
+        self.replica_reader = ReplicaReader(self.db_manager, self.fragment_health, max_workers=1)
+        self._executor = ThreadPoolExecutor(max_workers=write_workers, thread_name_prefix="dems-async-writes")
+
+    @property
+    def sync_service(self):
+        if self._sync_service is None:
+            from database.services import DatabaseService
+            self._sync_service = DatabaseService()
+        return self._sync_service
+
+    async def _run_sync(self, name, *args, **kwargs):
+        """Run a DatabaseService method on the write pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, bind_action(functools.partial(getattr(self.sync_service, name), *args, **kwargs))
+        )
+
+    async def _gather_fragments(self, query, op_class=None):
+        """Run query(db) on every fragment concurrently; results in fragment order"""
+        return await asyncio.gather(*(query(db) for db in self.db_manager.get_all_databases(op_class)))
+
+    async def _read_all_fragments(self, read, key=None, reverse=False, op_class=None):
+        """Concurrent cross-fragment read of the cursors read(db) returns; fragments whose
+        first batch misses the deadline are listed as unavailable"""
+        results, unavailable = await self.fragment_health.read_all_async(
+            self.db_manager.get_databases(op_class), read, drain=True
+        )
+        documents = [document for fragment_documents in results.values() for document in fragment_documents]
+        if key is not None:
+            documents.sort(key=key, reverse=reverse)
+        return PartialResult(documents, unavailable)
+
+    async def _find_all(self, collection, query=None, key=None, reverse=False, op_class=None):
+        return await self._read_all_fragments(
+            lambda db: db[collection].find(query or {}), key=key, reverse=reverse, op_class=op_class
+        )
+
+    def __getattr__(self, name):
+        # Any other public DatabaseService method becomes a coroutine running on the write pool
+        if name.startswith("_") or not callable(getattr(type(self.sync_service), name, None)):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            return await self._run_sync(name, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    async def _inc_stats(self, db, **amounts):
+        await db[DatabaseConfig.STATS_COLLECTION].update_one({"_id": "dashboard"}, {"$inc": amounts}, upsert=True)
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+        await self.db_manager.aclose()
+
+    # User Management (replicated, read from the fastest healthy replica)
+    async def authenticate_user(self, username, password):
+        """Authenticate user from the best replica; bcrypt runs off the event loop"""
+        try:
+            user_data = await self.get_user(username)
+            if not user_data:
+                return None
+            return user_data if await self.check_password(user_data, password) else None
+        except Exception as e:
+            print(f"Authentication error: {e}")
+            return None
+
+    async def get_user(self, username):
+        """A user account (with its password hash) from the best replica, or None"""
+        return await self.replica_reader.read_async(
+            lambda db: db[DatabaseConfig.USERS_COLLECTION].find_one({"username": username})
+        )
+
+    async def check_password(self, user_data, password):
+        """bcrypt-check a password against a user account, off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, bcrypt.checkpw, password.encode('utf-8'), user_data['password'].encode('utf-8')
+        )
+
+    async def create_user(self, username, password, role="employee", emp_id=None):
+        """Create user in every fragment concurrently (replication)"""
+        loop = asyncio.get_running_loop()
+        user_data = (await loop.run_in_executor(self._executor, User, username, password, role, emp_id)).to_dict()
+
+        async def replicate(db):
+            if not await db[DatabaseConfig.USERS_COLLECTION].find_one({"username": username}):
+                await db[DatabaseConfig.USERS_COLLECTION].insert_one(dict(user_data))
+        try:
+            await self._gather_fragments(replicate)
+            return True
+        except Exception as e:
+            print(f"Error creating user: {e}")
+            return False
+
+    async def get_user_by_emp_id(self, emp_id):
+        try:
+            return await self.replica_reader.read_async(
+                lambda db: db[DatabaseConfig.USERS_COLLECTION].find_one({"emp_id": emp_id})
+            )
+        except Exception as e:
+            print(f"Error getting user by emp_id: {e}")
+            return None
+
+    async def check_username_exists(self, username):
+        try:
+            user = await self.replica_reader.read_async(
+                lambda db: db[DatabaseConfig.USERS_COLLECTION].find_one({"username": username})
+            )
+            return user is not None
+        except Exception as e:
+            print(f"Error checking username: {e}")
+            return False
+
+    async def change_user_password(self, username, new_password):
+        """Change user password in every fragment concurrently"""
+        try:
+            loop = asyncio.get_running_loop()
+            hashed = await loop.run_in_executor(self._executor, bcrypt.hashpw, new_password.encode('utf-8'),
+                                                bcrypt.gensalt())
+            await self._gather_fragments(lambda db: db[DatabaseConfig.USERS_COLLECTION].update_one(
+                {"username": username}, {"$set": {"password": hashed.decode('utf-8')}}
+            ))
+            return True
+        except Exception as e:
+            print(f"Error changing password: {e}")
+            return False
+
+    # Employee Management
+    async def get_employee(self, emp_id):
+        try:
+            db = self.db_manager.get_database_for_employee(emp_id)
+            return await db[DatabaseConfig.EMPLOYEES_COLLECTION].find_one({"emp_id": int(emp_id)})
+        except Exception as e:
+            print(f"Error getting employee: {e}")
+            return None
+
+    async def get_all_employees(self):
+        try:
+            return await self._find_all(DatabaseConfig.EMPLOYEES_COLLECTION, key=lambda x: x['emp_id'])
+        except Exception as e:
+            print(f"Error getting all employees: {e}")
+            return []
+
+    async def create_employee(self, emp_id, name, email, phone, date_of_birth, department, position, salary):
+        return await self._run_sync("create_employee", emp_id, name, email, phone, date_of_birth,
+                                    department, position, salary)
+
+    async def update_employee(self, emp_id, update_data):
+        return await self._run_sync("update_employee", emp_id, update_data)
+
+    async def delete_employee(self, emp_id):
+        return await self._run_sync("delete_employee", emp_id)
+
+    # Department Management (replicated: writes go to every fragment at once, reads to the best replica)
+    async def create_department(self, dept_id, name, description, manager=None):
+        dept_data = Department(dept_id, name, description, manager).to_dict()
+
+        async def replicate(db):
+            if not await db[DatabaseConfig.DEPARTMENTS_COLLECTION].find_one({"dept_id": dept_id}):
+                await db[DatabaseConfig.DEPARTMENTS_COLLECTION].insert_one(dict(dept_data))
+                await self._inc_stats(db, departments=1)
+        try:
+            await self._gather_fragments(replicate)
+            return True
+        except Exception as e:
+            print(f"Error creating department: {e}")
+            return False
+
+    async def get_department(self, dept_id):
+        try:
+            return await self.replica_reader.read_async(
+                lambda db: db[DatabaseConfig.DEPARTMENTS_COLLECTION].find_one({"dept_id": dept_id})
+            )
+        except Exception as e:
+            print(f"Error getting department: {e}")
+            return None
+
+    async def update_department(self, dept_id, update_data):
+        try:
+            await self._gather_fragments(lambda db: db[DatabaseConfig.DEPARTMENTS_COLLECTION].update_one(
+                {"dept_id": dept_id}, {"$set": update_data}
+            ))
+            return True
+        except Exception as e:
+            print(f"Error updating department: {e}")
+            return False
+
+    async def delete_department(self, dept_id):
+        async def remove(db):
+            result = await db[DatabaseConfig.DEPARTMENTS_COLLECTION].delete_one({"dept_id": dept_id})
+            if result.deleted_count > 0:
+                await self._inc_stats(db, departments=-1)
+        try:
+            await self._gather_fragments(remove)
+            return True
+        except Exception as e:
+            print(f"Error deleting department: {e}")
+            return False
+
+    async def get_all_departments(self):
+        try:
+            return await self.replica_reader.read_async(
+                lambda db: to_list(db[DatabaseConfig.DEPARTMENTS_COLLECTION].find())
+            )
+        except Exception as e:
+            print(f"Error getting departments: {e}")
+            return []
+
+    async def get_department_member_count(self, department_name):
+        try:
+            counts = await self._gather_fragments(
+                lambda db: db[DatabaseConfig.EMPLOYEES_COLLECTION].count_documents({"department": department_name})
+            )
+            return sum(counts)
+        except Exception as e:
+            print(f"Error getting department member count: {e}")
+            return 0
+
+    # Leave Management
+    async def get_employee_leaves(self, emp_id):
+        try:
+            db = self.db_manager.get_database_for_employee(emp_id)
+            return await to_list(db[DatabaseConfig.LEAVES_COLLECTION].find({"emp_id": int(emp_id)}))
+        except Exception as e:
+            print(f"Error getting employee leaves: {e}")
+            return []
+
+    async def get_all_leaves(self):
+        try:
+            return await self._find_all(DatabaseConfig.LEAVES_COLLECTION, key=lambda x: x['applied_date'],
+                                        reverse=True, op_class="reporting")
+        except Exception as e:
+            print(f"Error getting all leaves: {e}")
+            return []
+
+    async def get_leaves_in_range(self, start_date, end_date, department=None, statuses=None):
+        query = {
+            "status": {"$in": statuses or ACTIVE_LEAVE_STATUSES},
+            "start_date": {"$lte": end_date},
+            "end_date": {"$gte": start_date}
+        }
+        if department:
+            query["department"] = department
+        try:
+            return await self._find_all(DatabaseConfig.LEAVES_COLLECTION, query,
+                                        key=lambda x: (x['start_date'], x['emp_id']))
+        except Exception as e:
+            print(f"Error getting leaves in range: {e}")
+            return []
+
+    async def find_pending_leaves(self, department=None, start_before=None, leave_type=None):
+        query = {"status": "Pending"}
+        if department:
+            query["department"] = department
+        if start_before:
+            query["start_date"] = {"$lte": start_before}
+        if leave_type:
+            query["leave_type"] = leave_type
+        # As in DatabaseService: a PartialResult, and other errors are raised rather than read as "none pending"
+        return await self._find_all(DatabaseConfig.LEAVES_COLLECTION, query,
+                                    key=lambda leave: (leave.get("start_date", ""), leave["emp_id"]), op_class="write")
+
+    async def apply_leave(self, emp_id, start_date, end_date, leave_type, reason):
+        return await self._run_sync("apply_leave", emp_id, start_date, end_date, leave_type, reason)
+
+    async def _find_leave_fragment(self, leave_id):
+        """Probe every fragment at once for the one holding a leave (None if no healthy fragment has it)"""
+        found, _ = await self.fragment_health.read_all_async(
+            self.db_manager.get_databases("write"),
+            lambda db: db[DatabaseConfig.LEAVES_COLLECTION].find_one({"_id": leave_id}, {"_id": 1})
+        )
+        return next((fragment for fragment, doc in found.items() if doc), None)
+
+    async def approve_leave(self, leave_id, approved_by):
+        try:
+            fragment = await self._find_leave_fragment(leave_id)
+        except Exception as e:
+            print(f"Error approving leave: {e}")
+            return False
+        if fragment is None:
+            return False
+        return await self._run_sync("approve_leave", leave_id, approved_by, fragment=fragment)
+
+    async def reject_leave(self, leave_id, rejected_by):
+        try:
+            fragment = await self._find_leave_fragment(leave_id)
+        except Exception as e:
+            print(f"Error rejecting leave: {e}")
+            return False
+        if fragment is None:
+            return False
+        return await self._run_sync("reject_leave", leave_id, rejected_by, fragment=fragment)
+
+    # Salary Management
+    async def get_employee_salaries(self, emp_id):
+        try:
+            db = self.db_manager.get_database_for_employee(emp_id)
+            return await to_list(db[DatabaseConfig.SALARIES_COLLECTION].find({"emp_id": int(emp_id)}))
+        except Exception as e:
+            print(f"Error getting employee salaries: {e}")
+            return []
+
+    async def get_all_salary_records(self):
+        try:
+            return await self._find_all(DatabaseConfig.SALARIES_COLLECTION,
+                                        key=lambda x: x.get('pay_date', x.get('created_at', datetime.now())),
+                                        reverse=True, op_class="reporting")
+        except Exception as e:
+            print(f"Error getting all salary records: {e}")
+            return []
+
+    async def add_salary_record_with_date(self, emp_id, pay_date, base_salary, allowances=0, deductions=0):
+        return await self._run_sync("add_salary_record_with_date", emp_id, pay_date, base_salary,
+                                    allowances, deductions)
+
+    # Statistics
+    async def get_dashboard_stats(self):
+        """Dashboard statistics from the per-fragment counter documents, read concurrently.
+
+        As in DatabaseService, fragments that do not answer are left out of the
+        totals and listed under "unavailable".
+        """
+        try:
+            counters, unavailable = await self.fragment_health.read_all_async(
+                self.db_manager.get_databases(),
+                lambda db: db[DatabaseConfig.STATS_COLLECTION].find_one({"_id": "dashboard"})
+            )
+            if not unavailable and any(not doc or "rebuilt_at" not in doc for doc in counters.values()):
+                # No baseline yet: the sync service rebuilds the counters and reads them back
+                return await self._run_sync("get_dashboard_stats")
+            counters = {name: doc or {} for name, doc in counters.items()}
+
+            def total(field):
+                return sum(doc.get(field, 0) for doc in counters.values())
+
+            return {
+                "total_employees": total("employees"),
+                # Departments are replicated, so any fragment that answered holds the full count
+                "total_departments": next(iter(counters.values()), {}).get("departments", 0),
+                "leave_applied": total("leave_applied"),
+                "leave_pending": total("leave_pending"),
+                "leave_approved": total("leave_approved"),
+                "leave_rejected": total("leave_rejected"),
+                "db_distribution": {name: doc.get("employees", 0) for name, doc in counters.items()},
+                "unavailable": unavailable
+            }
+        except Exception as e:
+            print(f"Error getting stats: {e}")
+            return await self._run_sync("get_dashboard_stats")
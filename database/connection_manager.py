@@ -1,31 +1,83 @@
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 from config.database_config import DatabaseConfig
+from database.memory_backend import get_memory_client
+from database.instrumentation import get_query_monitor, QueryListener
+from database.fault_injection import get_fault_injector
 import logging
 
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+_read_options = {}
+
+
+def read_options(op_class):
+    """with_options() keyword arguments for an operation class in DatabaseConfig.READ_PROFILES"""
+    if op_class not in _read_options:
+        if op_class not in DatabaseConfig.READ_PROFILES:
+            raise ValueError(f"Unknown operation class {op_class!r} (choose from {', '.join(DatabaseConfig.READ_PROFILES)})")
+        profile = DatabaseConfig.READ_PROFILES[op_class]
+        mode = READ_PREFERENCE_MODES[profile["read_preference"]]
+        # Primary reads are never stale, so pymongo rejects max_staleness for them
+        read_preference = mode() if mode is Primary else mode(max_staleness=profile["max_staleness"])
+        _read_options[op_class] = {
+            "read_preference": read_preference,
+            "read_concern": ReadConcern(profile["read_concern"]),
+        }
+    return _read_options[op_class]
+
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, client_options=None):
         self.client = None
+        self.client_options = client_options or {}  # overrides of DatabaseConfig.client_options()
         self.databases = {}
         self._connect_to_cluster()
     
     def _connect_to_cluster(self):
         """Connect to MongoDB Atlas cluster and access multiple databases"""
         try:
-            # Single client connection to the cluster
-            self.client = MongoClient(
-                DatabaseConfig.MONGO_URI,
-                serverSelectionTimeoutMS=5000
-            )
+            # Command timings go to the shared query monitor when instrumentation is on
+            monitor = get_query_monitor() if DatabaseConfig.QUERY_INSTRUMENTATION else None
+            
+            # Single client connection to the cluster (or the shared in-process one)
+            if DatabaseConfig.BACKEND == "memory":
+                self.client = get_memory_client()
+                if monitor:
+                    self.client.add_event_listener(monitor)
+            else:
+                self.client = MongoClient(
+                    DatabaseConfig.MONGO_URI,
+                    **DatabaseConfig.client_options(
+                        event_listeners=[QueryListener(monitor)] if monitor else None,
+                        **self.client_options
+                    )
+                )
             
             # Access different databases within the same cluster
             self.databases['db1'] = self.client[DatabaseConfig.DB1_NAME]
             self.databases['db2'] = self.client[DatabaseConfig.DB2_NAME]
             self.databases['db3'] = self.client[DatabaseConfig.DB3_NAME]
+            # Reads not routed to another operation class use the interactive profile
+            self.databases = self.get_databases("interactive")
+            
+            # Route fragment calls through the fault injector when resilience testing is on
+            if DatabaseConfig.FAULT_INJECTION:
+                self.databases = get_fault_injector().wrap(self.databases)
             
             # Test connection
             self.client.admin.command('ping')
-            print("✅ Connected to MongoDB Atlas cluster")
+            if DatabaseConfig.BACKEND == "memory":
+                print("✅ Using in-memory backend (data is not persisted)")
+            else:
+                print("✅ Connected to MongoDB Atlas cluster")
             print(f"✅ Database 1: {DatabaseConfig.DB1_NAME}")
             print(f"✅ Database 2: {DatabaseConfig.DB2_NAME}")
             print(f"✅ Database 3: {DatabaseConfig.DB3_NAME}")
@@ -34,21 +86,36 @@ class DatabaseManager:
             print(f"❌ Database connection error: {e}")
             raise
     
-    def get_database_for_employee(self, emp_id):
-        """Determine which database to use based on employee ID (Range Fragmentation)"""
+    def get_fragment_for_employee(self, emp_id):
+        """Determine which fragment key ('db1', 'db2', 'db3') holds an employee ID"""
         emp_id = int(emp_id)
         if DatabaseConfig.DB1_RANGE[0] <= emp_id <= DatabaseConfig.DB1_RANGE[1]:
-            return self.databases['db1']
+            return 'db1'
         elif DatabaseConfig.DB2_RANGE[0] <= emp_id <= DatabaseConfig.DB2_RANGE[1]:
-            return self.databases['db2']
+            return 'db2'
         elif DatabaseConfig.DB3_RANGE[0] <= emp_id <= DatabaseConfig.DB3_RANGE[1]:
-            return self.databases['db3']
+            return 'db3'
         else:
             raise ValueError(f"Employee ID {emp_id} is out of range (1-3000)!")
     
-    def get_all_databases(self):
+    def get_database_for_employee(self, emp_id, op_class=None):
+        """Determine which database to use based on employee ID (Range Fragmentation)"""
+        return self.get_databases(op_class)[self.get_fragment_for_employee(emp_id)]
+    
+    def get_databases(self, op_class=None):
+        """{fragment: database}, routed per DatabaseConfig.READ_PROFILES when an operation class is given.
+        
+        The plain handles use the "interactive" profile (set at connect time). The
+        in-memory backend has no replicas, so it ignores read routing.
+        """
+        if op_class is None or DatabaseConfig.BACKEND == "memory":
+            return self.databases
+        options = read_options(op_class)
+        return {fragment: db.with_options(**options) for fragment, db in self.databases.items()}
+    
+    def get_all_databases(self, op_class=None):
         """Get all databases for operations that need to query all fragments"""
-        return list(self.databases.values())
+        return list(self.get_databases(op_class).values())
     
     def get_database_info(self):
         """Get information about which database an employee ID would use"""
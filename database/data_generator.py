@@ -0,0 +1,369 @@
+import argparse
+import calendar
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from config.database_config import DatabaseConfig
+from config.leave_config import LeaveConfig
+from database.init_data import DEFAULT_DEPARTMENTS
+from models.employee import Employee
+from models.leave import Leave
+
+FIRST_NAMES = [
+    "Aisha", "Arif", "Bidhan", "Chitra", "Dipu", "Farhan", "Farzana", "Habib", "Imran", "Jannat",
+    "Kamal", "Laila", "Mahmud", "Mim", "Nabil", "Nadia", "Omar", "Priya", "Rafiq", "Rumana",
+    "Sabbir", "Sadia", "Shakil", "Tahmina", "Tanvir", "Urmi", "Wasim", "Yasmin", "Zahid", "Zarin",
+]
+
+LAST_NAMES = [
+    "Ahmed", "Akter", "Alam", "Banerjee", "Begum", "Chowdhury", "Das", "Haque", "Hossain", "Islam",
+    "Kabir", "Karim", "Khan", "Mahmud", "Miah", "Rahman", "Roy", "Saha", "Sarker", "Uddin",
+]
+
+# Department name -> (share of headcount, [(position, share within department, annual salary band)])
+DEPARTMENT_PROFILES = {
+    "Information Technology": (0.30, [
+        ("Software Developer", 0.55, (60000, 110000)),
+        ("QA Engineer", 0.20, (50000, 80000)),
+        ("System Administrator", 0.15, (55000, 90000)),
+        ("Engineering Manager", 0.10, (100000, 150000)),
+    ]),
+    "Operations": (0.25, [
+        ("Operations Associate", 0.60, (35000, 55000)),
+        ("Logistics Coordinator", 0.25, (40000, 65000)),
+        ("Operations Manager", 0.15, (80000, 110000)),
+    ]),
+    "Finance": (0.15, [
+        ("Accountant", 0.50, (50000, 75000)),
+        ("Financial Analyst", 0.35, (60000, 90000)),
+        ("Finance Manager", 0.15, (90000, 130000)),
+    ]),
+    "Marketing": (0.15, [
+        ("Marketing Specialist", 0.55, (45000, 75000)),
+        ("Content Writer", 0.30, (40000, 60000)),
+        ("Marketing Manager", 0.15, (85000, 120000)),
+    ]),
+    "Human Resources": (0.15, [
+        ("Recruiter", 0.50, (45000, 65000)),
+        ("HR Generalist", 0.35, (50000, 70000)),
+        ("HR Manager", 0.15, (80000, 110000)),
+    ]),
+}
+
+# Leave type -> (relative frequency, (shortest, longest) duration in calendar days)
+LEAVE_PROFILES = {
+    "Sick Leave": (35, (1, 3)),
+    "Vacation": (40, (3, 10)),
+    "Personal": (15, (1, 2)),
+    "Emergency": (8, (1, 2)),
+    "Maternity/Paternity": (2, (30, 90)),
+}
+
+DEFAULT_STATUS_MIX = {"Approved": 0.70, "Pending": 0.10, "Rejected": 0.20}
+
+# Collections the generator writes (users and departments are left alone; rollups and counters are rebuilt)
+GENERATED_COLLECTIONS = [
+    DatabaseConfig.EMPLOYEES_COLLECTION,
+    DatabaseConfig.SALARIES_COLLECTION,
+    DatabaseConfig.LEAVES_COLLECTION,
+    DatabaseConfig.LEAVE_BALANCES_COLLECTION,
+    DatabaseConfig.LEAVE_LEDGER_COLLECTION,
+]
+
+
+def _month_end(year, month):
+    return datetime(year, month, calendar.monthrange(year, month)[1])
+
+
+class DataGenerator:
+    """Deterministic synthetic employees, salary histories and leave histories.
+
+    Every employee draws from its own Random seeded with (seed, emp_id), so the
+    same seed always yields the same people and histories no matter how many
+    employees are generated or which already exist. Documents are produced
+    lazily and written with insert_many in batches per fragment, keeping memory
+    bounded for million-record fixtures.
+    """
+
+    def __init__(self, db_service, seed=42, years=3, leaves_per_year=4, status_mix=None,
+                 until=None, batch_size=10000):
+        self.db_service = db_service
+        self.db_manager = db_service.db_manager
+        self.seed = seed
+        self.years = years
+        self.leaves_per_year = leaves_per_year
+        self.status_mix = status_mix or DEFAULT_STATUS_MIX
+        today = until or datetime.now()
+        self.until = (today.year, today.month)
+        self.batch_size = batch_size
+        self.counts = {}
+
+    def _window(self):
+        """Month indexes (year * 12 + month - 1) of the first and last month of history"""
+        last = self.until[0] * 12 + self.until[1] - 1
+        return last - (self.years * 12 - 1), last
+
+    def _rng(self, emp_id):
+        return random.Random(f"{self.seed}:{emp_id}")
+
+    @staticmethod
+    def _pick(rng, weighted):
+        """Pick a key from {key: weight}"""
+        keys = list(weighted)
+        return rng.choices(keys, weights=[weighted[key] for key in keys])[0]
+
+    def employee_ids(self, count):
+        """Spread count IDs evenly over the three fragment ranges"""
+        ranges = [DatabaseConfig.DB1_RANGE, DatabaseConfig.DB2_RANGE, DatabaseConfig.DB3_RANGE]
+        capacity = sum(high - low + 1 for low, high in ranges)
+        if count > capacity:
+            raise ValueError(f"Cannot place {count} employees, the fragment ranges hold {capacity}")
+        ids = []
+        for index, (low, high) in enumerate(ranges):
+            share = count // len(ranges) + (1 if index < count % len(ranges) else 0)
+            step = (high - low + 1) / share if share else 0
+            ids.extend(low + int(position * step) for position in range(share))
+        return ids
+
+    # Document builders
+    def build_employee(self, emp_id):
+        rng = self._rng(emp_id)
+        department = self._pick(rng, {name: profile[0] for name, profile in DEPARTMENT_PROFILES.items()})
+        positions = DEPARTMENT_PROFILES[department][1]
+        position, _, (low, high) = rng.choices(positions, weights=[p[1] for p in positions])[0]
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+        # Most people joined inside the history window; a quarter were already on staff before it
+        months_back = rng.randint(0, self.years * 12 + max(3, self.years * 4))
+        join_year, join_month = divmod(self.until[0] * 12 + self.until[1] - 1 - months_back, 12)
+        join_date = datetime(join_year, join_month + 1, rng.randint(1, 28))
+        birth_year = join_year - rng.randint(21, 45)
+
+        employee = Employee(
+            emp_id,
+            f"{first} {last}",
+            f"{first.lower()}.{last.lower()}{emp_id}@company.com",
+            f"01{rng.choice('3456789')}{rng.randint(10000000, 99999999)}",
+            department,
+            position,
+            round(rng.uniform(low, high), -2),
+            f"{birth_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            join_date
+        ).to_dict()
+        employee["created_at"] = join_date
+        # Marks the people reset() may delete (with everything keyed to their emp_id)
+        employee["generated"] = True
+        return employee
+
+    def build_salaries(self, employee):
+        """One record per month from the later of joining and the window start up to `until`"""
+        rng = self._rng(f"salary:{employee['emp_id']}")
+        window_first, window_last = self._window()
+        joined = employee["join_date"].year * 12 + employee["join_date"].month - 1
+
+        for index in range(max(window_first, joined), window_last + 1):
+            y, m = index // 12, index % 12 + 1
+            # Current salary, discounted ~3% for every year back
+            base = round(employee["salary"] / 1.03 ** (self.until[0] - y) / 12, 2)
+            allowances = round(base * rng.uniform(0, 0.10), 2)
+            deductions = round(base * rng.uniform(0.05, 0.12), 2)
+            pay_date = _month_end(y, m)
+            yield {
+                "_id": ObjectId(),
+                "emp_id": employee["emp_id"],
+                "pay_date": pay_date,
+                "month": pay_date.strftime("%B"),
+                "year": y,
+                "base_salary": base,
+                "allowances": allowances,
+                "deductions": deductions,
+                "net_salary": round(base + allowances - deductions, 2),
+                "created_at": pay_date
+            }
+
+    def build_leaves(self, employee):
+        """Non-overlapping leaves within the window, statuses drawn from the status mix"""
+        rng = self._rng(f"leave:{employee['emp_id']}")
+        window_first, _ = self._window()
+        start = max(employee["join_date"], datetime(window_first // 12, window_first % 12 + 1, 1))
+        end = _month_end(*self.until)
+        total_days = (end - start).days
+        if total_days <= 0:
+            return []
+
+        expected = self.leaves_per_year * total_days / 365
+        count = max(0, round(rng.gauss(expected, max(1.0, expected / 3))))
+        offsets = sorted(rng.sample(range(total_days), min(count, total_days)))
+
+        leaves = []
+        busy_until = None
+        for offset in offsets:
+            leave_type = self._pick(rng, {name: profile[0] for name, profile in LEAVE_PROFILES.items()})
+            shortest, longest = LEAVE_PROFILES[leave_type][1]
+            first_day = start + timedelta(days=offset)
+            last_day = first_day + timedelta(days=rng.randint(shortest, longest) - 1)
+            if (busy_until and first_day <= busy_until) or last_day > end:
+                continue
+            busy_until = last_day
+
+            leave = Leave(
+                employee["emp_id"],
+                first_day.strftime("%Y-%m-%d"),
+                last_day.strftime("%Y-%m-%d"),
+                leave_type,
+                f"{leave_type} request",
+                employee["department"]
+            ).to_dict()
+            leave["_id"] = ObjectId()
+            leave["applied_date"] = first_day - timedelta(days=rng.randint(1, 30))
+            leave["status"] = self._pick(rng, self.status_mix)
+            # Decided leaves carry the fields approve_leave / reject_leave write
+            decided = leave["applied_date"] + timedelta(days=rng.randint(0, 3))
+            if leave["status"] == "Approved":
+                leave["approved_by"] = "admin"
+                leave["approved_date"] = decided
+            elif leave["status"] == "Rejected":
+                leave["rejected_by"] = "admin"
+                leave["rejected_date"] = decided
+            leaves.append(leave)
+        return leaves
+
+    def build_leave_accounts(self, employee, leaves):
+        """Balance document and ledger entries consistent with the employee's approved leaves"""
+        entitlements = dict(LeaveConfig.ENTITLEMENTS)
+        balances = dict(entitlements)
+        ledger = [
+            {"emp_id": employee["emp_id"], "leave_type": leave_type, "kind": "accrual", "days": days,
+             "leave_id": None, "note": "Annual entitlement", "created_at": employee["join_date"]}
+            for leave_type, days in entitlements.items()
+        ]
+        approved = [leave for leave in leaves if leave["status"] == "Approved"]
+        for leave, days in zip(approved, self.db_service.leave_calendar.working_days_for_leaves(approved)):
+            balances[leave["leave_type"]] = balances.get(leave["leave_type"], 0) - int(days)
+            ledger.append({"emp_id": employee["emp_id"], "leave_type": leave["leave_type"], "kind": "approval",
+                           "days": -int(days), "leave_id": leave["_id"], "note": "",
+                           "created_at": leave["approved_date"]})
+        balance = {"emp_id": employee["emp_id"], "balances": balances, "updated_at": datetime.now()}
+        return balance, ledger
+
+    # Writing
+    def _flush(self, db, buffers, force=False):
+        for collection, documents in buffers.items():
+            if documents and (force or len(documents) >= self.batch_size):
+                db[collection].insert_many(documents, ordered=False)
+                self.counts[collection] = self.counts.get(collection, 0) + len(documents)
+                documents.clear()
+
+    def generate_fragment(self, fragment, emp_ids):
+        """Build and bulk-insert everything for the employees of one fragment"""
+        db = self.db_manager.databases[fragment]
+        existing = set(db[DatabaseConfig.EMPLOYEES_COLLECTION].distinct("emp_id", {"emp_id": {"$in": emp_ids}}))
+        buffers = {collection: [] for collection in GENERATED_COLLECTIONS}
+
+        for emp_id in emp_ids:
+            if emp_id in existing:
+                continue
+            employee = self.build_employee(emp_id)
+            leaves = self.build_leaves(employee)
+            balance, ledger = self.build_leave_accounts(employee, leaves)
+
+            buffers[DatabaseConfig.EMPLOYEES_COLLECTION].append(employee)
+            buffers[DatabaseConfig.SALARIES_COLLECTION].extend(self.build_salaries(employee))
+            buffers[DatabaseConfig.LEAVES_COLLECTION].extend(leaves)
+            buffers[DatabaseConfig.LEAVE_BALANCES_COLLECTION].append(balance)
+            buffers[DatabaseConfig.LEAVE_LEDGER_COLLECTION].extend(ledger)
+            self._flush(db, buffers)
+        self._flush(db, buffers, force=True)
+        return len(emp_ids) - len(existing)
+
+    def reset(self):
+        """Delete the generated employees and their salaries, leaves and leave accounts.
+        
+        Only employees tagged by build_employee go, so real records (and users and
+        departments) are kept; the rollups and dashboard counters are rebuilt for them.
+        """
+        for db in self.db_manager.get_all_databases():
+            emp_ids = db[DatabaseConfig.EMPLOYEES_COLLECTION].distinct("emp_id", {"generated": True})
+            if not emp_ids:
+                continue
+            for collection in GENERATED_COLLECTIONS:
+                db[collection].delete_many({"emp_id": {"$in": emp_ids}})
+        self.db_service.rebuild_payroll_rollups()
+        self.db_service.rebuild_dashboard_stats()
+        self.db_service.salary_snapshot.invalidate()
+        self.db_service.analytics.invalidate()
+        self.db_service.employee_index = None
+
+    def generate(self, employees):
+        """Generate `employees` people with their histories, then rebuild the derived data"""
+        self.counts = {}
+        self.db_service.ensure_indexes()
+        for dept_id, name, description in DEFAULT_DEPARTMENTS:
+            self.db_service.create_department(dept_id, name, description)
+
+        by_fragment = {}
+        for emp_id in self.employee_ids(employees):
+            by_fragment.setdefault(self.db_manager.get_fragment_for_employee(emp_id), []).append(emp_id)
+
+        created = 0
+        for fragment, emp_ids in by_fragment.items():
+            created += self.generate_fragment(fragment, emp_ids)
+
+        # Rollups, counters and caches are derived from the raw documents
+        self.db_service.rebuild_payroll_rollups()
+        self.db_service.rebuild_dashboard_stats()
+        self.db_service.salary_snapshot.invalidate()
+        self.db_service.analytics.invalidate()
+        self.db_service.employee_index = None
+        return created
+
+
+def parse_status_mix(text):
+    """Parse "Approved=0.7,Pending=0.1,Rejected=0.2" into a weight mapping"""
+    mix = {}
+    for part in text.split(","):
+        status, _, weight = part.partition("=")
+        mix[status.strip()] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate deterministic DEMS fixture data")
+    parser.add_argument("--employees", type=int, default=300, help="number of employees (max 3000)")
+    parser.add_argument("--years", type=int, default=3, help="years of monthly salary and leave history")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--leaves-per-year", type=float, default=4, help="average leave requests per employee per year")
+    parser.add_argument("--status-mix", type=parse_status_mix, default=DEFAULT_STATUS_MIX,
+                        help="leave status weights, e.g. Approved=0.7,Pending=0.1,Rejected=0.2")
+    parser.add_argument("--until", type=lambda value: datetime.strptime(value, "%Y-%m"), default=None,
+                        help="last month of history as YYYY-MM (default: current month)")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--reset", action="store_true", help="delete previously generated data first")
+    args = parser.parse_args(argv)
+
+    from database.services import DatabaseService
+    generator = DataGenerator(
+        DatabaseService(),
+        seed=args.seed,
+        years=args.years,
+        leaves_per_year=args.leaves_per_year,
+        status_mix=args.status_mix,
+        until=args.until,
+        batch_size=args.batch_size
+    )
+
+    started = time.perf_counter()
+    if args.reset:
+        print("🧹 Removing previously generated data...")
+        generator.reset()
+    created = generator.generate(args.employees)
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ Generated {created} employees in {elapsed:.1f}s")
+    for collection, count in generator.counts.items():
+        print(f"   {collection}: {count:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import csv
+import heapq
+import json
+import os
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING
+from config.database_config import DatabaseConfig
+
+EXPORT_FORMATS = ("csv", "jsonl", "xlsx")
+
+SALARY_COLUMNS = ["emp_id", "name", "department", "pay_date", "month", "year",
+                  "base_salary", "allowances", "deductions", "net_salary"]
+
+EMPLOYEE_COLUMNS = ["emp_id", "name", "email", "phone", "department", "position",
+                    "salary", "date_of_birth", "join_date", "status"]
+
+
+def _format_value(value):
+    """Render dates as ISO strings so every output format agrees"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+class _CsvWriter:
+    def __init__(self, path, columns):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write_row(self, row):
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path, columns):
+        self._file = open(path, "w", encoding="utf-8")
+        self._columns = columns
+
+    def write_row(self, row):
+        self._file.write(json.dumps(dict(zip(self._columns, row)), default=str))
+        self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class _XlsxWriter:
+    def __init__(self, path, columns):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise RuntimeError("XLSX export requires openpyxl (pip install openpyxl)")
+        # Write-only workbooks stream rows to disk instead of keeping every cell in memory
+        self._path = path
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+        self._sheet.append(columns)
+
+    def write_row(self, row):
+        self._sheet.append(row)
+
+    def close(self):
+        self._workbook.save(self._path)
+
+
+WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "xlsx": _XlsxWriter}
+
+
+class StreamingExporter:
+    """Export salary history and employee lists without materializing them.
+
+    Every fragment is read through its own cursor with a bounded batch size, the
+    already-sorted cursors are merged lazily with heapq.merge, and each row is
+    written as soon as it comes off the merge. Memory therefore stays at roughly
+    one batch per fragment plus the employee name/department lookup.
+    """
+
+    def __init__(self, db_manager, batch_size=1000):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+
+    @staticmethod
+    def detect_format(path, fmt=None):
+        """Pick the output format from an explicit name or the file extension"""
+        fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt or path}")
+        return fmt
+
+    def _databases_for(self, emp_id=None):
+        # Exports are long scans, so they read from secondaries where the profile allows
+        if emp_id is not None:
+            return [self.db_manager.get_database_for_employee(emp_id, "reporting")]
+        return self.db_manager.get_all_databases("reporting")
+
+    def _employee_lookup(self, db, department=None):
+        """{emp_id: (name, department)} for one fragment, projected to just those fields"""
+        query = {"department": department} if department else {}
+        return {
+            employee["emp_id"]: (employee.get("name", "Unknown"), employee.get("department", "N/A"))
+            for employee in db[DatabaseConfig.EMPLOYEES_COLLECTION].find(
+                query, {"emp_id": 1, "name": 1, "department": 1}, batch_size=self.batch_size
+            )
+        }
+
+    def _salary_stream(self, db, emp_id=None, department=None, from_date=None, to_date=None):
+        """One fragment's salary rows, newest pay date first"""
+        lookup = self._employee_lookup(db, department)
+        query = {}
+        if emp_id is not None:
+            query["emp_id"] = int(emp_id)
+        elif department:
+            query["emp_id"] = {"$in": list(lookup)}
+        if from_date or to_date:
+            query["pay_date"] = {}
+            if from_date:
+                query["pay_date"]["$gte"] = from_date
+            if to_date:
+                query["pay_date"]["$lte"] = to_date
+
+        cursor = db[DatabaseConfig.SALARIES_COLLECTION].find(query, batch_size=self.batch_size).sort(
+            [("pay_date", DESCENDING), ("_id", DESCENDING)]
+        )
+        for record in cursor:
+            name, dept = lookup.get(record["emp_id"], ("Unknown", "N/A"))
+            base_salary = record.get("base_salary", 0)
+            allowances = record.get("allowances", record.get("bonus", 0))
+            deductions = record.get("deductions", 0)
+            row = [
+                record["emp_id"], name, dept, _format_value(record.get("pay_date")),
+                record.get("month"), record.get("year"), base_salary, allowances, deductions,
+                record.get("net_salary", base_salary + allowances - deductions)
+            ]
+            # Missing pay dates sort last, as they do in the descending cursor
+            yield (record.get("pay_date") or datetime.min, record["_id"]), row
+
+    def iter_salary_rows(self, emp_id=None, department=None, from_date=None, to_date=None):
+        """Salary rows from every relevant fragment merged newest first"""
+        streams = [
+            self._salary_stream(db, emp_id, department, from_date, to_date)
+            for db in self._databases_for(emp_id)
+        ]
+        for _, row in heapq.merge(*streams, key=lambda item: item[0], reverse=True):
+            yield row
+
+    def _employee_stream(self, db, department=None):
+        query = {"department": department} if department else {}
+        cursor = db[DatabaseConfig.EMPLOYEES_COLLECTION].find(query, batch_size=self.batch_size).sort("emp_id", ASCENDING)
+        for employee in cursor:
+            yield employee["emp_id"], [_format_value(employee.get(column)) for column in EMPLOYEE_COLUMNS]
+
+    def iter_employee_rows(self, department=None):
+        """Employee rows from every fragment merged by emp_id"""
+        streams = [self._employee_stream(db, department) for db in self.db_manager.get_all_databases("reporting")]
+        for _, row in heapq.merge(*streams, key=lambda item: item[0]):
+            yield row
+
+    def _write(self, path, fmt, columns, rows):
+        writer = WRITERS[self.detect_format(path, fmt)](path, columns)
+        count = 0
+        try:
+            for row in rows:
+                writer.write_row(row)
+                count += 1
+        finally:
+            writer.close()
+        return count
+
+    def export_salaries(self, path, fmt=None, emp_id=None, department=None, from_date=None, to_date=None):
+        """Stream matching salary records to a CSV/JSONL/XLSX file; returns the number of rows written"""
+        rows = self.iter_salary_rows(emp_id, department, from_date, to_date)
+        return self._write(path, fmt, SALARY_COLUMNS, rows)
+
+    def export_employees(self, path, fmt=None, department=None):
+        """Stream the employee list to a CSV/JSONL/XLSX file; returns the number of rows written"""
+        return self._write(path, fmt, EMPLOYEE_COLUMNS, self.iter_employee_rows(department))
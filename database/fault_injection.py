@@ -0,0 +1,308 @@
+import inspect
+import random
+import threading
+import time
+from collections import Counter
+from fnmatch import fnmatchcase
+from pymongo.errors import AutoReconnect, NetworkTimeout, ServerSelectionTimeoutError
+from config.database_config import DatabaseConfig
+from database.fragment_health import remaining_ms
+
+# Injected errors are the ones the real client raises, so the offline journal and retries react as they would live
+FAULT_ERRORS = {
+    "timeout": NetworkTimeout,
+    "network": AutoReconnect,
+}
+
+# Documents in the reply to find() before pymongo issues a getMore (the server default)
+FIRST_BATCH_SIZE = 101
+
+_injector = None
+_injector_lock = threading.Lock()
+
+
+def get_fault_injector():
+    """Shared injector, loaded from DEMS_FAULTS / DEMS_FAULT_SEED on first use"""
+    global _injector
+    with _injector_lock:
+        if _injector is None:
+            _injector = FaultInjector(seed=DatabaseConfig.FAULT_SEED)
+            if DatabaseConfig.FAULTS:
+                _injector.load_spec(DatabaseConfig.FAULTS)
+        return _injector
+
+
+class FaultRule:
+    """Latency, jitter, errors or an outage for the operations matching fragment/operation.
+
+    fragment matches the fragment key ("db2") or database name ("ems_db2"), and
+    operation the collection method ("find", "insert_one"); both take shell-style
+    wildcards, so "find*" covers find, find_one and find_one_and_update.
+    """
+
+    def __init__(self, fragment="*", operation="*", latency_ms=0, jitter_ms=0, error_rate=0, error="timeout",
+                 down=False):
+        if error not in FAULT_ERRORS:
+            raise ValueError(f"Unknown fault error {error!r} (choose from {', '.join(FAULT_ERRORS)})")
+        self.fragment = fragment
+        self.operation = operation
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate = float(error_rate)
+        self.error = error
+        self.down = down
+
+    def matches(self, fragment, database_name, operation):
+        return (fnmatchcase(fragment, self.fragment) or fnmatchcase(database_name, self.fragment)) \
+            and fnmatchcase(operation, self.operation)
+
+    def to_spec(self):
+        options = []
+        if self.down:
+            options.append("down")
+        if self.latency_ms:
+            options.append(f"latency={self.latency_ms:g}")
+        if self.jitter_ms:
+            options.append(f"jitter={self.jitter_ms:g}")
+        if self.error_rate:
+            options.append(f"errors={self.error_rate:g}")
+        if self.error != "timeout":
+            options.append(f"error={self.error}")
+        return f"{self.fragment}/{self.operation}:{','.join(options)}"
+
+    def __repr__(self):
+        return f"FaultRule({self.to_spec()})"
+
+
+class FaultInjector:
+    """Injects latency, jitter, errors and outages into fragment operations.
+
+    Rules come from DEMS_FAULTS or are added at runtime, e.g. to take ems_db2
+    down while db1 and db3 stay healthy:
+
+        DEMS_FAULTS="db2:down"
+        DEMS_FAULTS="db2/find*:latency=800,jitter=200; */insert_*:errors=0.05,error=network"
+
+    A spec is a ";"-separated list of fragment[/operation]:options, where options
+    are down, latency=MS, jitter=MS, errors=RATE and error=timeout|network. A
+    fixed seed (DEMS_FAULT_SEED) makes the jitter and error draws reproducible.
+    Fragment handles only pick the rules up once wrapped, which DatabaseManager
+    does when DEMS_FAULTS or DEMS_FAULT_INJECTION=1 is set (or see install()).
+    """
+
+    def __init__(self, rules=None, seed=None):
+        self.rules = list(rules or [])
+        self.injected = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_spec(spec):
+        rules = []
+        for part in spec.split(";"):
+            part = part.strip()
+            if not part:
+                continue
+            target, _, options = part.partition(":")
+            fragment, _, operation = target.strip().partition("/")
+            settings = {}
+            for option in filter(None, (o.strip() for o in options.split(","))):
+                name, _, value = option.partition("=")
+                if name == "down":
+                    settings["down"] = True
+                elif name in ("latency", "jitter"):
+                    settings[f"{name}_ms"] = float(value)
+                elif name == "errors":
+                    settings["error_rate"] = float(value)
+                elif name == "error":
+                    settings["error"] = value
+                else:
+                    raise ValueError(f"Unknown fault option {name!r} in {part!r}")
+            rules.append(FaultRule(fragment or "*", operation or "*", **settings))
+        return rules
+
+    def load_spec(self, spec):
+        rules = self.parse_spec(spec)
+        with self._lock:
+            self.rules.extend(rules)
+        return rules
+
+    def add_rule(self, fragment="*", operation="*", **settings):
+        rule = FaultRule(fragment, operation, **settings)
+        with self._lock:
+            self.rules.append(rule)
+        return rule
+
+    def remove_rule(self, rule):
+        with self._lock:
+            if rule in self.rules:
+                self.rules.remove(rule)
+
+    def take_down(self, fragment, operation="*", timeout_ms=0):
+        """Full outage: every matching call waits timeout_ms, then fails server selection"""
+        return self.add_rule(fragment, operation, down=True, latency_ms=timeout_ms)
+
+    def bring_up(self, fragment):
+        """Remove the outage rules for a fragment"""
+        with self._lock:
+            self.rules = [rule for rule in self.rules if not (rule.down and rule.fragment == fragment)]
+
+    def clear(self, fragment=None):
+        with self._lock:
+            self.rules = [rule for rule in self.rules if fragment is not None and rule.fragment != fragment]
+            if fragment is None:
+                self.injected.clear()
+
+    def reseed(self, seed):
+        with self._lock:
+            self._random.seed(seed)
+
+    def inject(self, fragment, database_name, operation):
+        """Apply the matching rules to one call: sleep, then raise if it should fail"""
+        with self._lock:
+            rules = [rule for rule in self.rules if rule.matches(fragment, database_name, operation)]
+            if not rules:
+                return
+            delay_ms = 0.0
+            error = None
+            for rule in rules:
+                delay_ms += rule.latency_ms
+                if rule.jitter_ms:
+                    delay_ms += self._random.uniform(-rule.jitter_ms, rule.jitter_ms)
+                if error is None and rule.down:
+                    error = ServerSelectionTimeoutError(f"{database_name} is down (injected fault)")
+                    self.injected[(fragment, "outage")] += 1
+                elif error is None and rule.error_rate and self._random.random() < rule.error_rate:
+                    error = FAULT_ERRORS[rule.error](f"{database_name}.{operation} failed (injected fault)")
+                    self.injected[(fragment, rule.error)] += 1
+            if delay_ms > 0:
+                self.injected[(fragment, "delayed")] += 1
+
+        # Like pymongo.timeout(), an enclosing fragment deadline cuts the wait short
+        budget = remaining_ms()
+        if budget is not None and delay_ms > budget:
+            time.sleep(budget / 1000)
+            raise NetworkTimeout(f"{database_name}.{operation} timed out after the deadline (injected latency)")
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        if error is not None:
+            raise error
+
+    def report(self):
+        """{fragment: {"delayed": n, "outage": n, "timeout": n, ...}} of faults injected so far"""
+        with self._lock:
+            summary = {}
+            for (fragment, kind), count in self.injected.items():
+                summary.setdefault(fragment, {})[kind] = count
+            return summary
+
+    def wrap(self, databases):
+        """Wrap {fragment: database} handles (pymongo or in-memory) so calls go through the injector"""
+        return {
+            fragment: database if isinstance(database, FaultyDatabase) else FaultyDatabase(database, fragment, self)
+            for fragment, database in databases.items()
+        }
+
+    def install(self, db_manager):
+        """Wrap an existing DatabaseManager's fragments (for tests and benchmarks set up in code)"""
+        db_manager.databases = self.wrap(db_manager.databases)
+        return self
+
+
+def _is_collection(value):
+    return hasattr(value, "insert_one") and hasattr(value, "find")
+
+
+class FaultyCursor:
+    """Defers the fault to the first fetch, as pymongo's find() does with the round trip.
+    
+    Documents past the first batch cost one more round trip, injected as "getMore".
+    """
+
+    def __init__(self, cursor, collection):
+        self._cursor = cursor
+        self._collection = collection
+        self._started = False
+        self._fetched = 0
+
+    def _start(self):
+        if not self._started:
+            self._started = True
+            self._collection._inject("find")
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._start()
+        document = next(self._cursor)
+        self._fetched += 1
+        if self._fetched == FIRST_BATCH_SIZE + 1:
+            self._collection._inject("getMore")
+        return document
+
+    def __getattr__(self, name):
+        attribute = getattr(self._cursor, name)
+        if not inspect.ismethod(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            # Chaining (sort/limit/skip) keeps the wrapper
+            return self if result is self._cursor else result
+        return call
+
+
+class FaultyCollection:
+    def __init__(self, collection, database):
+        self._collection = collection
+        self._database = database
+
+    def _inject(self, operation):
+        self._database._injector.inject(self._database._fragment, self._database.name, operation)
+
+    def find(self, *args, **kwargs):
+        return FaultyCursor(self._collection.find(*args, **kwargs), self)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if not inspect.ismethod(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            if name == "with_options":
+                return FaultyCollection(attribute(*args, **kwargs), self._database)
+            self._inject(name)
+            return attribute(*args, **kwargs)
+        return call
+
+
+class FaultyDatabase:
+    """A fragment's database handle with faults injected into its collections and commands"""
+
+    def __init__(self, database, fragment, injector):
+        self._database = database
+        self._fragment = fragment
+        self._injector = injector
+        self.name = database.name
+
+    def __getitem__(self, name):
+        return FaultyCollection(self._database[name], self)
+
+    def get_collection(self, name, **kwargs):
+        return FaultyCollection(self._database.get_collection(name, **kwargs), self)
+
+    def with_options(self, **kwargs):
+        return FaultyDatabase(self._database.with_options(**kwargs), self._fragment, self._injector)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._database, name)
+        if _is_collection(attribute):
+            return FaultyCollection(attribute, self)
+        if not inspect.ismethod(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            self._injector.inject(self._fragment, self.name, name)
+            return attribute(*args, **kwargs)
+        return call
@@ -0,0 +1,236 @@
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+import pymongo
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+from config.database_config import DatabaseConfig
+
+# Errors that mean "this fragment did not answer in time", as opposed to a bad query
+UNAVAILABLE_ERRORS = (ConnectionFailure, ExecutionTimeout)
+
+# The asyncio paths bound each fragment with asyncio.wait_for, which raises its own timeout
+ASYNC_UNAVAILABLE_ERRORS = UNAVAILABLE_ERRORS + (asyncio.TimeoutError,)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_deadline = contextvars.ContextVar("dems_fragment_deadline", default=None)
+
+_health = None
+_health_lock = threading.Lock()
+
+
+def get_fragment_health():
+    """Shared fragment health registry (one per process, like the write journal)"""
+    global _health
+    with _health_lock:
+        if _health is None:
+            _health = FragmentHealth()
+        return _health
+
+
+@contextmanager
+def deadline(ms):
+    """Bound every operation in the block to ms, including server selection (pymongo.timeout)"""
+    token = _deadline.set(time.perf_counter() + ms / 1000)
+    try:
+        with pymongo.timeout(ms / 1000):
+            yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_ms():
+    """Milliseconds left of the enclosing deadline(), or None outside one"""
+    end = _deadline.get()
+    if end is None:
+        return None
+    return max(0.0, (end - time.perf_counter()) * 1000)
+
+
+class PartialResult(list):
+    """Documents from the fragments that answered; .unavailable lists the ones that did not"""
+
+    def __init__(self, items=(), unavailable=()):
+        super().__init__(items)
+        self.unavailable = sorted(unavailable)
+
+    @property
+    def partial(self):
+        return bool(self.unavailable)
+
+    def describe(self):
+        return f"partial: {', '.join(self.unavailable)} unavailable" if self.unavailable else ""
+
+
+class CircuitBreaker:
+    """Stops calling a fragment after repeated failures, then lets one probe through after a cool-down.
+
+    closed: calls go through; failure_threshold consecutive failures open it.
+    open: calls are refused until reset_timeout seconds have passed.
+    half_open: one trial call; success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, fragment, failure_threshold=None, reset_timeout=None):
+        self.fragment = fragment
+        self.failure_threshold = failure_threshold or DatabaseConfig.BREAKER_FAILURES
+        self.reset_timeout = reset_timeout if reset_timeout is not None else DatabaseConfig.BREAKER_RESET_SECONDS
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+            return self.state == CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.last_error = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"⚠️ Circuit opened for {self.fragment}: {error}")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def status(self):
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, round(self.reset_timeout - (time.monotonic() - self.opened_at), 1))
+            return {"state": self.state, "failures": self.failures, "last_error": self.last_error,
+                    "retry_in": retry_in}
+
+
+class FragmentHealth:
+    """Per-fragment circuit breakers and deadlines for cross-fragment reads.
+
+    A fragment that is down costs one short deadline (DEMS_FRAGMENT_DEADLINE_MS)
+    per read until its breaker opens (the deadline covers reaching the fragment
+    and its first reply, not draining a long cursor); after that it is skipped outright and the
+    read returns what the healthy fragments had, marked as partial.
+    """
+
+    def __init__(self, deadline_ms=None, failure_threshold=None, reset_timeout=None):
+        self.deadline_ms = deadline_ms or DatabaseConfig.FRAGMENT_DEADLINE_MS
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, fragment):
+        with self._lock:
+            if fragment not in self.breakers:
+                self.breakers[fragment] = CircuitBreaker(fragment, self.failure_threshold, self.reset_timeout)
+            return self.breakers[fragment]
+
+    def read_all(self, databases, read, drain=False):
+        """Run read(db) per fragment within the deadline.
+        
+        With drain=True read(db) returns a cursor and only server selection and its
+        first batch run within the deadline; the rest is drained under the client's
+        socket timeout, so a large but healthy fragment is neither cut off nor counted
+        against its breaker. A fragment that fails while draining is still reported.
+        
+        Returns ({fragment: result} for the fragments that answered, [fragments that did not]).
+        """
+        results = {}
+        unavailable = []
+        for fragment, db in databases.items():
+            breaker = self.breaker(fragment)
+            if not breaker.allow():
+                unavailable.append(fragment)
+                continue
+            try:
+                with deadline(self.deadline_ms):
+                    result = read(db)
+                    if drain:
+                        result = iter(result)
+                        head = list(itertools.islice(result, 1))
+            except UNAVAILABLE_ERRORS as e:
+                breaker.record_failure(e)
+                unavailable.append(fragment)
+                continue
+            breaker.record_success()
+            if drain:
+                try:
+                    result = head + list(result)
+                except UNAVAILABLE_ERRORS:
+                    # It answered within the deadline: only this read is short, the breaker stays closed
+                    unavailable.append(fragment)
+                    continue
+            results[fragment] = result
+        return results, unavailable
+
+    async def read_all_async(self, databases, read, drain=False):
+        """asyncio version of read_all: await read(db) on every fragment concurrently.
+        
+        Each fragment is bounded by asyncio.wait_for(deadline); one that times out
+        or cannot be reached is reported as unavailable instead of failing the
+        gather, while any other error is raised as read_all would. With drain=True
+        read(db) returns an async cursor and, as in read_all, only its first batch
+        is bounded by the deadline.
+        """
+        async def attempt(db):
+            if not drain:
+                return await asyncio.wait_for(read(db), self.deadline_ms / 1000)
+            cursor = read(db)
+            return cursor, await asyncio.wait_for(cursor.to_list(1), self.deadline_ms / 1000)
+
+        allowed = [fragment for fragment in databases if self.breaker(fragment).allow()]
+        unavailable = [fragment for fragment in databases if fragment not in allowed]
+        outcomes = await asyncio.gather(*(attempt(databases[fragment]) for fragment in allowed),
+                                        return_exceptions=True)
+        results = {}
+        error = None
+        for fragment, outcome in zip(allowed, outcomes):
+            breaker = self.breaker(fragment)
+            if isinstance(outcome, ASYNC_UNAVAILABLE_ERRORS):
+                breaker.record_failure(str(outcome) or "deadline exceeded")
+                unavailable.append(fragment)
+            elif isinstance(outcome, BaseException):
+                error = error or outcome
+            else:
+                breaker.record_success()
+                results[fragment] = outcome
+        if error is not None:
+            raise error
+        if drain:
+            started = list(results.items())
+            rests = await asyncio.gather(*(cursor.to_list(None) for cursor, head in results.values()),
+                                         return_exceptions=True)
+            results = {}
+            for (fragment, (cursor, head)), rest in zip(started, rests):
+                if isinstance(rest, ASYNC_UNAVAILABLE_ERRORS):
+                    unavailable.append(fragment)
+                elif isinstance(rest, BaseException):
+                    raise rest
+                else:
+                    results[fragment] = head + rest
+        return results, sorted(unavailable)
+
+    def unavailable_fragments(self):
+        """Fragments whose breaker is currently open"""
+        with self._lock:
+            breakers = list(self.breakers.values())
+        return sorted(breaker.fragment for breaker in breakers if breaker.status()["state"] == OPEN)
+
+    def status(self):
+        with self._lock:
+            breakers = dict(self.breakers)
+        return {fragment: breaker.status() for fragment, breaker in sorted(breakers.items())}
@@ -1,6 +1,15 @@
 from database.services import DatabaseService
 from datetime import datetime
 
+# (dept_id, name, description) of the departments every installation starts with
+DEFAULT_DEPARTMENTS = [
+    ("HR", "Human Resources", "Manages employee relations and policies"),
+    ("IT", "Information Technology", "Handles technology infrastructure and support"),
+    ("FIN", "Finance", "Manages company finances and accounting"),
+    ("MKT", "Marketing", "Handles marketing and promotional activities"),
+    ("OPS", "Operations", "Manages day-to-day business operations")
+]
+
 class DataInitializer:
     def __init__(self):
         self.db_service = DatabaseService()
@@ -9,6 +18,12 @@ class DataInitializer:
         """Initialize the system with default data"""
         print("🚀 Initializing DEMS with default data...")
         
+        # Make sure the service indexes exist in every fragment
+        self.db_service.ensure_indexes()
+        self.db_service.backfill_leave_departments()
+        # Installs that predate the payroll rollups get them built once
+        self.db_service.backfill_payroll_rollups()
+        
         # Create default admin user
         self.create_default_admin()
         
@@ -39,15 +54,7 @@ class DataInitializer:
     
     def create_default_departments(self):
         """Create default departments"""
-        departments = [
-            ("HR", "Human Resources", "Manages employee relations and policies"),
-            ("IT", "Information Technology", "Handles technology infrastructure and support"),
-            ("FIN", "Finance", "Manages company finances and accounting"),
-            ("MKT", "Marketing", "Handles marketing and promotional activities"),
-            ("OPS", "Operations", "Manages day-to-day business operations")
-        ]
-        
-        for dept_id, name, description in departments:
+        for dept_id, name, description in DEFAULT_DEPARTMENTS:
             try:
                 success = self.db_service.create_department(dept_id, name, description)
                 if success:
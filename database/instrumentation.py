@@ -0,0 +1,368 @@
+import functools
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from bson import encode as bson_encode
+from pymongo import monitoring
+from config.database_config import DatabaseConfig
+
+logger = logging.getLogger("dems.queries")
+
+# Handshake/auth/session housekeeping, not something a GUI action asked for
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue",
+                    "authenticate", "getnonce", "endSessions", "buildInfo", "killCursors"}
+
+QueryRecord = namedtuple(
+    "QueryRecord",
+    "action database collection command duration_ms documents reply_bytes failed timestamp"
+)
+
+# The ActionStats of the GUI action currently running in this thread/context, if any
+_current_action = ContextVar("dems_current_action", default=None)
+# Set while a tracked DatabaseService call runs, so nested service calls are timed once
+_in_service_call = ContextVar("dems_in_service_call", default=False)
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_query_monitor():
+    """The process-wide query monitor, shared by every DatabaseManager"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = QueryMonitor(
+                slow_ms=DatabaseConfig.SLOW_QUERY_MS,
+                very_slow_ms=DatabaseConfig.VERY_SLOW_QUERY_MS,
+                action_query_warn=DatabaseConfig.ACTION_QUERY_WARN,
+                log_path=DatabaseConfig.SLOW_QUERY_LOG,
+            )
+        return _monitor
+
+
+def _reply_documents(reply):
+    """Documents returned (cursor batches) or affected (writes) by one command reply"""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "n" in reply:
+        return reply["n"]
+    if "values" in reply:
+        return len(reply["values"])
+    return 0
+
+
+def _encoded_size(document):
+    try:
+        return len(bson_encode(document))
+    except Exception:
+        return 0
+
+
+class ActionStats:
+    """Queries, database time and bytes attributed to one run of a GUI action"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_ms = None
+        self.service_ms = 0.0
+        self.counters = {}
+        self.queries = 0
+        self.failed = 0
+        self.db_ms = 0.0
+        self.documents = 0
+        self.reply_bytes = 0
+        self.commands = {}
+
+    def add(self, record):
+        self.queries += 1
+        self.failed += record.failed
+        self.db_ms += record.duration_ms
+        self.documents += record.documents
+        self.reply_bytes += record.reply_bytes
+        key = f"{record.collection}.{record.command}"
+        self.commands[key] = self.commands.get(key, 0) + 1
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        return {
+            "action": self.name,
+            "queries": self.queries,
+            "failed": self.failed,
+            "wall_ms": round(self.wall_ms, 2) if self.wall_ms is not None else None,
+            "service_ms": round(self.service_ms, 2),
+            "db_ms": round(self.db_ms, 2),
+            "documents": self.documents,
+            "kb": round(self.reply_bytes / 1024, 1),
+            "commands": dict(self.commands),
+            "counters": dict(self.counters),
+        }
+
+    def __str__(self):
+        wall = f", {self.wall_ms:.1f} ms wall" if self.wall_ms is not None else ""
+        return (f"{self.name}: {self.queries} queries, {self.db_ms:.1f} ms in database{wall}, "
+                f"{self.reply_bytes / 1024:.1f} KB, {self.documents} documents")
+
+
+class QueryMonitor:
+    """Collects per-command timings and attributes them to the GUI action that caused them.
+
+    Records come from QueryListener (pymongo command monitoring) or straight
+    from the in-memory backend. Commands slower than slow_ms are logged as
+    warnings and slower than very_slow_ms as errors; an action issuing more
+    than action_query_warn queries is logged as a likely N+1.
+    """
+
+    def __init__(self, slow_ms=100, very_slow_ms=500, action_query_warn=25, log_path=None,
+                 history=1000, action_history=200):
+        self.slow_ms = slow_ms
+        self.very_slow_ms = very_slow_ms
+        self.action_query_warn = action_query_warn
+        self.records = deque(maxlen=history)
+        self.slow_queries = deque(maxlen=history)
+        self.recent_actions = deque(maxlen=action_history)
+        self.totals = {}
+        self._lock = threading.Lock()
+        if log_path and not any(getattr(h, "baseFilename", None) for h in logger.handlers):
+            handler = logging.FileHandler(log_path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            logger.addHandler(handler)
+
+    # Recording
+    def record_command(self, database, collection, command, duration_ms, documents=0, reply_bytes=0,
+                       failed=False, action=None):
+        """Record one command; action defaults to the one active in the calling context"""
+        action = action if action is not None else _current_action.get()
+        record = QueryRecord(action.name if action else None, database, collection, command,
+                             duration_ms, documents, reply_bytes, failed, time.time())
+        with self._lock:
+            self.records.append(record)
+            if action is not None:
+                action.add(record)
+            if duration_ms >= self.slow_ms:
+                self.slow_queries.append(record)
+
+        if duration_ms >= self.slow_ms:
+            level = logging.ERROR if duration_ms >= self.very_slow_ms else logging.WARNING
+            logger.log(level, "Slow query %.1f ms: %s.%s %s (%d documents, %.1f KB) during %s",
+                       duration_ms, database, collection, command, documents, reply_bytes / 1024,
+                       record.action or "background work")
+        return record
+
+    # Action tagging
+    def current_action(self):
+        return _current_action.get()
+
+    def count(self, name, amount=1):
+        """Add to a named counter (e.g. Treeview rows inserted) of the current action, if any"""
+        stats = _current_action.get()
+        if stats is not None:
+            with self._lock:
+                stats.count(name, amount)
+
+    def start_action(self, name):
+        """Begin attributing queries in this context to name. Returns (stats, token) or None when nested."""
+        if _current_action.get() is not None:
+            return None
+        stats = ActionStats(name)
+        return stats, _current_action.set(stats)
+
+    def finish_action(self, started):
+        if started is None:
+            return None
+        stats, token = started
+        _current_action.reset(token)
+        stats.wall_ms = (time.perf_counter() - stats.started) * 1000
+        with self._lock:
+            self.recent_actions.append(stats)
+            total = self.totals.setdefault(stats.name, {"runs": 0, "queries": 0, "db_ms": 0.0,
+                                                        "wall_ms": 0.0, "reply_bytes": 0})
+            total["runs"] += 1
+            total["queries"] += stats.queries
+            total["db_ms"] += stats.db_ms
+            total["wall_ms"] += stats.wall_ms
+            total["reply_bytes"] += stats.reply_bytes
+
+        if stats.queries > self.action_query_warn:
+            logger.warning("Possible N+1: %s (%s)", stats,
+                           ", ".join(f"{k} x{v}" for k, v in sorted(stats.commands.items(), key=lambda i: -i[1])[:5]))
+        else:
+            logger.info("%s", stats)
+        return stats
+
+    @contextmanager
+    def action(self, name):
+        """Tag every query inside the block with name (nested actions join the outer one)"""
+        started = self.start_action(name)
+        try:
+            yield started[0] if started else _current_action.get()
+        finally:
+            self.finish_action(started)
+
+    # Reporting
+    def last_action(self, name=None, prefixes=None):
+        """Most recent finished action, optionally by exact name or name prefixes"""
+        with self._lock:
+            for stats in reversed(self.recent_actions):
+                if (name is None or stats.name == name) and (prefixes is None or stats.name.startswith(prefixes)):
+                    return stats
+        return None
+
+    def action_summaries(self):
+        """Per-action averages over every recorded run, busiest first"""
+        with self._lock:
+            totals = {name: dict(total) for name, total in self.totals.items()}
+        summaries = []
+        for name, total in totals.items():
+            runs = total["runs"]
+            summaries.append({
+                "action": name,
+                "runs": runs,
+                "avg_queries": round(total["queries"] / runs, 1),
+                "avg_db_ms": round(total["db_ms"] / runs, 2),
+                "avg_wall_ms": round(total["wall_ms"] / runs, 2),
+                "avg_kb": round(total["reply_bytes"] / runs / 1024, 1),
+            })
+        summaries.sort(key=lambda s: -s["avg_db_ms"] * s["runs"])
+        return summaries
+
+    def report(self):
+        lines = [f"{'action':<32} {'runs':>5} {'queries':>8} {'db ms':>9} {'wall ms':>9} {'KB':>8}"]
+        for s in self.action_summaries():
+            lines.append(f"{s['action']:<32} {s['runs']:>5} {s['avg_queries']:>8} {s['avg_db_ms']:>9} "
+                         f"{s['avg_wall_ms']:>9} {s['avg_kb']:>8}")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self.slow_queries.clear()
+            self.recent_actions.clear()
+            self.totals.clear()
+
+
+class QueryListener(monitoring.CommandListener):
+    """pymongo command listener feeding a QueryMonitor.
+
+    pymongo publishes started/succeeded events on the thread running the
+    operation, so the action is read from the context at start time and kept
+    with the pending command until its reply arrives.
+    """
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event):
+        return event.connection_id, event.request_id
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        with self._lock:
+            self._pending[self._key(event)] = (_current_action.get(), collection if isinstance(collection, str) else None)
+
+    def _finish(self, event, reply, failed):
+        with self._lock:
+            pending = self._pending.pop(self._key(event), None)
+        if pending is None:
+            return
+        action, collection = pending
+        self.monitor.record_command(
+            event.database_name, collection, event.command_name, event.duration_micros / 1000,
+            documents=_reply_documents(reply) if reply else 0,
+            reply_bytes=_encoded_size(reply) if reply else 0,
+            failed=failed, action=action,
+        )
+
+    def succeeded(self, event):
+        self._finish(event, event.reply, failed=False)
+
+    def failed(self, event):
+        self._finish(event, None, failed=True)
+
+
+def bind_action(fn):
+    """Wrap fn so it runs under the caller's current action, e.g. on a worker thread"""
+    stats = _current_action.get()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        token = _current_action.set(stats)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_action.reset(token)
+    return run
+
+
+def track_actions(obj, prefixes, monitor=None):
+    """Tag queries with the name of the obj method that caused them.
+
+    Every method whose name starts with one of prefixes is replaced on the
+    instance by a wrapper running it inside monitor.action(name). Call this
+    before widgets capture bound methods as button commands.
+    """
+    monitor = monitor or get_query_monitor()
+    for name in dir(type(obj)):
+        if not name.startswith(prefixes):
+            continue
+        method = getattr(obj, name)
+        if not callable(method):
+            continue
+
+        setattr(obj, name, _tracked(monitor, name, method))
+    return monitor
+
+
+def _tracked(monitor, name, method):
+    @functools.wraps(method)
+    def run(*args, **kwargs):
+        with monitor.action(name):
+            return method(*args, **kwargs)
+    return run
+
+
+def track_service_calls(service, monitor=None):
+    """Time the public methods of a DatabaseService into the current action's service_ms.
+
+    Only the outermost call is timed, so service methods calling each other are
+    not counted twice. Together with wall_ms this splits an action into time
+    spent in the service layer and time spent building widgets.
+    """
+    monitor = monitor or get_query_monitor()
+    for name in dir(type(service)):
+        if name.startswith("_"):
+            continue
+        method = getattr(service, name)
+        if callable(method):
+            setattr(service, name, _timed_service_call(monitor, method))
+    return monitor
+
+
+def _timed_service_call(monitor, method):
+    @functools.wraps(method)
+    def run(*args, **kwargs):
+        stats = _current_action.get()
+        if stats is None or _in_service_call.get():
+            return method(*args, **kwargs)
+        token = _in_service_call.set(True)
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _in_service_call.reset(token)
+            with monitor._lock:
+                stats.service_ms += (time.perf_counter() - started) * 1000
+    return run
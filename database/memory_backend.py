@@ -0,0 +1,923 @@
+import functools
+import re
+import threading
+import time
+from datetime import datetime
+from bson import ObjectId, encode as bson_encode
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure
+from pymongo.operations import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.results import (InsertOneResult, InsertManyResult, UpdateResult, DeleteResult,
+                             BulkWriteResult)
+
+_MISSING = object()
+
+# BSON comparison order, so mixed-type fields sort the way MongoDB sorts them
+_TYPE_ORDER = {type(None): 1, int: 2, float: 2, str: 3, dict: 4, list: 5, bytes: 6,
+               ObjectId: 7, bool: 8, datetime: 9}
+
+_TYPE_ALIASES = {
+    "null": (type(None),), "int": (int,), "long": (int,), "double": (float,), "number": (int, float),
+    "string": (str,), "object": (dict,), "array": (list,), "bool": (bool,), "date": (datetime,),
+    "objectId": (ObjectId,), "binData": (bytes,),
+}
+
+
+def _copy(value):
+    """Copy a document the way a BSON round trip would (containers only, leaves are immutable)"""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _sort_key(value):
+    if value is _MISSING:
+        value = None
+    rank = _TYPE_ORDER.get(type(value), 10)
+    if isinstance(value, bool):
+        return (8, value)
+    if isinstance(value, (dict, list)):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple((k, _hashable(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _get_path(document, path):
+    value = document
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+
+def _set_path(document, path, value):
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        target = target.setdefault(part, {})
+    target[parts[-1]] = value
+
+
+def _unset_path(document, path):
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return
+    target.pop(parts[-1], None)
+
+
+def _compare(left, right, op):
+    if left is _MISSING or _TYPE_ORDER.get(type(left)) != _TYPE_ORDER.get(type(right)):
+        return False
+    try:
+        return op(left, right)
+    except TypeError:
+        return False
+
+
+def _equals(value, expected):
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def _match_condition(value, condition):
+    """Match one field value against a literal or an operator document"""
+    if not (isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition)):
+        return _equals(value, condition)
+
+    for op, operand in condition.items():
+        if op == "$eq":
+            matched = _equals(value, operand)
+        elif op == "$ne":
+            matched = not _equals(value, operand)
+        elif op == "$gt":
+            matched = _compare(value, operand, lambda a, b: a > b)
+        elif op == "$gte":
+            matched = _compare(value, operand, lambda a, b: a >= b)
+        elif op == "$lt":
+            matched = _compare(value, operand, lambda a, b: a < b)
+        elif op == "$lte":
+            matched = _compare(value, operand, lambda a, b: a <= b)
+        elif op == "$in":
+            matched = any(_equals(value, candidate) for candidate in operand)
+        elif op == "$nin":
+            matched = not any(_equals(value, candidate) for candidate in operand)
+        elif op == "$exists":
+            matched = (value is not _MISSING) == bool(operand)
+        elif op == "$type":
+            types = sum((_TYPE_ALIASES[name] for name in ([operand] if isinstance(operand, str) else operand)), ())
+            matched = value is not _MISSING and isinstance(value, types) and not (
+                isinstance(value, bool) and bool not in types)
+        elif op == "$regex":
+            matched = isinstance(value, str) and re.search(operand, value, re.I if "i" in condition.get("$options", "") else 0)
+        elif op == "$options":
+            continue
+        elif op == "$not":
+            matched = not _match_condition(value, operand)
+        else:
+            raise OperationFailure(f"Unsupported query operator {op}")
+        if not matched:
+            return False
+    return True
+
+
+def matches(document, query):
+    """True if a document satisfies a MongoDB query filter"""
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, sub) for sub in condition):
+                return False
+        elif not _match_condition(_get_path(document, key), condition):
+            return False
+    return True
+
+
+def apply_update(document, update, inserting=False):
+    """Apply an update document in place; returns True if anything changed"""
+    before = _copy(document)
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            for path, value in fields.items():
+                _set_path(document, path, _copy(value))
+        elif op == "$setOnInsert":
+            continue
+        elif op == "$unset":
+            for path in fields:
+                _unset_path(document, path)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get_path(document, path)
+                _set_path(document, path, (0 if current is _MISSING else current) + amount)
+        elif op == "$push":
+            for path, value in fields.items():
+                current = _get_path(document, path)
+                _set_path(document, path, ([] if current is _MISSING else current) + [_copy(value)])
+        else:
+            raise OperationFailure(f"Unsupported update operator {op}")
+    return document != before
+
+
+def project(document, projection):
+    """Apply an inclusion or exclusion projection"""
+    if not projection:
+        return document
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    exclude = {k for k, v in projection.items() if not v and k != "_id"}
+    # {"_id": 1} on its own is an inclusion projection of just _id
+    if include or (not exclude and projection.get("_id", 0)):
+        result = {}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        for path in include:
+            value = _get_path(document, path)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+        return result
+    result = dict(document)
+    for path, flag in projection.items():
+        if not flag:
+            _unset_path(result, path)
+    return result
+
+
+def _normalize_sort(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(key, direction) for key, direction in key_or_list]
+
+
+def sort_documents(documents, spec):
+    for key, direction in reversed(spec):
+        documents.sort(key=lambda doc: _sort_key(_get_path(doc, key)), reverse=direction == -1)
+    return documents
+
+
+# Aggregation expressions and accumulators
+def evaluate(expression, document):
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get_path(document, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        op, operand = next(iter(expression.items()))
+        if op.startswith("$"):
+            if op in ("$year", "$month", "$dayOfMonth"):
+                value = evaluate(operand, document)
+                if not isinstance(value, datetime):
+                    return None
+                return {"$year": value.year, "$month": value.month, "$dayOfMonth": value.day}[op]
+            args = [evaluate(arg, document) for arg in (operand if isinstance(operand, list) else [operand])]
+            if op == "$add":
+                return sum(args)
+            if op == "$subtract":
+                return args[0] - args[1]
+            if op == "$multiply":
+                result = 1
+                for arg in args:
+                    result *= arg
+                return result
+            if op == "$divide":
+                return args[0] / args[1]
+            if op == "$ifNull":
+                return next((arg for arg in args if arg is not None), None)
+            if op == "$toString":
+                return None if args[0] is None else str(args[0])
+            raise OperationFailure(f"Unsupported expression operator {op}")
+    if isinstance(expression, dict):
+        return {key: evaluate(value, document) for key, value in expression.items()}
+    return expression
+
+
+def _accumulate(op, values):
+    present = [value for value in values if value is not None]
+    if op == "$sum":
+        return sum(value for value in present if isinstance(value, (int, float)) and not isinstance(value, bool))
+    if op == "$avg":
+        numbers = [value for value in present if isinstance(value, (int, float))]
+        return sum(numbers) / len(numbers) if numbers else None
+    if op == "$min":
+        return min(present, key=_sort_key) if present else None
+    if op == "$max":
+        return max(present, key=_sort_key) if present else None
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$last":
+        return values[-1] if values else None
+    if op == "$push":
+        return list(values)
+    if op == "$addToSet":
+        unique = {}
+        for value in values:
+            unique.setdefault(_hashable(value), value)
+        return list(unique.values())
+    raise OperationFailure(f"Unsupported accumulator {op}")
+
+
+def run_pipeline(documents, pipeline):
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            documents = [doc for doc in documents if matches(doc, spec)]
+        elif name == "$group":
+            groups = {}
+            for doc in documents:
+                group_id = evaluate(spec["_id"], doc)
+                groups.setdefault(_hashable(group_id), (group_id, []))[1].append(doc)
+            documents = []
+            for group_id, members in groups.values():
+                row = {"_id": group_id}
+                for field, accumulator in spec.items():
+                    if field == "_id":
+                        continue
+                    (op, expression), = accumulator.items()
+                    row[field] = _accumulate(op, [evaluate(expression, member) for member in members])
+                documents.append(row)
+        elif name == "$project":
+            includes_expressions = any(not isinstance(v, (int, bool)) for v in spec.values())
+            if includes_expressions:
+                projected = []
+                for doc in documents:
+                    row = {"_id": doc.get("_id")} if spec.get("_id", 1) else {}
+                    for field, value in spec.items():
+                        if field == "_id" and isinstance(value, (int, bool)):
+                            continue
+                        row[field] = _get_path(doc, field) if value in (1, True) else evaluate(value, doc)
+                    projected.append({k: v for k, v in row.items() if v is not _MISSING})
+                documents = projected
+            else:
+                documents = [project(doc, spec) for doc in documents]
+        elif name == "$sort":
+            documents = sort_documents(list(documents), list(spec.items()))
+        elif name == "$limit":
+            documents = documents[:spec]
+        elif name == "$skip":
+            documents = documents[spec:]
+        elif name == "$count":
+            documents = [{spec: len(documents)}] if documents else []
+        elif name == "$unwind":
+            path = (spec["path"] if isinstance(spec, dict) else spec)[1:]
+            unwound = []
+            for doc in documents:
+                for item in _get_path(doc, path) if isinstance(_get_path(doc, path), list) else []:
+                    row = _copy(doc)
+                    _set_path(row, path, item)
+                    unwound.append(row)
+            documents = unwound
+        else:
+            raise OperationFailure(f"Unsupported aggregation stage {name}")
+    return documents
+
+
+def _documents_size(documents):
+    size = 0
+    for document in documents:
+        try:
+            size += len(bson_encode(document))
+        except Exception:
+            pass
+    return size
+
+
+def _result_summary(result):
+    """(documents, reply bytes) of a collection method result, for event listeners"""
+    if result is None:
+        return 0, 0
+    if isinstance(result, dict):
+        return 1, _documents_size([result])
+    if isinstance(result, list):
+        return len(result), _documents_size(result)
+    if isinstance(result, InsertOneResult):
+        return 1, 0
+    if isinstance(result, InsertManyResult):
+        return len(result.inserted_ids), 0
+    if isinstance(result, BulkWriteResult):
+        raw = result.bulk_api_result
+        return raw["nInserted"] + raw["nUpserted"] + raw["nMatched"] + raw["nRemoved"], 0
+    if isinstance(result, (UpdateResult, DeleteResult)):
+        return result.raw_result.get("n", 0), 0
+    return 0, 0
+
+
+def _observed(command):
+    """Publish a collection method call to the client's event listeners, like pymongo command monitoring.
+
+    Calls made from inside another observed call (bulk_write -> insert_one) are not published again.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def run(self, *args, **kwargs):
+            client = self.database.client
+            if not client.event_listeners or getattr(client._local, "observing", False):
+                return method(self, *args, **kwargs)
+            client._local.observing = True
+            started = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                client._local.observing = False
+                self._publish(command, started, failed=True)
+                raise
+            client._local.observing = False
+            self._publish(command, started, *_result_summary(result))
+            return result
+        return run
+    return decorate
+
+
+class _Index:
+    """Hash index over a compound key; the leading field also serves equality lookups"""
+
+    def __init__(self, name, keys, unique=False):
+        self.name = name
+        self.keys = keys
+        self.unique = unique
+        self.entries = {}
+        self.by_lead = {}
+        self.multikey = False
+
+    def key_for(self, document):
+        values = []
+        for field, _ in self.keys:
+            value = _get_path(document, field)
+            if isinstance(value, list):
+                self.multikey = True
+            values.append(_hashable(None if value is _MISSING else value))
+        return tuple(values)
+
+    def check(self, document, doc_id):
+        if not self.unique:
+            return
+        holders = self.entries.get(self.key_for(document), ())
+        if any(holder != doc_id for holder in holders):
+            raise DuplicateKeyError(f"E11000 duplicate key error index: {self.name} dup key: {self.key_for(document)}")
+
+    def add(self, document, doc_id):
+        key = self.key_for(document)
+        self.entries.setdefault(key, set()).add(doc_id)
+        self.by_lead.setdefault(key[0], set()).add(doc_id)
+
+    def remove(self, document, doc_id):
+        key = self.key_for(document)
+        for mapping, map_key in ((self.entries, key), (self.by_lead, key[0])):
+            holders = mapping.get(map_key)
+            if holders is not None:
+                holders.discard(doc_id)
+                if not holders:
+                    del mapping[map_key]
+
+    def candidates(self, query):
+        """Document ids that can match the query, or None if this index can't narrow it"""
+        if self.multikey:
+            return None
+        lead = self.keys[0][0]
+        if lead not in query:
+            return None
+        condition = query[lead]
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if "$eq" in condition:
+                values = [condition["$eq"]]
+            elif "$in" in condition:
+                values = condition["$in"]
+            else:
+                return None
+        else:
+            values = [condition]
+        found = set()
+        for value in values:
+            if isinstance(value, (dict, list)):
+                return None
+            found |= self.by_lead.get(value, set())
+        return found
+
+
+class MemoryCursor:
+    """Lazily evaluated cursor supporting the chaining pymongo's Cursor offers"""
+
+    def __init__(self, collection, query, projection=None, sort=None, limit=0, skip=0, **kwargs):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = _normalize_sort(sort) if sort else None
+        self._limit = limit
+        self._skip = skip
+        self._results = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def batch_size(self, batch_size):
+        return self
+
+    def _evaluate(self):
+        started = time.perf_counter()
+        documents = self._collection._select(self._query)
+        if self._sort:
+            sort_documents(documents, self._sort)
+        if self._skip:
+            documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        results = [project(_copy(doc), self._projection) for doc in documents]
+        client = self._collection.database.client
+        if client.event_listeners and not getattr(client._local, "observing", False):
+            self._collection._publish("find", started, len(results), _documents_size(results))
+        return iter(results)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._results is None:
+            self._results = self._evaluate()
+        return next(self._results)
+
+    def close(self):
+        self._results = iter(())
+
+
+class MemoryCollection:
+    """In-process collection implementing the subset of pymongo's Collection API DEMS uses"""
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self._documents = {}
+        self._sequence = {}
+        self._next_sequence = 0
+        self._indexes = {"_id_": _Index("_id_", [("_id", 1)], unique=True)}
+        self._lock = threading.RLock()
+
+    @property
+    def full_name(self):
+        return f"{self.database.name}.{self.name}"
+
+    # Internals
+    def _publish(self, command, started, documents=0, reply_bytes=0, failed=False):
+        duration_ms = (time.perf_counter() - started) * 1000
+        for listener in self.database.client.event_listeners:
+            listener.record_command(self.database.name, self.name, command, duration_ms,
+                                    documents=documents, reply_bytes=reply_bytes, failed=failed)
+
+    def _select(self, query):
+        """Matching documents (live references, callers copy) using an index when one applies"""
+        with self._lock:
+            candidate_ids = None
+            for index in self._indexes.values():
+                found = index.candidates(query or {})
+                if found is not None and (candidate_ids is None or len(found) < len(candidate_ids)):
+                    candidate_ids = found
+            if candidate_ids is None:
+                pool = self._documents.values()
+            else:
+                # Keep natural (insertion) order, as a collection scan would return them
+                pool = [self._documents[doc_id] for doc_id in sorted(candidate_ids, key=self._sequence.__getitem__)]
+            return [doc for doc in pool if matches(doc, query)]
+
+    def _store(self, document):
+        doc_id = document["_id"]
+        if doc_id in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error index: _id_ dup key: {(_hashable(doc_id),)}")
+        for index in self._indexes.values():
+            index.check(document, doc_id)
+        for index in self._indexes.values():
+            index.add(document, doc_id)
+        self._documents[doc_id] = document
+        self._sequence[doc_id] = self._next_sequence
+        self._next_sequence += 1
+
+    def _replace_stored(self, old, new):
+        doc_id = old["_id"]
+        for index in self._indexes.values():
+            index.remove(old, doc_id)
+        try:
+            for index in self._indexes.values():
+                index.check(new, doc_id)
+        except DuplicateKeyError:
+            for index in self._indexes.values():
+                index.add(old, doc_id)
+            raise
+        for index in self._indexes.values():
+            index.add(new, doc_id)
+        self._documents[doc_id] = new
+
+    def _discard(self, document):
+        for index in self._indexes.values():
+            index.remove(document, document["_id"])
+        del self._documents[document["_id"]]
+        del self._sequence[document["_id"]]
+
+    def _upsert_document(self, query, update=None, replacement=None):
+        document = {}
+        for key, condition in query.items():
+            if key.startswith("$"):
+                continue
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                if "$eq" in condition:
+                    _set_path(document, key, _copy(condition["$eq"]))
+                continue
+            _set_path(document, key, _copy(condition))
+        if replacement is not None:
+            document = {**({"_id": document["_id"]} if "_id" in document else {}), **_copy(replacement)}
+        else:
+            apply_update(document, update, inserting=True)
+        document.setdefault("_id", ObjectId())
+        self._store(document)
+        return document["_id"]
+
+    def _update(self, query, update, upsert, multi):
+        with self._lock:
+            targets = self._select(query)
+            if not multi:
+                targets = targets[:1]
+            modified = 0
+            for document in targets:
+                updated = _copy(document)
+                if apply_update(updated, update):
+                    if updated.get("_id") != document["_id"]:
+                        raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'")
+                    self._replace_stored(document, updated)
+                    modified += 1
+            raw = {"n": len(targets), "nModified": modified}
+            if not targets and upsert:
+                raw["upserted"] = self._upsert_document(query, update=update)
+                raw["n"] = 1
+            return raw
+
+    def _delete(self, query, multi):
+        with self._lock:
+            targets = self._select(query)
+            if not multi:
+                targets = targets[:1]
+            for document in targets:
+                self._discard(document)
+            return {"n": len(targets)}
+
+    # Reads
+    def find(self, filter=None, projection=None, *args, session=None, **kwargs):
+        kwargs.pop("batch_size", None)
+        return MemoryCursor(self, filter, projection, **kwargs)
+
+    def find_one(self, filter=None, projection=None, *args, session=None, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        return next(MemoryCursor(self, filter, projection, limit=1, **kwargs), None)
+
+    @_observed("aggregate")
+    def count_documents(self, filter, session=None, **kwargs):
+        count = len(self._select(filter))
+        if kwargs.get("skip"):
+            count = max(0, count - kwargs["skip"])
+        if kwargs.get("limit"):
+            count = min(count, kwargs["limit"])
+        return count
+
+    @_observed("count")
+    def estimated_document_count(self, **kwargs):
+        return len(self._documents)
+
+    @_observed("distinct")
+    def distinct(self, key, filter=None, session=None, **kwargs):
+        values = {}
+        for document in self._select(filter or {}):
+            value = _get_path(document, key)
+            for item in (value if isinstance(value, list) else [value]):
+                if item is not _MISSING:
+                    values.setdefault(_hashable(item), item)
+        return list(values.values())
+
+    def aggregate(self, pipeline, session=None, **kwargs):
+        started = time.perf_counter()
+        # A leading $match can use the indexes like find() does
+        if pipeline and "$match" in pipeline[0]:
+            documents, pipeline = self._select(pipeline[0]["$match"]), pipeline[1:]
+        else:
+            documents = list(self._documents.values())
+        results = run_pipeline([_copy(doc) for doc in documents], pipeline)
+        if self.database.client.event_listeners:
+            self._publish("aggregate", started, len(results), _documents_size(results))
+        return iter(results)
+
+    # Writes
+    @_observed("insert")
+    def insert_one(self, document, session=None, **kwargs):
+        with self._lock:
+            document.setdefault("_id", ObjectId())
+            self._store(_copy(document))
+            return InsertOneResult(document["_id"], True)
+
+    @_observed("insert")
+    def insert_many(self, documents, ordered=True, session=None, **kwargs):
+        inserted = []
+        errors = []
+        with self._lock:
+            for position, document in enumerate(documents):
+                document.setdefault("_id", ObjectId())
+                try:
+                    self._store(_copy(document))
+                    inserted.append(document["_id"])
+                except DuplicateKeyError as e:
+                    errors.append({"index": position, "code": 11000, "errmsg": str(e), "op": document})
+                    if ordered:
+                        break
+        if errors:
+            # Like pymongo, an unordered batch inserts everything it can before reporting the failures
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted),
+                                  "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []})
+        return InsertManyResult(inserted, True)
+
+    @_observed("update")
+    def update_one(self, filter, update, upsert=False, session=None, **kwargs):
+        return UpdateResult(self._update(filter, update, upsert, multi=False), True)
+
+    @_observed("update")
+    def update_many(self, filter, update, upsert=False, session=None, **kwargs):
+        return UpdateResult(self._update(filter, update, upsert, multi=True), True)
+
+    @_observed("update")
+    def replace_one(self, filter, replacement, upsert=False, session=None, **kwargs):
+        with self._lock:
+            targets = self._select(filter)[:1]
+            raw = {"n": len(targets), "nModified": 0}
+            if targets:
+                new = {**_copy(replacement), "_id": targets[0]["_id"]}
+                if new != targets[0]:
+                    self._replace_stored(targets[0], new)
+                    raw["nModified"] = 1
+            elif upsert:
+                raw["upserted"] = self._upsert_document(filter, replacement=replacement)
+                raw["n"] = 1
+            return UpdateResult(raw, True)
+
+    @_observed("delete")
+    def delete_one(self, filter, session=None, **kwargs):
+        return DeleteResult(self._delete(filter, multi=False), True)
+
+    @_observed("delete")
+    def delete_many(self, filter, session=None, **kwargs):
+        return DeleteResult(self._delete(filter, multi=True), True)
+
+    @_observed("findAndModify")
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE, session=None, **kwargs):
+        with self._lock:
+            targets = self._select(filter)
+            if sort:
+                sort_documents(targets, _normalize_sort(sort))
+            if targets:
+                before = _copy(targets[0])
+                after = _copy(targets[0])
+                if apply_update(after, update):
+                    self._replace_stored(targets[0], after)
+                result = after if return_document == ReturnDocument.AFTER else before
+            elif upsert:
+                doc_id = self._upsert_document(filter, update=update)
+                result = _copy(self._documents[doc_id]) if return_document == ReturnDocument.AFTER else None
+            else:
+                result = None
+            return project(result, projection) if result is not None else None
+
+    @_observed("bulkWrite")
+    def bulk_write(self, requests, ordered=True, session=None, **kwargs):
+        result = {"writeErrors": [], "nInserted": 0, "nUpserted": 0, "nMatched": 0,
+                  "nModified": 0, "nRemoved": 0, "upserted": []}
+        with self._lock:
+            for position, request in enumerate(requests):
+                try:
+                    if isinstance(request, InsertOne):
+                        self.insert_one(request._doc)
+                        result["nInserted"] += 1
+                    elif isinstance(request, (UpdateOne, UpdateMany)):
+                        raw = self._update(request._filter, request._doc, request._upsert,
+                                           multi=isinstance(request, UpdateMany))
+                        self._tally(result, raw, position)
+                    elif isinstance(request, ReplaceOne):
+                        raw = self.replace_one(request._filter, request._doc, request._upsert).raw_result
+                        self._tally(result, raw, position)
+                    elif isinstance(request, (DeleteOne, DeleteMany)):
+                        result["nRemoved"] += self._delete(request._filter, multi=isinstance(request, DeleteMany))["n"]
+                    else:
+                        raise OperationFailure(f"Unsupported bulk operation {type(request).__name__}")
+                except DuplicateKeyError as e:
+                    result["writeErrors"].append({"index": position, "code": 11000, "errmsg": str(e), "op": request})
+                    if ordered:
+                        break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    @staticmethod
+    def _tally(result, raw, position):
+        if "upserted" in raw:
+            result["nUpserted"] += 1
+            result["upserted"].append({"index": position, "_id": raw["upserted"]})
+        else:
+            result["nMatched"] += raw["n"]
+            result["nModified"] += raw["nModified"]
+
+    # Indexes
+    @_observed("createIndexes")
+    def create_index(self, keys, unique=False, name=None, session=None, **kwargs):
+        spec = _normalize_sort(keys, 1)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in spec)
+        with self._lock:
+            if name in self._indexes:
+                return name
+            index = _Index(name, spec, unique=unique)
+            for doc_id, document in self._documents.items():
+                index.check(document, doc_id)
+                index.add(document, doc_id)
+            self._indexes[name] = index
+        return name
+
+    def index_information(self):
+        return {
+            name: {"key": index.keys, **({"unique": True} if index.unique else {})}
+            for name, index in self._indexes.items()
+        }
+
+    def drop_index(self, name):
+        self._indexes.pop(name, None)
+
+    def drop(self, session=None):
+        self.database.drop_collection(self.name)
+
+
+class MemoryDatabase:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self, name)
+            return self._collections[name]
+
+    def get_collection(self, name, **kwargs):
+        return self[name]
+
+    def list_collection_names(self, **kwargs):
+        return list(self._collections)
+
+    def drop_collection(self, name, **kwargs):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def command(self, command, *args, **kwargs):
+        if command == "ping" or command == {"ping": 1}:
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command {command}")
+
+
+class MemorySession:
+    """Stand-in for a ClientSession. Writes apply immediately: there is no rollback."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.end_session()
+
+    def with_transaction(self, callback, *args, **kwargs):
+        return callback(self)
+
+    def start_transaction(self, *args, **kwargs):
+        return self
+
+    def end_session(self):
+        pass
+
+
+class MemoryClient:
+    """Process-local replacement for MongoClient holding databases in plain dicts"""
+
+    def __init__(self):
+        self._databases = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Objects with a record_command(database, collection, command, duration_ms, ...) method
+        self.event_listeners = []
+
+    def add_event_listener(self, listener):
+        if listener not in self.event_listeners:
+            self.event_listeners.append(listener)
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(self, name)
+            return self._databases[name]
+
+    def get_database(self, name, **kwargs):
+        return self[name]
+
+    @property
+    def admin(self):
+        return self["admin"]
+
+    def list_database_names(self):
+        return list(self._databases)
+
+    def drop_database(self, name):
+        with self._lock:
+            self._databases.pop(name, None)
+
+    def start_session(self, **kwargs):
+        return MemorySession(self)
+
+    def close(self):
+        pass
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_memory_client():
+    """The process-wide in-memory client, so every DatabaseManager sees the same data"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = MemoryClient()
+        return _shared_client
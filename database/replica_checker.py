@@ -0,0 +1,126 @@
+import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from bson import json_util
+from pymongo import ReplaceOne, DeleteOne
+from config.database_config import DatabaseConfig
+from database.instrumentation import bind_action
+
+# Replicated collections and the field that identifies a document across replicas
+REPLICATED_COLLECTIONS = {
+    DatabaseConfig.USERS_COLLECTION: "username",
+    DatabaseConfig.DEPARTMENTS_COLLECTION: "dept_id",
+}
+
+
+class ReplicaChecker:
+    """Detect and repair drift in the collections replicated to every fragment.
+
+    Each fragment is scanned in parallel and reduced to {key: content hash} plus a
+    rolled-up digest. Identical replicas are confirmed with a single digest
+    comparison; only when digests differ are the per-key hashes compared to find
+    the documents that need repairing.
+    """
+
+    def __init__(self, db_manager, batch_size=500):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+
+    @staticmethod
+    def hash_document(document):
+        """Content hash of a document, ignoring its _id (which may differ per replica)"""
+        content = {k: v for k, v in document.items() if k != "_id"}
+        return hashlib.sha256(json_util.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def rollup_digest(key_hashes):
+        """Order-independent digest over all {key: hash} pairs of one replica"""
+        digest = hashlib.sha256()
+        for key in sorted(key_hashes, key=str):
+            digest.update(f"{key}:{key_hashes[key]}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _scan_fragment(self, fragment, collection, key_field):
+        db = self.db_manager.databases[fragment]
+        key_hashes = {}
+        for document in db[collection].find({}, batch_size=self.batch_size):
+            key_hashes[document.get(key_field)] = self.hash_document(document)
+        return fragment, key_hashes
+
+    def check(self, collection, key_field):
+        """Compare one replicated collection across all fragments"""
+        fragments = list(self.db_manager.databases.keys())
+        with ThreadPoolExecutor(max_workers=len(fragments)) as executor:
+            scans = dict(executor.map(bind_action(lambda f: self._scan_fragment(f, collection, key_field)), fragments))
+
+        digests = {fragment: self.rollup_digest(scans[fragment]) for fragment in fragments}
+        report = {
+            "collection": collection,
+            "key_field": key_field,
+            "digests": digests,
+            "consistent": len(set(digests.values())) == 1,
+            "differing_keys": [],
+            "plan": {fragment: {"upsert": [], "delete": []} for fragment in fragments},
+        }
+        if report["consistent"]:
+            return report
+
+        reference = fragments[0]
+        all_keys = set()
+        for key_hashes in scans.values():
+            all_keys.update(key_hashes)
+
+        for key in sorted(all_keys, key=str):
+            versions = {fragment: scans[fragment].get(key) for fragment in fragments}
+            if len(set(versions.values())) == 1:
+                continue
+            report["differing_keys"].append(key)
+
+            # Majority wins; on a tie the reference replica (db1, which serves reads) wins
+            counts = Counter(versions.values())
+            top = max(counts.values())
+            winners = [h for h, c in counts.items() if c == top]
+            winner = versions[reference] if versions[reference] in winners else winners[0]
+            source = next((f for f in fragments if versions[f] == winner), None)
+
+            for fragment in fragments:
+                if versions[fragment] == winner:
+                    continue
+                if winner is None:
+                    report["plan"][fragment]["delete"].append(key)
+                else:
+                    report["plan"][fragment]["upsert"].append((key, source))
+        return report
+
+    def repair(self, report):
+        """Apply the minimal set of batched upserts/deletes from a check() report"""
+        collection = report["collection"]
+        key_field = report["key_field"]
+        applied = {}
+        for fragment, plan in report["plan"].items():
+            ops = []
+            keys_by_source = {}
+            for key, source in plan["upsert"]:
+                keys_by_source.setdefault(source, []).append(key)
+            for source, keys in keys_by_source.items():
+                for document in self.db_manager.databases[source][collection].find({key_field: {"$in": keys}}):
+                    replacement = {k: v for k, v in document.items() if k != "_id"}
+                    ops.append(ReplaceOne({key_field: document[key_field]}, replacement, upsert=True))
+            for key in plan["delete"]:
+                ops.append(DeleteOne({key_field: key}))
+
+            target = self.db_manager.databases[fragment][collection]
+            for start in range(0, len(ops), self.batch_size):
+                target.bulk_write(ops[start:start + self.batch_size], ordered=False)
+            applied[fragment] = len(ops)
+        return applied
+
+    def check_all(self, repair=False):
+        """Check (and optionally repair) every replicated collection"""
+        reports = []
+        for collection, key_field in REPLICATED_COLLECTIONS.items():
+            report = self.check(collection, key_field)
+            if repair and not report["consistent"]:
+                report["repaired"] = self.repair(report)
+            reports.append(report)
+        return reports
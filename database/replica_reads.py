@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pymongo.errors import ServerSelectionTimeoutError
+from config.database_config import DatabaseConfig
+from database.fragment_health import get_fragment_health, deadline, UNAVAILABLE_ERRORS, ASYNC_UNAVAILABLE_ERRORS, OPEN
+from database.instrumentation import bind_action
+
+# Fewer samples than this and a replica's p95 is not trusted for the hedge delay
+MIN_SAMPLES = 5
+
+# Weight of the newest sample in the moving average used for ranking (reacts within a few reads)
+EWMA_ALPHA = 0.3
+
+
+class ReplicaReader:
+    """Reads of the replicated collections (users, departments) from the best replica.
+
+    Every fragment holds a full copy, so a read can go to any of them. Replicas are
+    ranked by a moving average of their observed latency (open circuit breakers
+    last; fragments never measured go first so each gets sampled). The read goes to the best one; if it
+    has not answered after that replica's p95 latency (at least
+    DEMS_HEDGE_MIN_DELAY_MS) the same read is hedged to the next replica and the
+    first answer wins. A replica that fails or times out is failed over to the next,
+    which then counts as the primary of the read. At most max_hedges hedges are in
+    flight at once (half the pool by default); losing reads that have not started
+    are cancelled, and running ones end at the fragment deadline.
+    """
+
+    def __init__(self, db_manager, health=None, hedge=None, min_hedge_delay_ms=None, window=200, max_workers=8,
+                 max_hedges=None):
+        self.db_manager = db_manager
+        self.health = health or get_fragment_health()
+        self.hedge = DatabaseConfig.HEDGED_READS if hedge is None else hedge
+        self.min_hedge_delay_ms = min_hedge_delay_ms or DatabaseConfig.HEDGE_MIN_DELAY_MS
+        self.window = window
+        self.latencies = {}
+        self.averages = {}
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dems-replica-read")
+        self._hedge_slots = threading.BoundedSemaphore(max_hedges or max(1, max_workers // 2))
+
+    def _record(self, fragment, elapsed_ms):
+        with self._lock:
+            self.latencies.setdefault(fragment, deque(maxlen=self.window)).append(elapsed_ms)
+            previous = self.averages.get(fragment, elapsed_ms)
+            self.averages[fragment] = previous + EWMA_ALPHA * (elapsed_ms - previous)
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def _percentile(self, fragment, fraction):
+        with self._lock:
+            samples = sorted(self.latencies.get(fragment, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def hedge_delay_ms(self, fragment):
+        """How long to wait for a replica before hedging: its p95, floored at the configured minimum"""
+        with self._lock:
+            enough = len(self.latencies.get(fragment, ())) >= MIN_SAMPLES
+        p95 = self._percentile(fragment, 0.95) if enough else None
+        return max(self.min_hedge_delay_ms, p95 or 0.0)
+
+    def ranked_fragments(self):
+        """Fragments best first: closed breakers before open ones, then by average latency"""
+        with self._lock:
+            averages = dict(self.averages)
+
+        def rank(item):
+            index, fragment = item
+            is_open = self.health.breaker(fragment).status()["state"] == OPEN
+            return is_open, averages.get(fragment, 0.0), index
+        return [fragment for _, fragment in sorted(enumerate(self.db_manager.databases), key=rank)]
+
+    def _attempt(self, fragment, read):
+        breaker = self.health.breaker(fragment)
+        started = time.perf_counter()
+        try:
+            with deadline(self.health.deadline_ms):
+                result = read(self.db_manager.databases[fragment])
+        except UNAVAILABLE_ERRORS as e:
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
+        self._record(fragment, (time.perf_counter() - started) * 1000)
+        return result
+
+    def read(self, read):
+        """Run read(db) on the best replica, hedging and failing over as needed.
+
+        read must return materialized data (find_one, or list(find(...))), since
+        the cursor would otherwise be consumed outside the replica's deadline.
+        """
+        candidates = iter(self.ranked_fragments())
+
+        def launch():
+            for fragment in candidates:
+                # allow() also admits the one trial call of a half-open breaker
+                if self.health.breaker(fragment).allow():
+                    return self._executor.submit(bind_action(self._attempt), fragment, read), fragment
+            return None, None
+
+        future, primary = launch()
+        if future is None:
+            raise ServerSelectionTimeoutError("No replica of the replicated collections is available")
+        # future -> (fragment, how it was launched: "primary", "hedge" or "failover")
+        pending = {future: (primary, "primary")}
+        hedged = not self.hedge
+        last_error = None
+        try:
+            while pending:
+                timeout = None if hedged else self.hedge_delay_ms(primary) / 1000
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # The replica is slower than usual: ask the next one too, first answer wins
+                    hedged = True
+                    if not self._hedge_slots.acquire(blocking=False):
+                        self._count("hedge_skipped")
+                        continue
+                    future, fragment = launch()
+                    if future is None:
+                        self._hedge_slots.release()
+                        continue
+                    future.add_done_callback(lambda _: self._hedge_slots.release())
+                    pending[future] = (fragment, "hedge")
+                    self._count("hedged")
+                    continue
+
+                for future in done:
+                    fragment, role = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except UNAVAILABLE_ERRORS as e:
+                        last_error = e
+                        continue
+                    if role == "hedge":
+                        self._count("hedge_won")
+                    elif role == "failover":
+                        self._count("failover")
+                    return result
+
+                if not pending:
+                    # Every read in flight failed: the next replica takes over as the primary
+                    future, primary = launch()
+                    if future is not None:
+                        pending[future] = (primary, "failover")
+                        hedged = not self.hedge
+        finally:
+            for future in pending:
+                future.cancel()
+        raise last_error
+
+    async def _attempt_async(self, fragment, read):
+        breaker = self.health.breaker(fragment)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(read(self.db_manager.databases[fragment]), self.health.deadline_ms / 1000)
+        except ASYNC_UNAVAILABLE_ERRORS as e:
+            breaker.record_failure(str(e) or "deadline exceeded")
+            raise
+        breaker.record_success()
+        self._record(fragment, (time.perf_counter() - started) * 1000)
+        return result
+
+    async def read_async(self, read):
+        """asyncio version of read(): await read(db) on the best replica, hedging and failing over.
+
+        Same ranking, breakers, hedge delay and counts as read(); losing reads are cancelled.
+        """
+        candidates = iter(self.ranked_fragments())
+
+        def launch():
+            for fragment in candidates:
+                if self.health.breaker(fragment).allow():
+                    return asyncio.ensure_future(self._attempt_async(fragment, read)), fragment
+            return None, None
+
+        task, primary = launch()
+        if task is None:
+            raise ServerSelectionTimeoutError("No replica of the replicated collections is available")
+        pending = {task: (primary, "primary")}
+        hedged = not self.hedge
+        last_error = None
+        try:
+            while pending:
+                timeout = None if hedged else self.hedge_delay_ms(primary) / 1000
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    task, fragment = launch()
+                    if task is not None:
+                        pending[task] = (fragment, "hedge")
+                        self._count("hedged")
+                    continue
+
+                for task in done:
+                    fragment, role = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except ASYNC_UNAVAILABLE_ERRORS as e:
+                        last_error = e
+                        continue
+                    if role == "hedge":
+                        self._count("hedge_won")
+                    elif role == "failover":
+                        self._count("failover")
+                    return result
+
+                if not pending:
+                    task, primary = launch()
+                    if task is not None:
+                        pending[task] = (primary, "failover")
+                        hedged = not self.hedge
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error
+
+    def status(self):
+        """Per-replica p50/p95 latency and the hedge/failover counts"""
+        report = {
+            fragment: {
+                "p50_ms": self._percentile(fragment, 0.5),
+                "p95_ms": self._percentile(fragment, 0.95),
+                "average_ms": self.averages.get(fragment),
+                "state": self.health.breaker(fragment).status()["state"],
+            }
+            for fragment in self.db_manager.databases
+        }
+        with self._lock:
+            report["reads"] = dict(self.stats)
+        return report
@@ -0,0 +1,187 @@
+import threading
+import time
+import numpy as np
+from config.database_config import DatabaseConfig
+from utils.leave_calendar import to_datetime64
+
+AMOUNT_COLUMNS = ("base_salary", "allowances", "deductions", "net_salary")
+
+SNAPSHOT_PROJECTION = {"emp_id": 1, "pay_date": 1, "base_salary": 1, "allowances": 1,
+                       "bonus": 1, "deductions": 1, "net_salary": 1}
+
+
+class SalarySnapshot:
+    """Columnar in-memory copy of every salary record for interactive filtering.
+
+    Records are held as parallel NumPy arrays (emp_id, pay_date as datetime64[D],
+    the amount columns and a department code joined in from employees), so the
+    history view filters and totals with boolean masks instead of querying.
+    Callers refresh() when the view opens or on an explicit refresh, not per filter
+    change. The first refresh() loads everything; later ones only fetch records
+    whose _id is past the last one seen in each fragment. Records that arrive with
+    an older _id (other clients, journal replays) or are deleted show up as a
+    document count that does not match the rows held, which forces a full reload;
+    so does a snapshot older than DEMS_SALARY_SNAPSHOT_MAX_AGE, which picks up
+    edits. Writers that change existing salaries also call invalidate().
+    """
+
+    def __init__(self, db_manager, batch_size=5000, max_age=None):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.max_age = DatabaseConfig.SALARY_SNAPSHOT_MAX_AGE if max_age is None else max_age
+        self._lock = threading.Lock()
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop the cached columns; the next refresh() reloads from scratch"""
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.loaded_at = None
+        self.last_ids = {}
+        self.counts = {}
+        self.emp_id = np.empty(0, dtype=np.int64)
+        self.pay_date = np.empty(0, dtype="datetime64[D]")
+        self.amounts = {column: np.empty(0, dtype=np.float64) for column in AMOUNT_COLUMNS}
+        self.dept_code = np.empty(0, dtype=np.int32)
+        self.departments = []
+        self.employee_names = {}
+        self._order = None
+
+    def __len__(self):
+        return len(self.emp_id)
+
+    def _load_fragment_delta(self, fragment):
+        """Columns for the records added to one fragment since the last refresh"""
+        query = {}
+        if fragment in self.last_ids:
+            query["_id"] = {"$gt": self.last_ids[fragment]}
+
+        db = self.db_manager.databases[fragment]
+        cursor = db[DatabaseConfig.SALARIES_COLLECTION].find(
+            query, SNAPSHOT_PROJECTION, batch_size=self.batch_size
+        ).sort("_id", 1)
+
+        emp_ids, pay_dates = [], []
+        amounts = {column: [] for column in AMOUNT_COLUMNS}
+        last_id = None
+        for record in cursor:
+            base_salary = record.get("base_salary", 0)
+            allowances = record.get("allowances", record.get("bonus", 0))
+            deductions = record.get("deductions", 0)
+            emp_ids.append(record["emp_id"])
+            pay_dates.append(to_datetime64(record.get("pay_date")))
+            amounts["base_salary"].append(base_salary)
+            amounts["allowances"].append(allowances)
+            amounts["deductions"].append(deductions)
+            amounts["net_salary"].append(record.get("net_salary", base_salary + allowances - deductions))
+            last_id = record["_id"]
+
+        if last_id is not None:
+            self.last_ids[fragment] = last_id
+        return (
+            np.array(emp_ids, dtype=np.int64),
+            np.array(pay_dates, dtype="datetime64[D]"),
+            {column: np.array(values, dtype=np.float64) for column, values in amounts.items()},
+        )
+
+    def _join_departments(self):
+        """Re-derive the department code of every row from the current employee list"""
+        employees = []
+        for db in self.db_manager.get_all_databases():
+            employees.extend(db[DatabaseConfig.EMPLOYEES_COLLECTION].find({}, {"emp_id": 1, "name": 1, "department": 1}))
+
+        self.departments = sorted({employee.get("department") or "N/A" for employee in employees})
+        codes = {name: code for code, name in enumerate(self.departments)}
+        self.employee_names = {employee["emp_id"]: employee.get("name", "Unknown") for employee in employees}
+
+        # Vectorized join: sorted employee ids -> department code, -1 for deleted employees
+        known_ids = np.array(sorted(self.employee_names), dtype=np.int64)
+        by_id = {employee["emp_id"]: employee.get("department") or "N/A" for employee in employees}
+        known_codes = np.array([codes[by_id[emp_id]] for emp_id in known_ids], dtype=np.int32)
+        if len(known_ids) == 0:
+            self.dept_code = np.full(len(self.emp_id), -1, dtype=np.int32)
+            return
+        positions = np.clip(np.searchsorted(known_ids, self.emp_id), 0, len(known_ids) - 1)
+        self.dept_code = np.where(known_ids[positions] == self.emp_id, known_codes[positions], -1).astype(np.int32)
+
+    def refresh(self):
+        """Bring the snapshot up to date: a delta fetch, or a full reload when it is stale or
+        the fragments hold records the delta cannot see. Returns the number of rows added."""
+        with self._lock:
+            if self.loaded_at is not None and time.monotonic() - self.loaded_at > self.max_age:
+                self._reset()
+            added = self._append_deltas()
+            if self._counts_drifted():
+                # Inserts with older _ids, or deletes: only a full reload sees them
+                self._reset()
+                added = self._append_deltas()
+            if self.loaded_at is None:
+                self.loaded_at = time.monotonic()
+
+            # Departments can change without any new salary, so the join is redone on every refresh
+            self._join_departments()
+            if added:
+                self._order = None
+            return added
+
+    def _append_deltas(self):
+        added = 0
+        for fragment in self.db_manager.databases:
+            emp_ids, pay_dates, amounts = self._load_fragment_delta(fragment)
+            self.counts[fragment] = self.counts.get(fragment, 0) + len(emp_ids)
+            if len(emp_ids) == 0:
+                continue
+            self.emp_id = np.concatenate([self.emp_id, emp_ids])
+            self.pay_date = np.concatenate([self.pay_date, pay_dates])
+            for column in AMOUNT_COLUMNS:
+                self.amounts[column] = np.concatenate([self.amounts[column], amounts[column]])
+            added += len(emp_ids)
+        return added
+
+    def _counts_drifted(self):
+        """True if any fragment holds a different number of salary records than the snapshot"""
+        for fragment, db in self.db_manager.databases.items():
+            if db[DatabaseConfig.SALARIES_COLLECTION].count_documents({}) != self.counts.get(fragment, 0):
+                return True
+        return False
+
+    def department_name(self, code):
+        return self.departments[code] if code >= 0 else "N/A"
+
+    def mask(self, emp_id=None, department=None, from_date=None, to_date=None):
+        """Boolean mask of the rows matching the history filters"""
+        selected = np.ones(len(self.emp_id), dtype=bool)
+        if emp_id is not None:
+            selected &= self.emp_id == int(emp_id)
+        if department:
+            code = self.departments.index(department) if department in self.departments else -2
+            selected &= self.dept_code == code
+        if from_date:
+            selected &= self.pay_date >= np.datetime64(from_date, "D")
+        if to_date:
+            selected &= self.pay_date <= np.datetime64(to_date, "D")
+        return selected
+
+    def totals(self, selected):
+        """Sum of every amount column over the selected rows"""
+        return {column: float(self.amounts[column][selected].sum()) for column in AMOUNT_COLUMNS}
+
+    def ordered_rows(self, selected):
+        """Indices of the selected rows, newest pay date first (missing dates last)"""
+        if self._order is None:
+            # NaT is the smallest int64, so reversing an ascending sort puts undated rows at the end
+            self._order = np.argsort(self.pay_date.view(np.int64), kind="stable")[::-1]
+        return self._order[selected[self._order]]
+
+    def row(self, index):
+        """Display values for one row"""
+        pay_date = self.pay_date[index]
+        return {
+            "emp_id": int(self.emp_id[index]),
+            "name": self.employee_names.get(int(self.emp_id[index]), "Unknown"),
+            "department": self.department_name(self.dept_code[index]),
+            "pay_date": "N/A" if np.isnat(pay_date) else str(pay_date),
+            **{column: float(self.amounts[column][index]) for column in AMOUNT_COLUMNS},
+        }
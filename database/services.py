@@ -1,15 +1,89 @@
-from database.connection_manager import DatabaseManager
+from database.connection_manager import DatabaseManager, read_options
+from database.write_journal import get_write_journal, OFFLINE_ERRORS, JournalConflict
+from database.fragment_health import get_fragment_health, PartialResult
+from database.replica_reads import ReplicaReader
+from database.replica_checker import ReplicaChecker
+from database.exporter import StreamingExporter
+from database.salary_snapshot import SalarySnapshot
+from database.analytics import WorkforceAnalytics
 from config.database_config import DatabaseConfig
+from config.leave_config import LeaveConfig
+from utils.leave_calendar import LeaveCalendar
+from utils.search_index import TrigramIndex
 from models.user import User
 from models.employee import Employee
 from models.department import Department
 from models.leave import Leave
 from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne, ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import OperationFailure, BulkWriteError
+import calendar
+import threading
 import bcrypt
 
+# Amount fields accumulated by the payroll rollups
+PAYROLL_AMOUNT_FIELDS = ("base_salary", "allowances", "deductions", "net_salary", "records")
+
+# Employee fields covered by the type-ahead search (name ranks first)
+EMPLOYEE_SEARCH_FIELDS = ("name", "email", "position", "department", "emp_id")
+
+# Leave statuses that block the employee's calendar
+ACTIVE_LEAVE_STATUSES = ["Pending", "Approved"]
+
+# Dashboard counter field for each leave status
+LEAVE_STATUS_COUNTERS = {
+    "Pending": "leave_pending",
+    "Approved": "leave_approved",
+    "Rejected": "leave_rejected",
+}
+
+
+def _month_number(month):
+    """1-12 for a month given as a number or an English name/abbreviation ("March", "mar", "3")"""
+    if isinstance(month, str):
+        name = month.strip().lower()
+        if not name.isdigit():
+            for number in range(1, 13):
+                if name in (calendar.month_name[number].lower(), calendar.month_abbr[number].lower()):
+                    return number
+            raise ValueError(f"Unknown month {month!r}")
+    number = int(month)
+    if not 1 <= number <= 12:
+        raise ValueError(f"Month {month!r} is out of range (1-12)")
+    return number
+
+
+# Per-employee locks serializing leave applications within the process (see apply_leave)
+_leave_locks = {}
+_leave_locks_guard = threading.Lock()
+
+
+def _employee_leave_lock(emp_id):
+    with _leave_locks_guard:
+        return _leave_locks.setdefault(int(emp_id), threading.Lock())
+
+# Bucket key fields for each payroll rollup scope
+PAYROLL_ROLLUP_KEYS = {
+    "department_month": ("year", "month", "department"),
+    "employee_year": ("emp_id", "year"),
+}
+
 class DatabaseService:
-    def __init__(self):
-        self.db_manager = DatabaseManager()
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DatabaseManager()
+        self.journal = get_write_journal()
+        self.fragment_health = get_fragment_health()
+        self.replica_reader = ReplicaReader(self.db_manager, self.fragment_health)
+        self.leave_calendar = LeaveCalendar()
+        self.exporter = StreamingExporter(self.db_manager)
+        self.salary_snapshot = SalarySnapshot(self.db_manager)
+        self.analytics = WorkforceAnalytics(self.db_manager)
+        self.employee_index = None  # built from all fragments on first search
+        
+        # Replay anything left in the journal from a previous session
+        if self.journal.pending_count():
+            self.journal.start_replayer(self._replay_journal_batch)
     
     # User Management (Replicated across all DBs)
     def create_user(self, username, password, role="employee", emp_id=None):
@@ -31,9 +105,10 @@ class DatabaseService:
     def authenticate_user(self, username, password):
         """Authenticate user from any database"""
         try:
-            # Check first database (since users are replicated)
-            db = self.db_manager.databases['db1']
-            user_data = db[DatabaseConfig.USERS_COLLECTION].find_one({"username": username})
+            # Users are replicated, so read the fastest healthy replica
+            user_data = self.replica_reader.read(
+                lambda db: db[DatabaseConfig.USERS_COLLECTION].find_one({"username": username})
+            )
             
             if user_data and bcrypt.checkpw(password.encode('utf-8'), user_data['password'].encode('utf-8')):
                 return user_data
@@ -45,9 +120,10 @@ class DatabaseService:
     def get_user_by_emp_id(self, emp_id):
         """Get user account details for an employee"""
         try:
-            db = self.db_manager.databases['db1']  # Users are replicated, so check any database
-            user_data = db[DatabaseConfig.USERS_COLLECTION].find_one({"emp_id": emp_id})
-            return user_data
+            # Users are replicated, so check any database
+            return self.replica_reader.read(
+                lambda db: db[DatabaseConfig.USERS_COLLECTION].find_one({"emp_id": emp_id})
+            )
         except Exception as e:
             print(f"Error getting user by emp_id: {e}")
             return None
@@ -55,8 +131,9 @@ class DatabaseService:
     def check_username_exists(self, username):
         """Check if username already exists"""
         try:
-            db = self.db_manager.databases['db1']
-            return db[DatabaseConfig.USERS_COLLECTION].find_one({"username": username}) is not None
+            return self.replica_reader.read(
+                lambda db: db[DatabaseConfig.USERS_COLLECTION].find_one({"username": username}, {"_id": 1})
+            ) is not None
         except Exception as e:
             print(f"Error checking username: {e}")
             return False
@@ -90,6 +167,9 @@ class DatabaseService:
                 return False, "Employee ID already exists"
             
             db[DatabaseConfig.EMPLOYEES_COLLECTION].insert_one(employee.to_dict())
+            self._inc_stats(db, employees=1)
+            self._ensure_leave_balance(db, emp_id)
+            self._index_employee(employee.to_dict())
             return True, "Employee created successfully"
         except Exception as e:
             return False, f"Error creating employee: {e}"
@@ -110,6 +190,7 @@ class DatabaseService:
             # Create employee
             employee = Employee(emp_id, name, email, phone, department, position, salary, date_of_birth)
             db[DatabaseConfig.EMPLOYEES_COLLECTION].insert_one(employee.to_dict())
+            self._inc_stats(db, employees=1)
             
             # Create user account (replicated across all databases)
             user_created = self.create_user(username, password, "employee", emp_id)
@@ -117,8 +198,12 @@ class DatabaseService:
             if not user_created:
                 # Rollback employee creation if user creation fails
                 db[DatabaseConfig.EMPLOYEES_COLLECTION].delete_one({"emp_id": emp_id})
+                self._inc_stats(db, employees=-1)
                 return False, "Failed to create user account. Employee creation rolled back."
             
+            self._ensure_leave_balance(db, emp_id)
+            self._index_employee(employee.to_dict())
+            
             return True, f"Employee and user account created successfully"
             
         except Exception as e:
@@ -133,27 +218,55 @@ class DatabaseService:
             print(f"Error getting employee: {e}")
             return None
     
+    def get_employees(self, emp_ids):
+        """Several employees in the order of emp_ids, with one $in query per fragment holding any of them"""
+        try:
+            emp_ids = [int(emp_id) for emp_id in emp_ids]
+            databases = {fragment: self.db_manager.databases[fragment] for fragment in self._group_by_fragment(emp_ids)}
+            results, unavailable = self.fragment_health.read_all(
+                databases,
+                lambda db: db[DatabaseConfig.EMPLOYEES_COLLECTION].find({"emp_id": {"$in": emp_ids}}),
+                drain=True
+            )
+            by_id = {employee["emp_id"]: employee for documents in results.values() for employee in documents}
+            return PartialResult([by_id[emp_id] for emp_id in emp_ids if emp_id in by_id], unavailable)
+        except Exception as e:
+            print(f"Error getting employees: {e}")
+            return []
+    
     def get_all_employees(self):
         """Get all employees from all databases (transparency)"""
-        all_employees = []
         try:
-            for db in self.db_manager.get_all_databases():
-                employees = list(db[DatabaseConfig.EMPLOYEES_COLLECTION].find())
-                all_employees.extend(employees)
-            return sorted(all_employees, key=lambda x: x['emp_id'])
+            return self._read_all_fragments(
+                lambda db: db[DatabaseConfig.EMPLOYEES_COLLECTION].find(),
+                key=lambda x: x['emp_id']
+            )
         except Exception as e:
             print(f"Error getting all employees: {e}")
             return []
     
     def update_employee(self, emp_id, update_data):
-        """Update employee in appropriate database"""
+        """Update employee in appropriate database (queued in the journal while offline)"""
+        payload = {"emp_id": int(emp_id), "update": update_data}
         try:
-            db = self.db_manager.get_database_for_employee(emp_id)
+            fragment = self.db_manager.get_fragment_for_employee(emp_id)
+            if self.journal.is_offline(fragment):
+                self._reindex_employee(emp_id, update_data)
+                return self._journal_write(fragment, "update_employee", payload)
+            
+            db = self.db_manager.databases[fragment]
             result = db[DatabaseConfig.EMPLOYEES_COLLECTION].update_one(
                 {"emp_id": int(emp_id)}, 
                 {"$set": update_data}
             )
+            if "department" in update_data:
+                self._sync_leave_department(db, emp_id, update_data["department"])
+            self._reindex_employee(emp_id, update_data)
             return result.modified_count > 0
+        except OFFLINE_ERRORS as e:
+            print(f"⚠️ Database unreachable, employee update queued: {e}")
+            self._reindex_employee(emp_id, update_data)
+            return self._journal_write(fragment, "update_employee", payload)
         except Exception as e:
             print(f"Error updating employee: {e}")
             return False
@@ -163,11 +276,45 @@ class DatabaseService:
         try:
             db = self.db_manager.get_database_for_employee(emp_id)
             result = db[DatabaseConfig.EMPLOYEES_COLLECTION].delete_one({"emp_id": int(emp_id)})
+            if result.deleted_count > 0:
+                self._inc_stats(db, employees=-1)
+                if self.employee_index is not None:
+                    self.employee_index.remove(int(emp_id))
             return result.deleted_count > 0
         except Exception as e:
             print(f"Error deleting employee: {e}")
             return False
     
+    # Employee Search (in-memory trigram index, kept current by the write paths above)
+    def _index_employee(self, employee):
+        if self.employee_index is not None:
+            self.employee_index.add(employee["emp_id"], employee)
+    
+    def _reindex_employee(self, emp_id, update_data):
+        if self.employee_index is not None:
+            self.employee_index.update(int(emp_id), update_data)
+    
+    def rebuild_employee_index(self):
+        """(Re)build the search index from every fragment"""
+        index = TrigramIndex(EMPLOYEE_SEARCH_FIELDS)
+        projection = {field: 1 for field in EMPLOYEE_SEARCH_FIELDS}
+        try:
+            for db in self.db_manager.get_all_databases():
+                for employee in db[DatabaseConfig.EMPLOYEES_COLLECTION].find({}, projection):
+                    index.add(employee["emp_id"], employee)
+            self.employee_index = index
+            return True
+        except Exception as e:
+            print(f"Error building employee search index: {e}")
+            return False
+    
+    def search_employees(self, query, limit=20):
+        """Employees ranked by fuzzy match on name, email, position, department or ID"""
+        if self.employee_index is None and not self.rebuild_employee_index():
+            return []
+        keys = self.employee_index.search(query, limit)
+        return [self.employee_index.documents[key] for key in keys if key in self.employee_index.documents]
+    
     # Department Management (Replicated across all DBs)
     def create_department(self, dept_id, name, description, manager=None):
         """Create department in all databases (replication)"""
@@ -179,16 +326,16 @@ class DatabaseService:
                 # Check if department exists
                 if not db[DatabaseConfig.DEPARTMENTS_COLLECTION].find_one({"dept_id": dept_id}):
                     db[DatabaseConfig.DEPARTMENTS_COLLECTION].insert_one(dept_data)
+                    self._inc_stats(db, departments=1)
             return True
         except Exception as e:
             print(f"Error creating department: {e}")
             return False
     
     def get_all_departments(self):
-        """Get all departments from first database (since replicated)"""
+        """Get all departments from the fastest healthy replica (since replicated)"""
         try:
-            db = self.db_manager.databases['db1']
-            return list(db[DatabaseConfig.DEPARTMENTS_COLLECTION].find())
+            return self.replica_reader.read(lambda db: list(db[DatabaseConfig.DEPARTMENTS_COLLECTION].find()))
         except Exception as e:
             print(f"Error getting departments: {e}")
             return []
@@ -196,8 +343,9 @@ class DatabaseService:
     def get_department(self, dept_id):
         """Get a specific department by ID"""
         try:
-            db = self.db_manager.databases['db1']
-            return db[DatabaseConfig.DEPARTMENTS_COLLECTION].find_one({"dept_id": dept_id})
+            return self.replica_reader.read(
+                lambda db: db[DatabaseConfig.DEPARTMENTS_COLLECTION].find_one({"dept_id": dept_id})
+            )
         except Exception as e:
             print(f"Error getting department: {e}")
             return None
@@ -219,7 +367,9 @@ class DatabaseService:
         """Delete department from all databases (replication)"""
         try:
             for db in self.db_manager.get_all_databases():
-                db[DatabaseConfig.DEPARTMENTS_COLLECTION].delete_one({"dept_id": dept_id})
+                result = db[DatabaseConfig.DEPARTMENTS_COLLECTION].delete_one({"dept_id": dept_id})
+                if result.deleted_count > 0:
+                    self._inc_stats(db, departments=-1)
             return True
         except Exception as e:
             print(f"Error deleting department: {e}")
@@ -241,14 +391,137 @@ class DatabaseService:
     def apply_leave(self, emp_id, start_date, end_date, leave_type, reason):
         """Apply leave in same database as employee (derived fragmentation)"""
         try:
-            db = self.db_manager.get_database_for_employee(emp_id)
+            if end_date < start_date:
+                print("Error applying leave: end date is before start date")
+                return False
+            
+            fragment = self.db_manager.get_fragment_for_employee(emp_id)
             leave = Leave(emp_id, start_date, end_date, leave_type, reason)
-            db[DatabaseConfig.LEAVES_COLLECTION].insert_one(leave.to_dict())
+            # Assign the _id up front so a journaled replay can't insert the leave twice
+            leave_data = {"_id": ObjectId(), **leave.to_dict()}
+            if self.journal.is_offline(fragment):
+                return self._journal_leave_application(fragment, leave_data)
+            
+            if not self._insert_leave(self.db_manager.databases[fragment], leave_data):
+                print(f"Error applying leave: overlaps an existing leave of employee {emp_id}")
+                return False
             return True
+        except OFFLINE_ERRORS as e:
+            print(f"⚠️ Database unreachable, leave application queued: {e}")
+            return self._journal_leave_application(fragment, leave_data)
         except Exception as e:
             print(f"Error applying leave: {e}")
             return False
     
+    def _insert_leave(self, db, leave_data, replay=False):
+        """Insert a leave unless it overlaps a pending/approved one of the employee (False then)"""
+        emp_id = leave_data["emp_id"]
+        
+        def apply(session):
+            leaves = db[DatabaseConfig.LEAVES_COLLECTION]
+            # A replay interrupted before the journal acknowledged it has already inserted this leave
+            if replay and leaves.find_one({"_id": leave_data["_id"]}, {"_id": 1}, session=session):
+                return True
+            
+            # The overlap check and the insert race unless concurrent applications conflict:
+            # writing the employee's balance document first makes a second transaction for
+            # the same employee abort and retry, and its re-check then sees this leave
+            self._ensure_leave_balance(db, emp_id, session=session)
+            db[DatabaseConfig.LEAVE_BALANCES_COLLECTION].update_one(
+                {"emp_id": int(emp_id)}, {"$inc": {"applications": 1}}, session=session
+            )
+            if self._find_overlapping_leaves(db, emp_id, leave_data["start_date"], leave_data["end_date"],
+                                             limit=1, session=session):
+                return False
+            
+            # Department is denormalized onto the leave so "who's out" queries stay indexed
+            employee = db[DatabaseConfig.EMPLOYEES_COLLECTION].find_one(
+                {"emp_id": int(emp_id)}, {"department": 1}, session=session
+            )
+            leave_data["department"] = employee.get("department") if employee else None
+            leaves.insert_one(leave_data, session=session)
+            self._inc_stats(db, session=session, leave_applied=1, leave_pending=1)
+            return True
+        
+        # Servers without transactions (and the in-memory backend) rely on the process-local lock
+        with _employee_leave_lock(emp_id):
+            return self._run_in_transaction(apply)
+    
+    def _journal_leave_application(self, fragment, leave_data):
+        """Queue a leave while its fragment is offline, unless it overlaps one already queued.
+        
+        Overlaps with the leaves stored on the fragment are caught at replay (JournalConflict).
+        """
+        with _employee_leave_lock(leave_data["emp_id"]):
+            for payload in self.journal.pending_payloads(fragment, "apply_leave"):
+                queued = payload["document"]
+                if queued["emp_id"] == leave_data["emp_id"] and queued["start_date"] <= leave_data["end_date"] \
+                        and queued["end_date"] >= leave_data["start_date"]:
+                    print(f"Error applying leave: overlaps a queued leave of employee {leave_data['emp_id']}")
+                    return False
+            return self._journal_write(fragment, "apply_leave", {"document": leave_data})
+    
+    def _find_overlapping_leaves(self, db, emp_id, start_date, end_date, limit=0, session=None):
+        """Pending/approved leaves of an employee that intersect [start_date, end_date] (inclusive)"""
+        return list(db[DatabaseConfig.LEAVES_COLLECTION].find({
+            "emp_id": int(emp_id),
+            "status": {"$in": ACTIVE_LEAVE_STATUSES},
+            "start_date": {"$lte": end_date},
+            "end_date": {"$gte": start_date}
+        }, session=session).limit(limit))
+    
+    def check_leave_overlap(self, emp_id, start_date, end_date):
+        """Get the employee's pending/approved leaves that overlap a requested date range"""
+        try:
+            db = self.db_manager.get_database_for_employee(emp_id)
+            return self._find_overlapping_leaves(db, emp_id, start_date, end_date)
+        except Exception as e:
+            print(f"Error checking leave overlap: {e}")
+            return []
+    
+    def get_leaves_in_range(self, start_date, end_date, department=None, statuses=None):
+        """Get leaves intersecting a date range across all fragments ("who's out"), optionally for one department"""
+        query = {
+            "status": {"$in": statuses or ACTIVE_LEAVE_STATUSES},
+            "start_date": {"$lte": end_date},
+            "end_date": {"$gte": start_date}
+        }
+        if department:
+            query["department"] = department
+        
+        try:
+            return self._read_all_fragments(
+                lambda db: db[DatabaseConfig.LEAVES_COLLECTION].find(query),
+                key=lambda x: (x['start_date'], x['emp_id'])
+            )
+        except Exception as e:
+            print(f"Error getting leaves in range: {e}")
+            return []
+    
+    def _sync_leave_department(self, db, emp_id, department):
+        """Keep the department denormalized on an employee's leaves in step with the employee"""
+        db[DatabaseConfig.LEAVES_COLLECTION].update_many(
+            {"emp_id": int(emp_id)},
+            {"$set": {"department": department}}
+        )
+    
+    def backfill_leave_departments(self):
+        """Set the department on leaves stored without one (older leaves and journaled applications)"""
+        try:
+            for db in self.db_manager.get_all_databases():
+                emp_ids = db[DatabaseConfig.LEAVES_COLLECTION].distinct("emp_id", {"department": None})
+                if not emp_ids:
+                    continue
+                for employee in db[DatabaseConfig.EMPLOYEES_COLLECTION].find({"emp_id": {"$in": emp_ids}}, {"emp_id": 1, "department": 1}):
+                    db[DatabaseConfig.LEAVES_COLLECTION].update_many(
+                        {"emp_id": employee["emp_id"], "department": None},
+                        {"$set": {"department": employee.get("department")}}
+                    )
+            return True
+        except Exception as e:
+            print(f"Error backfilling leave departments: {e}")
+            return False
+    
     def get_employee_leaves(self, emp_id):
         """Get leaves for specific employee"""
         try:
@@ -260,65 +533,204 @@ class DatabaseService:
     
     def get_all_leaves(self):
         """Get all leaves from all databases"""
-        all_leaves = []
         try:
-            for db in self.db_manager.get_all_databases():
-                leaves = list(db[DatabaseConfig.LEAVES_COLLECTION].find())
-                all_leaves.extend(leaves)
-            return sorted(all_leaves, key=lambda x: x['applied_date'], reverse=True)
+            return self._read_all_fragments(
+                lambda db: db[DatabaseConfig.LEAVES_COLLECTION].find(),
+                key=lambda x: x['applied_date'],
+                reverse=True,
+                op_class="reporting"
+            )
         except Exception as e:
             print(f"Error getting all leaves: {e}")
             return []
     
-    def approve_leave(self, leave_id, approved_by):
-        """Approve leave"""
+    def _set_leave_status(self, db, leave_id, status, fields, session=None):
+        """Change a leave's status in one database and move it between the dashboard counters.
+        
+        Returns the leave as it was before the change, or None if it is not in this database.
+        """
+        previous = db[DatabaseConfig.LEAVES_COLLECTION].find_one_and_update(
+            {"_id": leave_id},
+            {"$set": {"status": status, **fields}},
+            return_document=ReturnDocument.BEFORE,
+            session=session
+        )
+        if previous and previous.get("status") != status:
+            counters = {LEAVE_STATUS_COUNTERS[status]: 1}
+            if previous.get("status") in LEAVE_STATUS_COUNTERS:
+                counters[LEAVE_STATUS_COUNTERS[previous["status"]]] = -1
+            self._inc_stats(db, session=session, **counters)
+        return previous
+    
+    def _find_leave_database(self, leave_id):
+        """Probe the fragments for the one holding a leave (by _id)"""
+        for db in self.db_manager.get_all_databases("write"):
+            if db[DatabaseConfig.LEAVES_COLLECTION].find_one({"_id": leave_id}, {"_id": 1}):
+                return db
+        return None
+    
+    def _run_in_transaction(self, callback):
+        """Run callback(session) in a transaction, or without one on servers that don't support them"""
         try:
-            # Find leave in all databases
-            for db in self.db_manager.get_all_databases():
-                result = db[DatabaseConfig.LEAVES_COLLECTION].update_one(
-                    {"_id": leave_id},
-                    {"$set": {
-                        "status": "Approved",
-                        "approved_by": approved_by,
-                        "approved_date": datetime.now()
-                    }}
-                )
-                if result.modified_count > 0:
-                    return True
-            return False
+            with self.db_manager.client.start_session() as session:
+                return session.with_transaction(callback, **read_options("write"))
+        except OperationFailure as e:
+            # IllegalOperation: transactions need a replica set (Atlas always has one)
+            if e.code != 20:
+                raise
+            return callback(None)
+    
+    def approve_leave(self, leave_id, approved_by, fragment=None):
+        """Approve leave and debit the employee's leave balance in one transaction"""
+        try:
+            # Callers that already probed (AsyncDatabaseService) pass the fragment key
+            db = self.db_manager.databases[fragment] if fragment else self._find_leave_database(leave_id)
+            if db is None:
+                return False
+            
+            def approve(session):
+                previous = self._set_leave_status(db, leave_id, "Approved", {
+                    "approved_by": approved_by,
+                    "approved_date": datetime.now()
+                }, session=session)
+                if previous and previous.get("status") != "Approved":
+                    self._post_leave_ledger_entry(db, previous, "approval", session=session)
+                return previous is not None
+            
+            return self._run_in_transaction(approve)
         except Exception as e:
             print(f"Error approving leave: {e}")
             return False
     
-    def reject_leave(self, leave_id, rejected_by):
-        """Reject leave"""
+    def reject_leave(self, leave_id, rejected_by, fragment=None):
+        """Reject leave (crediting the balance back if it had already been approved)"""
         try:
-            # Find leave in all databases
-            for db in self.db_manager.get_all_databases():
-                result = db[DatabaseConfig.LEAVES_COLLECTION].update_one(
-                    {"_id": leave_id},
-                    {"$set": {
-                        "status": "Rejected",
-                        "rejected_by": rejected_by,
-                        "rejected_date": datetime.now()
-                    }}
-                )
-                if result.modified_count > 0:
-                    return True
-            return False
+            # Callers that already probed (AsyncDatabaseService) pass the fragment key
+            db = self.db_manager.databases[fragment] if fragment else self._find_leave_database(leave_id)
+            if db is None:
+                return False
+            
+            def reject(session):
+                previous = self._set_leave_status(db, leave_id, "Rejected", {
+                    "rejected_by": rejected_by,
+                    "rejected_date": datetime.now()
+                }, session=session)
+                if previous and previous.get("status") == "Approved":
+                    self._post_leave_ledger_entry(db, previous, "reversal", session=session)
+                return previous is not None
+            
+            return self._run_in_transaction(reject)
         except Exception as e:
             print(f"Error rejecting leave: {e}")
             return False
     
+    # Leave Balances (ledger + cached running balance, in the employee's fragment)
+    def _ensure_leave_balance(self, db, emp_id, session=None):
+        """Create the employee's balance document with the annual entitlements if it doesn't exist"""
+        emp_id = int(emp_id)
+        entitlements = dict(LeaveConfig.ENTITLEMENTS)
+        result = db[DatabaseConfig.LEAVE_BALANCES_COLLECTION].update_one(
+            {"emp_id": emp_id},
+            {"$setOnInsert": {"emp_id": emp_id, "balances": entitlements, "updated_at": datetime.now()}},
+            upsert=True,
+            session=session
+        )
+        if result.upserted_id is not None:
+            db[DatabaseConfig.LEAVE_LEDGER_COLLECTION].insert_many([
+                {
+                    "emp_id": emp_id,
+                    "leave_type": leave_type,
+                    "kind": "accrual",
+                    "days": days,
+                    "leave_id": None,
+                    "note": "Annual entitlement",
+                    "created_at": datetime.now()
+                }
+                for leave_type, days in entitlements.items()
+            ], session=session)
+    
+    def _post_leave_ledger_entry(self, db, leave, kind, session=None):
+        """Record an approval (debit) or reversal (credit) for a leave and update the cached balance"""
+        days = self.leave_calendar.count(leave['start_date'], leave['end_date'])
+        change = -days if kind == "approval" else days
+        self._ensure_leave_balance(db, leave['emp_id'], session=session)
+        db[DatabaseConfig.LEAVE_LEDGER_COLLECTION].insert_one({
+            "emp_id": leave['emp_id'],
+            "leave_type": leave['leave_type'],
+            "kind": kind,
+            "days": change,
+            "leave_id": leave['_id'],
+            "note": "",
+            "created_at": datetime.now()
+        }, session=session)
+        db[DatabaseConfig.LEAVE_BALANCES_COLLECTION].update_one(
+            {"emp_id": leave['emp_id']},
+            {"$inc": {f"balances.{leave['leave_type']}": change}, "$set": {"updated_at": datetime.now()}},
+            session=session
+        )
+    
+    def accrue_leave(self, emp_id, leave_type, days, note=""):
+        """Credit (or with negative days, debit) leave days to an employee"""
+        try:
+            db = self.db_manager.get_database_for_employee(emp_id)
+            
+            def accrue(session):
+                self._ensure_leave_balance(db, emp_id, session=session)
+                db[DatabaseConfig.LEAVE_LEDGER_COLLECTION].insert_one({
+                    "emp_id": int(emp_id),
+                    "leave_type": leave_type,
+                    "kind": "accrual",
+                    "days": days,
+                    "leave_id": None,
+                    "note": note,
+                    "created_at": datetime.now()
+                }, session=session)
+                db[DatabaseConfig.LEAVE_BALANCES_COLLECTION].update_one(
+                    {"emp_id": int(emp_id)},
+                    {"$inc": {f"balances.{leave_type}": days}, "$set": {"updated_at": datetime.now()}},
+                    session=session
+                )
+                return True
+            
+            return self._run_in_transaction(accrue)
+        except Exception as e:
+            print(f"Error accruing leave: {e}")
+            return False
+    
+    def get_leave_balance(self, emp_id):
+        """Get the cached balance per leave type for an employee ({leave_type: days})"""
+        try:
+            db = self.db_manager.get_database_for_employee(emp_id)
+            balance = db[DatabaseConfig.LEAVE_BALANCES_COLLECTION].find_one({"emp_id": int(emp_id)})
+            if balance is None:
+                if not db[DatabaseConfig.EMPLOYEES_COLLECTION].find_one({"emp_id": int(emp_id)}, {"_id": 1}):
+                    return {}
+                self._ensure_leave_balance(db, emp_id)
+                balance = db[DatabaseConfig.LEAVE_BALANCES_COLLECTION].find_one({"emp_id": int(emp_id)})
+            return balance.get("balances", {})
+        except Exception as e:
+            print(f"Error getting leave balance: {e}")
+            return {}
+    
+    def get_leave_ledger(self, emp_id):
+        """Get an employee's ledger entries (most recent first)"""
+        try:
+            db = self.db_manager.get_database_for_employee(emp_id)
+            return list(db[DatabaseConfig.LEAVE_LEDGER_COLLECTION].find({"emp_id": int(emp_id)}).sort("created_at", DESCENDING))
+        except Exception as e:
+            print(f"Error getting leave ledger: {e}")
+            return []
+    
     # Salary Management (Derived Horizontal Fragmentation)
     def add_salary_record(self, emp_id, month, year, base_salary, bonus=0, deductions=0):
         """Add salary record in same database as employee"""
         try:
             db = self.db_manager.get_database_for_employee(emp_id)
+            # Normalized before the insert: a month the rollups can't bucket must not leave a stored record behind
             salary_data = {
                 "emp_id": int(emp_id),
-                "month": month,
-                "year": year,
+                "month": calendar.month_name[_month_number(month)],
+                "year": int(year),
                 "base_salary": float(base_salary),
                 "bonus": float(bonus),
                 "deductions": float(deductions),
@@ -326,6 +738,7 @@ class DatabaseService:
                 "created_at": datetime.now()
             }
             db[DatabaseConfig.SALARIES_COLLECTION].insert_one(salary_data)
+            self._apply_payroll_rollup(db, salary_data)
             return True
         except Exception as e:
             print(f"Error adding salary record: {e}")
@@ -334,7 +747,7 @@ class DatabaseService:
     def add_salary_record_with_date(self, emp_id, pay_date, base_salary, allowances=0, deductions=0):
         """Add salary record with specific pay date in same database as employee"""
         try:
-            db = self.db_manager.get_database_for_employee(emp_id)
+            fragment = self.db_manager.get_fragment_for_employee(emp_id)
             
             # Parse date
             if isinstance(pay_date, str):
@@ -345,6 +758,7 @@ class DatabaseService:
             net_salary = float(base_salary) + float(allowances) - float(deductions)
             
             salary_data = {
+                "_id": ObjectId(),
                 "emp_id": int(emp_id),
                 "pay_date": pay_date_obj,
                 "month": pay_date_obj.strftime("%B"),
@@ -355,8 +769,16 @@ class DatabaseService:
                 "net_salary": net_salary,
                 "created_at": datetime.now()
             }
+            if self.journal.is_offline(fragment):
+                return self._journal_write(fragment, "add_salary_record_with_date", {"document": salary_data})
+            
+            db = self.db_manager.databases[fragment]
             db[DatabaseConfig.SALARIES_COLLECTION].insert_one(salary_data)
+            self._apply_payroll_rollup(db, salary_data)
             return True
+        except OFFLINE_ERRORS as e:
+            print(f"⚠️ Database unreachable, salary record queued: {e}")
+            return self._journal_write(fragment, "add_salary_record_with_date", {"document": salary_data})
         except Exception as e:
             print(f"Error adding salary record: {e}")
             return False
@@ -372,49 +794,677 @@ class DatabaseService:
     
     def get_all_salary_records(self):
         """Get all salary records from all databases"""
-        all_salaries = []
         try:
-            for db in self.db_manager.get_all_databases():
-                salaries = list(db[DatabaseConfig.SALARIES_COLLECTION].find())
-                all_salaries.extend(salaries)
             # Sort by pay date (most recent first)
-            return sorted(all_salaries, key=lambda x: x.get('pay_date', x.get('created_at', datetime.now())), reverse=True)
+            return self._read_all_fragments(
+                lambda db: db[DatabaseConfig.SALARIES_COLLECTION].find(),
+                key=lambda x: x.get('pay_date', x.get('created_at', datetime.now())),
+                reverse=True,
+                op_class="reporting"
+            )
         except Exception as e:
             print(f"Error getting all salary records: {e}")
             return []
     
-    # Statistics
+    def get_salary_snapshot(self, refresh=True):
+        """Columnar snapshot of all salary records; refresh=False filters on what is already loaded"""
+        if refresh or self.salary_snapshot.loaded_at is None:
+            try:
+                self.salary_snapshot.refresh()
+            except Exception as e:
+                print(f"Error refreshing salary snapshot: {e}")
+        return self.salary_snapshot
+    
+    # Payroll Rollups (per fragment, merged on read)
+    def _apply_payroll_rollup(self, db, salary_data):
+        """Add one salary record to its (year, month, department) and (emp_id, year) buckets"""
+        month = _month_number(salary_data["month"])
+        year = int(salary_data["year"])
+        
+        employee = db[DatabaseConfig.EMPLOYEES_COLLECTION].find_one(
+            {"emp_id": salary_data["emp_id"]}, {"department": 1}
+        )
+        department = employee.get("department") if employee else None
+        
+        inc = {
+            "base_salary": salary_data.get("base_salary", 0),
+            "allowances": salary_data.get("allowances", salary_data.get("bonus", 0)),
+            "deductions": salary_data.get("deductions", 0),
+            "net_salary": salary_data.get("net_salary", 0),
+            "records": 1
+        }
+        db[DatabaseConfig.PAYROLL_ROLLUPS_COLLECTION].bulk_write([
+            UpdateOne(
+                {"scope": "department_month", "year": year, "month": month, "department": department},
+                {"$inc": inc},
+                upsert=True
+            ),
+            UpdateOne(
+                {"scope": "employee_year", "emp_id": salary_data["emp_id"], "year": year},
+                {"$inc": inc},
+                upsert=True
+            )
+        ], ordered=False)
+    
+    def get_payroll_rollups(self, scope, **criteria):
+        """Get rollup buckets for a scope, merged across fragments and sorted by bucket key"""
+        try:
+            key_fields = PAYROLL_ROLLUP_KEYS[scope]
+            if scope == "employee_year" and "emp_id" in criteria:
+                # Employee buckets live only in the employee's own fragment
+                criteria["emp_id"] = int(criteria["emp_id"])
+                databases = [self.db_manager.get_database_for_employee(criteria["emp_id"], "reporting")]
+            else:
+                databases = self.db_manager.get_all_databases("reporting")
+            
+            merged = {}
+            for db in databases:
+                for bucket in db[DatabaseConfig.PAYROLL_ROLLUPS_COLLECTION].find({"scope": scope, **criteria}):
+                    key = tuple(bucket.get(field) for field in key_fields)
+                    if key not in merged:
+                        merged[key] = {field: bucket.get(field) for field in key_fields}
+                        merged[key].update({field: 0 for field in PAYROLL_AMOUNT_FIELDS})
+                    for field in PAYROLL_AMOUNT_FIELDS:
+                        merged[key][field] += bucket.get(field, 0)
+            return [merged[key] for key in sorted(merged, key=lambda k: tuple(str(v) for v in k))]
+        except Exception as e:
+            print(f"Error getting payroll rollups: {e}")
+            return []
+    
+    def _sum_payroll_buckets(self, buckets):
+        totals = {field: 0 for field in PAYROLL_AMOUNT_FIELDS}
+        for bucket in buckets:
+            for field in PAYROLL_AMOUNT_FIELDS:
+                totals[field] += bucket[field]
+        return totals
+    
+    def get_department_payroll_summary(self, year=None, month=None):
+        """Get payroll totals per department, optionally for one year/month"""
+        criteria = {}
+        if year is not None:
+            criteria["year"] = int(year)
+        if month is not None:
+            criteria["month"] = int(month)
+        
+        summary = {}
+        for bucket in self.get_payroll_rollups("department_month", **criteria):
+            summary.setdefault(bucket["department"], []).append(bucket)
+        return {department: self._sum_payroll_buckets(buckets) for department, buckets in summary.items()}
+    
+    def get_employee_payroll_summary(self, emp_id, year=None):
+        """Get payroll totals for one employee, optionally for one year"""
+        criteria = {"emp_id": emp_id}
+        if year is not None:
+            criteria["year"] = int(year)
+        return self._sum_payroll_buckets(self.get_payroll_rollups("employee_year", **criteria))
+    
+    def _payroll_buckets(self, records, departments):
+        """Rollup buckets (both scopes) summed from salary records; departments maps emp_id -> department"""
+        buckets = {}
+        for record in records:
+            month = _month_number(record["month"])
+            year = int(record["year"])
+            amounts = (
+                record.get("base_salary", 0),
+                record.get("allowances", record.get("bonus", 0)),
+                record.get("deductions", 0),
+                record.get("net_salary", 0),
+                1
+            )
+            keys = [
+                ("department_month", {"year": year, "month": month, "department": departments.get(record["emp_id"])}),
+                ("employee_year", {"emp_id": record["emp_id"], "year": year}),
+            ]
+            for scope, key in keys:
+                bucket_id = (scope,) + tuple(sorted(key.items()))
+                if bucket_id not in buckets:
+                    buckets[bucket_id] = {"scope": scope, **key, **{field: 0 for field in PAYROLL_AMOUNT_FIELDS}}
+                for field, amount in zip(PAYROLL_AMOUNT_FIELDS, amounts):
+                    buckets[bucket_id][field] += amount
+        return list(buckets.values())
+    
+    def rebuild_payroll_rollups(self):
+        """Recompute every rollup bucket from the salary records (backfill or drift repair)"""
+        try:
+            for db in self.db_manager.get_all_databases():
+                self._rebuild_fragment_payroll_rollups(db)
+            return True
+        except Exception as e:
+            print(f"Error rebuilding payroll rollups: {e}")
+            return False
+    
+    def backfill_payroll_rollups(self):
+        """Build the rollups of fragments that have never had a full rebuild (installs that predate them)"""
+        try:
+            for fragment, db in self.db_manager.databases.items():
+                if not db[DatabaseConfig.STATS_COLLECTION].find_one({"_id": "payroll_rollups"}, {"_id": 1}):
+                    print(f"📊 Building payroll rollups for {fragment}...")
+                    self._rebuild_fragment_payroll_rollups(db)
+            return True
+        except Exception as e:
+            print(f"Error backfilling payroll rollups: {e}")
+            return False
+    
+    def _rebuild_fragment_payroll_rollups(self, db):
+        departments = {
+            emp["emp_id"]: emp.get("department")
+            for emp in db[DatabaseConfig.EMPLOYEES_COLLECTION].find({}, {"emp_id": 1, "department": 1})
+        }
+        buckets = self._payroll_buckets(db[DatabaseConfig.SALARIES_COLLECTION].find(), departments)
+        
+        rollups = db[DatabaseConfig.PAYROLL_ROLLUPS_COLLECTION]
+        rollups.delete_many({})
+        if buckets:
+            rollups.insert_many(buckets)
+        # Marks the rollups as complete, so backfill_payroll_rollups leaves this fragment alone
+        db[DatabaseConfig.STATS_COLLECTION].replace_one(
+            {"_id": "payroll_rollups"}, {"rebuilt_at": datetime.now()}, upsert=True
+        )
+    
+    def _rebuild_month_payroll_rollups(self, db, year, month):
+        """Recompute one fragment's buckets touched by a month's payroll: its department_month
+        buckets and the employee_year buckets of everyone paid that month"""
+        salaries = db[DatabaseConfig.SALARIES_COLLECTION]
+        month_match = {"year": year, "month": {"$in": [calendar.month_name[month], month]}}
+        emp_ids = salaries.distinct("emp_id", month_match)
+        departments = {
+            emp["emp_id"]: emp.get("department")
+            for emp in db[DatabaseConfig.EMPLOYEES_COLLECTION].find(
+                {"emp_id": {"$in": emp_ids}}, {"emp_id": 1, "department": 1}
+            )
+        }
+        month_buckets = [
+            bucket for bucket in self._payroll_buckets(salaries.find(month_match), departments)
+            if bucket["scope"] == "department_month"
+        ]
+        year_buckets = [
+            bucket for bucket in self._payroll_buckets(salaries.find({"emp_id": {"$in": emp_ids}, "year": year}),
+                                                       departments)
+            if bucket["scope"] == "employee_year"
+        ]
+        rollups = db[DatabaseConfig.PAYROLL_ROLLUPS_COLLECTION]
+        rollups.delete_many({"scope": "department_month", "year": year, "month": month})
+        rollups.delete_many({"scope": "employee_year", "year": year, "emp_id": {"$in": emp_ids}})
+        if month_buckets or year_buckets:
+            rollups.insert_many(month_buckets + year_buckets)
+    
+    # Bulk Operations (batch jobs: one round trip per fragment and batch instead of per record)
+    def _group_by_fragment(self, emp_ids):
+        groups = {}
+        for emp_id in emp_ids:
+            groups.setdefault(self.db_manager.get_fragment_for_employee(emp_id), []).append(int(emp_id))
+        return groups
+    
+    def _ensure_leave_balances(self, db, emp_ids):
+        """Bulk version of _ensure_leave_balance for newly imported employees"""
+        entitlements = dict(LeaveConfig.ENTITLEMENTS)
+        now = datetime.now()
+        result = db[DatabaseConfig.LEAVE_BALANCES_COLLECTION].bulk_write([
+            UpdateOne(
+                {"emp_id": emp_id},
+                {"$setOnInsert": {"emp_id": emp_id, "balances": entitlements, "updated_at": now}},
+                upsert=True
+            )
+            for emp_id in emp_ids
+        ], ordered=False)
+        created = [emp_ids[index] for index in result.upserted_ids]
+        if created:
+            db[DatabaseConfig.LEAVE_LEDGER_COLLECTION].insert_many([
+                {
+                    "emp_id": emp_id,
+                    "leave_type": leave_type,
+                    "kind": "accrual",
+                    "days": days,
+                    "leave_id": None,
+                    "note": "Annual entitlement",
+                    "created_at": now
+                }
+                for emp_id in created
+                for leave_type, days in entitlements.items()
+            ], ordered=False)
+    
+    def import_employees(self, rows, batch_size=1000):
+        """Create employees from dicts with the create_employee fields, skipping IDs that already exist.
+        
+        Returns {"created": n, "skipped": [emp_id, ...], "errors": [{"row": i, "error": msg}, ...]}.
+        """
+        report = {"created": 0, "skipped": [], "errors": []}
+        employees = {}
+        for position, row in enumerate(rows, start=1):
+            try:
+                employee = Employee(
+                    row["emp_id"], row["name"], row.get("email"), row.get("phone"), row.get("department"),
+                    row.get("position"), row.get("salary") or 0, row.get("date_of_birth") or None
+                )
+                self.db_manager.get_fragment_for_employee(employee.emp_id)
+                if employee.emp_id in employees:
+                    report["skipped"].append(employee.emp_id)
+                    continue
+                employees[employee.emp_id] = employee
+            except (KeyError, TypeError, ValueError) as e:
+                report["errors"].append({"row": position, "error": f"Invalid employee row: {e}"})
+        
+        for fragment, emp_ids in self._group_by_fragment(employees).items():
+            db = self.db_manager.databases[fragment]
+            for start in range(0, len(emp_ids), batch_size):
+                batch = emp_ids[start:start + batch_size]
+                try:
+                    existing = {
+                        doc["emp_id"] for doc in db[DatabaseConfig.EMPLOYEES_COLLECTION].find(
+                            {"emp_id": {"$in": batch}}, {"emp_id": 1}
+                        )
+                    }
+                    new_ids = [emp_id for emp_id in batch if emp_id not in existing]
+                    report["skipped"].extend(sorted(existing))
+                    if not new_ids:
+                        continue
+                    documents = [employees[emp_id].to_dict() for emp_id in new_ids]
+                    db[DatabaseConfig.EMPLOYEES_COLLECTION].insert_many(documents, ordered=False)
+                    self._inc_stats(db, employees=len(new_ids))
+                    self._ensure_leave_balances(db, new_ids)
+                    for document in documents:
+                        self._index_employee(document)
+                    report["created"] += len(new_ids)
+                except Exception as e:
+                    print(f"Error importing employees into {fragment}: {e}")
+                    report["errors"].append({"fragment": fragment, "emp_ids": batch, "error": str(e)})
+        return report
+    
+    def run_payroll(self, pay_date, department=None, allowances=0, deductions=0):
+        """Pay every active employee (optionally of one department) their salary for pay_date's month.
+        
+        Employees who already have a salary record in that month are skipped, so a
+        rerun after a partial failure only pays the rest. Rollups are updated with
+        one bulk write per fragment from the records actually inserted; on a rerun,
+        or after any failure, the month's rollups are recomputed from the salary
+        records instead, so they cannot drift from what was paid.
+        """
+        if isinstance(pay_date, str):
+            pay_date = datetime.strptime(pay_date, '%Y-%m-%d')
+        month_start = pay_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        month_end = month_start.replace(year=month_start.year + month_start.month // 12,
+                                        month=month_start.month % 12 + 1)
+        report = {"pay_date": pay_date.strftime('%Y-%m-%d'), "paid": 0, "skipped": 0,
+                  "total_net": 0.0, "errors": []}
+        
+        query = {"status": "Active"}
+        if department:
+            query["department"] = department
+        for fragment, db in self.db_manager.databases.items():
+            # Set once salary records may have been written but their rollup increments not applied
+            rebuild = False
+            try:
+                paid = set(db[DatabaseConfig.SALARIES_COLLECTION].distinct(
+                    "emp_id", {"pay_date": {"$gte": month_start, "$lt": month_end}}
+                ))
+                # A rerun cannot tell which earlier records already reached the rollups
+                rebuild = bool(paid)
+                records = []
+                departments = {}
+                for employee in db[DatabaseConfig.EMPLOYEES_COLLECTION].find(
+                    query, {"emp_id": 1, "salary": 1, "department": 1}
+                ):
+                    if employee["emp_id"] in paid:
+                        report["skipped"] += 1
+                        continue
+                    base_salary = float(employee.get("salary") or 0)
+                    records.append({
+                        "emp_id": employee["emp_id"],
+                        "pay_date": pay_date,
+                        "month": pay_date.strftime("%B"),
+                        "year": pay_date.year,
+                        "base_salary": base_salary,
+                        "allowances": float(allowances),
+                        "deductions": float(deductions),
+                        "net_salary": base_salary + float(allowances) - float(deductions),
+                        "created_at": datetime.now()
+                    })
+                    departments[employee["emp_id"]] = employee.get("department")
+                if not records:
+                    continue
+                
+                try:
+                    rebuild = True
+                    db[DatabaseConfig.SALARIES_COLLECTION].insert_many(records, ordered=False)
+                    inserted = records
+                except BulkWriteError as e:
+                    failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                    inserted = [record for position, record in enumerate(records) if position not in failed]
+                    report["errors"].append({"fragment": fragment,
+                                             "error": f"{len(failed)} salary record(s) not inserted: {e}"})
+                report["paid"] += len(inserted)
+                report["total_net"] += sum(record["net_salary"] for record in inserted)
+                
+                if not paid and len(inserted) == len(records):
+                    rollups = [
+                        UpdateOne(
+                            {key: bucket[key] for key in ("scope",) + PAYROLL_ROLLUP_KEYS[bucket["scope"]]},
+                            {"$inc": {field: bucket[field] for field in PAYROLL_AMOUNT_FIELDS}},
+                            upsert=True
+                        )
+                        for bucket in self._payroll_buckets(inserted, departments)
+                    ]
+                    db[DatabaseConfig.PAYROLL_ROLLUPS_COLLECTION].bulk_write(rollups, ordered=False)
+                    rebuild = False
+            except Exception as e:
+                print(f"Error running payroll in {fragment}: {e}")
+                report["errors"].append({"fragment": fragment, "error": str(e)})
+            if rebuild:
+                try:
+                    self._rebuild_month_payroll_rollups(db, pay_date.year, pay_date.month)
+                except Exception as e:
+                    print(f"Error rebuilding payroll rollups in {fragment}: {e}")
+                    report["errors"].append({"fragment": fragment,
+                                             "error": f"rollups not rebuilt, run `python -m dems rebuild-rollups`: {e}"})
+        
+        self.analytics.invalidate()
+        return report
+    
+    def find_pending_leaves(self, department=None, start_before=None, leave_type=None):
+        """Pending leave requests across fragments, optionally filtered, oldest start first"""
+        query = {"status": "Pending"}
+        if department:
+            query["department"] = department
+        if start_before:
+            query["start_date"] = {"$lte": start_before}
+        if leave_type:
+            query["leave_type"] = leave_type
+        # A PartialResult, so batch callers can tell "none pending" from "fragments unreachable";
+        # errors other than an unreachable fragment are raised rather than read as an empty list
+        return self._read_all_fragments(
+            lambda db: db[DatabaseConfig.LEAVES_COLLECTION].find(query),
+            key=lambda leave: (leave.get("start_date", ""), leave["emp_id"]),
+            op_class="write"
+        )
+    
+    def approve_leaves(self, leave_ids, approved_by):
+        """Approve several leaves (each in its own transaction); returns {"approved": [...], "failed": [...]}"""
+        report = {"approved": [], "failed": []}
+        for leave_id in leave_ids:
+            if isinstance(leave_id, str) and ObjectId.is_valid(leave_id):
+                leave_id = ObjectId(leave_id)
+            key = "approved" if self.approve_leave(leave_id, approved_by) else "failed"
+            report[key].append(str(leave_id))
+        return report
+    
+    # Indexes
+    def ensure_indexes(self):
+        """Create the indexes the service relies on in every fragment"""
+        try:
+            for db in self.db_manager.get_all_databases():
+                db[DatabaseConfig.PAYROLL_ROLLUPS_COLLECTION].create_index(
+                    [("scope", ASCENDING), ("year", ASCENDING), ("month", ASCENDING),
+                     ("department", ASCENDING), ("emp_id", ASCENDING)],
+                    unique=True,
+                    name="rollup_bucket"
+                )
+                db[DatabaseConfig.LEAVE_BALANCES_COLLECTION].create_index("emp_id", unique=True)
+                db[DatabaseConfig.LEAVES_COLLECTION].create_index(
+                    [("emp_id", ASCENDING), ("start_date", ASCENDING), ("end_date", ASCENDING)],
+                    name="leave_employee_interval"
+                )
+                db[DatabaseConfig.LEAVES_COLLECTION].create_index(
+                    [("department", ASCENDING), ("start_date", ASCENDING), ("end_date", ASCENDING)],
+                    name="leave_department_interval"
+                )
+                db[DatabaseConfig.LEAVE_LEDGER_COLLECTION].create_index([("emp_id", ASCENDING), ("created_at", DESCENDING)])
+                # Lets streamed exports walk salaries newest-first without an in-memory sort
+                db[DatabaseConfig.SALARIES_COLLECTION].create_index(
+                    [("pay_date", DESCENDING), ("_id", DESCENDING)],
+                    name="salary_pay_date"
+                )
+            return True
+        except Exception as e:
+            print(f"Error creating indexes: {e}")
+            return False
+    
+    # Export (streamed per fragment, never materialized)
+    def export_salary_history(self, path, fmt=None, emp_id=None, department=None, from_date=None, to_date=None):
+        """Export salary records matching the history filters to CSV/JSONL/XLSX"""
+        try:
+            if isinstance(from_date, str):
+                from_date = datetime.strptime(from_date, '%Y-%m-%d')
+            if isinstance(to_date, str):
+                to_date = datetime.strptime(to_date, '%Y-%m-%d')
+            count = self.exporter.export_salaries(path, fmt, emp_id, department, from_date, to_date)
+            return True, f"Exported {count} salary record(s) to {path}"
+        except Exception as e:
+            print(f"Error exporting salary history: {e}")
+            return False, str(e)
+    
+    def export_employees(self, path, fmt=None, department=None):
+        """Export the employee list to CSV/JSONL/XLSX"""
+        try:
+            count = self.exporter.export_employees(path, fmt, department)
+            return True, f"Exported {count} employee(s) to {path}"
+        except Exception as e:
+            print(f"Error exporting employees: {e}")
+            return False, str(e)
+    
+    # Analytics (per-fragment aggregation, merged and cached per period)
+    def get_workforce_trends(self, start=None, end=None, refresh=False):
+        """Monthly headcount, hires and payroll cost per department; start/end are (year, month)"""
+        try:
+            if refresh:
+                self.analytics.invalidate()
+            return self.analytics.monthly_series(start, end)
+        except Exception as e:
+            print(f"Error computing workforce trends: {e}")
+            return {}
+    
+    # Replica Consistency (users and departments)
+    def check_replicas(self, repair=False):
+        """Compare replicated collections across fragments, optionally repairing drift"""
+        try:
+            return ReplicaChecker(self.db_manager).check_all(repair=repair)
+        except Exception as e:
+            print(f"Error checking replicas: {e}")
+            return []
+    
+    # Offline Write Journal
+    def _journal_write(self, fragment, operation, payload):
+        """Queue a write for later replay and return immediately"""
+        self.journal.enqueue(fragment, operation, payload)
+        self.journal.start_replayer(self._replay_journal_batch)
+        return True
+    
+    def _replay_journal_batch(self, fragment, entries):
+        """Apply a batch of journaled writes to one fragment, preserving their order"""
+        db = self.db_manager.databases[fragment]
+        collections = {
+            "add_salary_record_with_date": DatabaseConfig.SALARIES_COLLECTION,
+            "update_employee": DatabaseConfig.EMPLOYEES_COLLECTION
+        }
+        
+        # Consecutive entries for the same collection go out as one ordered bulk write
+        run_collection = None
+        run_entries = []
+        run_ops = []
+        for entry in entries:
+            payload = entry["payload"]
+            if entry["operation"] == "apply_leave":
+                # Checked against the stored leaves like a live application, so each goes on its own
+                if run_ops:
+                    self._flush_replay_run(db, run_collection, run_entries, run_ops)
+                    run_collection = None
+                    run_entries = []
+                    run_ops = []
+                self._replay_leave_application(db, payload["document"])
+                continue
+            if entry["operation"] == "update_employee":
+                op = UpdateOne({"emp_id": payload["emp_id"]}, {"$set": payload["update"]})
+            else:
+                # Upsert on the pre-assigned _id so a replayed insert is applied at most once
+                document = payload["document"]
+                fields = {k: v for k, v in document.items() if k != "_id"}
+                op = UpdateOne({"_id": document["_id"]}, {"$setOnInsert": fields}, upsert=True)
+            
+            collection = collections[entry["operation"]]
+            if run_ops and collection != run_collection:
+                self._flush_replay_run(db, run_collection, run_entries, run_ops)
+                run_entries = []
+                run_ops = []
+            run_collection = collection
+            run_entries.append(entry)
+            run_ops.append(op)
+        
+        if run_ops:
+            self._flush_replay_run(db, run_collection, run_entries, run_ops)
+    
+    def _replay_leave_application(self, db, document):
+        """Insert a journaled leave, or raise JournalConflict if it overlaps one the fragment has now"""
+        if not self._insert_leave(db, document, replay=True):
+            raise JournalConflict(f"leave {document['start_date']}..{document['end_date']} of employee "
+                                  f"{document['emp_id']} overlaps an existing leave")
+    
+    def _flush_replay_run(self, db, collection, entries, ops):
+        """Bulk-write one run of journaled writes, then apply side effects of documents it actually inserted"""
+        # An earlier attempt at these entries may have been cut off after writing some of them, and a
+        # repeated upsert inserts nothing, so retried runs recount what they touch instead of adding to it
+        retried = any(entry.get("attempts") for entry in entries)
+        try:
+            upserted = db[collection].bulk_write(ops, ordered=True).upserted_ids
+        except BulkWriteError as e:
+            # The entries before the rejected one were applied; their side effects are due now, since
+            # the journal retries them one by one and a repeated upsert no longer inserts anything
+            rejected = min((error["index"] for error in e.details.get("writeErrors", [])), default=len(entries))
+            upserted = [upsert["index"] for upsert in e.details.get("upserted", [])]
+            self._apply_replay_side_effects(db, entries[:rejected], upserted, retried)
+            raise
+        self._apply_replay_side_effects(db, entries, upserted, retried)
+    
+    def _apply_replay_side_effects(self, db, entries, upserted, retried=False):
+        """Rollups for the replayed salary inserts (indexes into entries), leave departments for updates.
+        
+        With retried=True the rollups of every month the salary entries fall in are rebuilt from the
+        stored records, which is idempotent however much of an earlier attempt was written.
+        """
+        salary_entries = [entry for entry in entries if entry["operation"] == "add_salary_record_with_date"]
+        if retried:
+            months = {(int(entry["payload"]["document"]["year"]), _month_number(entry["payload"]["document"]["month"]))
+                      for entry in salary_entries}
+            for year, month in sorted(months):
+                self._rebuild_month_payroll_rollups(db, year, month)
+        else:
+            for index in upserted:
+                if entries[index]["operation"] == "add_salary_record_with_date":
+                    self._apply_payroll_rollup(db, entries[index]["payload"]["document"])
+        if salary_entries:
+            # Replayed records carry _ids older than ones the snapshot may already have passed
+            self.salary_snapshot.invalidate()
+        
+        for entry in entries:
+            update = entry["payload"].get("update", {})
+            if entry["operation"] == "update_employee" and "department" in update:
+                self._sync_leave_department(db, entry["payload"]["emp_id"], update["department"])
+    
+    def get_pending_write_count(self):
+        """Number of writes waiting in the offline journal"""
+        try:
+            return self.journal.pending_count()
+        except Exception as e:
+            print(f"Error reading write journal: {e}")
+            return 0
+    
+    # Statistics (one small counter document per fragment, kept current by the write paths)
+    def _read_all_fragments(self, read, key=None, reverse=False, op_class=None):
+        """Cross-fragment read that tolerates unreachable fragments.
+        
+        Each fragment gets a circuit breaker and a short deadline for its first batch
+        (read(db) returns a cursor; the rest is drained without it); the documents from
+        the ones that answered come back as a PartialResult naming the ones that did not.
+        op_class picks the read routing (e.g. "reporting" scans go to secondaries).
+        """
+        results, unavailable = self.fragment_health.read_all(
+            self.db_manager.get_databases(op_class), read, drain=True
+        )
+        documents = [document for fragment_documents in results.values() for document in fragment_documents]
+        if key is not None:
+            documents.sort(key=key, reverse=reverse)
+        return PartialResult(documents, unavailable)
+    
+    def _inc_stats(self, db, session=None, **amounts):
+        """Atomically adjust this fragment's dashboard counters"""
+        db[DatabaseConfig.STATS_COLLECTION].update_one(
+            {"_id": "dashboard"},
+            {"$inc": amounts},
+            upsert=True,
+            session=session
+        )
+    
+    def rebuild_dashboard_stats(self):
+        """Recount the dashboard counters in every fragment (fixes drift)"""
+        try:
+            for db in self.db_manager.get_all_databases():
+                counters = {
+                    "employees": db[DatabaseConfig.EMPLOYEES_COLLECTION].count_documents({}),
+                    "departments": db[DatabaseConfig.DEPARTMENTS_COLLECTION].count_documents({}),
+                    "leave_applied": 0,
+                    "leave_pending": 0,
+                    "leave_approved": 0,
+                    "leave_rejected": 0
+                }
+                status_counts = db[DatabaseConfig.LEAVES_COLLECTION].aggregate([
+                    {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+                ])
+                for row in status_counts:
+                    counters["leave_applied"] += row["count"]
+                    if row["_id"] in LEAVE_STATUS_COUNTERS:
+                        counters[LEAVE_STATUS_COUNTERS[row["_id"]]] = row["count"]
+                
+                db[DatabaseConfig.STATS_COLLECTION].replace_one(
+                    {"_id": "dashboard"},
+                    {**counters, "rebuilt_at": datetime.now()},
+                    upsert=True
+                )
+            return True
+        except Exception as e:
+            print(f"Error rebuilding dashboard stats: {e}")
+            return False
+    
     def get_dashboard_stats(self):
-        """Get dashboard statistics"""
+        """Get dashboard statistics from the per-fragment counter documents.
+        
+        Fragments that do not answer are left out of the totals and listed under "unavailable".
+        """
         try:
-            all_leaves = self.get_all_leaves()
+            # Not "reporting": the counters must reflect the user's own last write (interactive reads
+            # the primary by default), and the rebuild check below always confirms on the primary
+            def read_counters(op_class):
+                return self.fragment_health.read_all(
+                    self.db_manager.get_databases(op_class),
+                    lambda db: db[DatabaseConfig.STATS_COLLECTION].find_one({"_id": "dashboard"})
+                )
+            
+            def missing_baseline(counters):
+                return any(not doc or "rebuilt_at" not in doc for doc in counters.values())
             
-            total_employees = len(self.get_all_employees())
-            total_departments = len(self.get_all_departments())
+            counters, unavailable = read_counters("interactive")
             
-            # Leave statistics
-            leave_applied = len(all_leaves)
-            leave_pending = len([l for l in all_leaves if l['status'] == 'Pending'])
-            leave_approved = len([l for l in all_leaves if l['status'] == 'Approved'])
-            leave_rejected = len([l for l in all_leaves if l['status'] == 'Rejected'])
+            # Counters created by $inc before the first rebuild have no baseline yet; a lagging
+            # secondary could miss a rebuild that already happened, so only the primary decides
+            if not unavailable and missing_baseline(counters):
+                counters, unavailable = read_counters("write")
+                if not unavailable and missing_baseline(counters):
+                    self.rebuild_dashboard_stats()
+                    counters, unavailable = read_counters("write")
+            counters = {name: doc or {} for name, doc in counters.items()}
             
-            # Get distribution stats
-            db1_count = len(list(self.db_manager.databases['db1'][DatabaseConfig.EMPLOYEES_COLLECTION].find()))
-            db2_count = len(list(self.db_manager.databases['db2'][DatabaseConfig.EMPLOYEES_COLLECTION].find()))
-            db3_count = len(list(self.db_manager.databases['db3'][DatabaseConfig.EMPLOYEES_COLLECTION].find()))
+            def total(field):
+                return sum(doc.get(field, 0) for doc in counters.values())
             
             return {
-                "total_employees": total_employees,
-                "total_departments": total_departments,
-                "leave_applied": leave_applied,
-                "leave_pending": leave_pending,
-                "leave_approved": leave_approved,
-                "leave_rejected": leave_rejected,
+                "total_employees": total("employees"),
+                # Departments are replicated, so any one fragment holds the full count
+                "total_departments": next(iter(counters.values()), {}).get("departments", 0),
+                "leave_applied": total("leave_applied"),
+                "leave_pending": total("leave_pending"),
+                "leave_approved": total("leave_approved"),
+                "leave_rejected": total("leave_rejected"),
                 "db_distribution": {
-                    "db1": db1_count,
-                    "db2": db2_count,
-                    "db3": db3_count
-                }
+                    name: doc.get("employees", 0) for name, doc in counters.items()
+                },
+                "unavailable": sorted(unavailable)
             }
         except Exception as e:
             print(f"Error getting stats: {e}")
@@ -425,5 +1475,6 @@ class DatabaseService:
                 "leave_pending": 0, 
                 "leave_approved": 0,
                 "leave_rejected": 0,
-                "db_distribution": {"db1": 0, "db2": 0, "db3": 0}
+                "db_distribution": {"db1": 0, "db2": 0, "db3": 0},
+                "unavailable": sorted(self.db_manager.databases)
             }
\ No newline at end of file
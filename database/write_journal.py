@@ -0,0 +1,296 @@
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from bson import json_util
+from pymongo.errors import ConnectionFailure
+from config.database_config import DatabaseConfig
+
+# Errors that mean "the fragment is unreachable" rather than "the write is invalid"
+OFFLINE_ERRORS = (ConnectionFailure,)
+
+
+class JournalConflict(Exception):
+    """A queued write that can never apply (e.g. a leave overlapping one stored meanwhile); dead-lettered at once"""
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_write_journal(path=None):
+    """Get the shared journal for a path (one per process, shared by every DatabaseService)"""
+    path = path or DatabaseConfig.JOURNAL_PATH
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = WriteJournal(path)
+        return _journals[path]
+
+
+class WriteJournal:
+    """Durable local queue of writes made while a fragment is unreachable.
+
+    Entries are replayed per fragment in the order they were queued. Each entry
+    carries everything needed to re-apply it idempotently (inserts have their
+    _id assigned up front), so replaying the same entry twice is harmless.
+    An entry the fragment rejects (a bad payload rather than an outage) is
+    retried on its own; after max_failures rejections it moves to the
+    dead_letters table so the writes queued behind it can drain. A handler
+    raising JournalConflict sends the entry there straight away.
+    """
+
+    def __init__(self, path, batch_size=None, replay_interval=None, max_failures=None):
+        self.path = path
+        self.batch_size = batch_size or DatabaseConfig.JOURNAL_BATCH_SIZE
+        self.replay_interval = replay_interval or DatabaseConfig.JOURNAL_REPLAY_INTERVAL
+        self.max_failures = max_failures or DatabaseConfig.JOURNAL_MAX_FAILURES
+        self.offline_fragments = set()
+
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._replayer = None
+        self._replay_handler = None
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS journal (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                op_id TEXT UNIQUE NOT NULL,
+                fragment TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_journal_fragment ON journal (fragment, id)")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(journal)")}
+        if "failures" not in columns:
+            # Journals written before dead-lettering: outage retries stay in attempts, rejections go here
+            self._conn.execute("ALTER TABLE journal ADD COLUMN failures INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("ALTER TABLE journal ADD COLUMN last_error TEXT")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS dead_letters (
+                id INTEGER PRIMARY KEY,
+                op_id TEXT UNIQUE NOT NULL,
+                fragment TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                failed_at TEXT NOT NULL,
+                failures INTEGER NOT NULL,
+                error TEXT
+            )"""
+        )
+        self._conn.commit()
+
+        # Anything left over from a previous session means that fragment is still behind
+        for fragment in self.pending_fragments():
+            self.offline_fragments.add(fragment)
+
+    def enqueue(self, fragment, operation, payload):
+        """Append a write to the journal and mark its fragment offline"""
+        op_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO journal (op_id, fragment, operation, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (op_id, fragment, operation, json_util.dumps(payload), datetime.now().isoformat())
+            )
+            self._conn.commit()
+            self.offline_fragments.add(fragment)
+        return op_id
+
+    def is_offline(self, fragment):
+        """True while the fragment is unreachable or still has queued writes to replay"""
+        return fragment in self.offline_fragments
+
+    def pending_count(self, fragment=None):
+        """Number of writes waiting to be replayed"""
+        with self._lock:
+            if fragment:
+                row = self._conn.execute("SELECT COUNT(*) FROM journal WHERE fragment = ?", (fragment,)).fetchone()
+            else:
+                row = self._conn.execute("SELECT COUNT(*) FROM journal").fetchone()
+        return row[0]
+
+    def pending_fragments(self):
+        """Fragments that have queued writes"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT fragment FROM journal").fetchall()
+        return [row[0] for row in rows]
+
+    def pending_entries(self, fragment, limit=None):
+        """Oldest queued writes for a fragment, in replay order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, op_id, operation, payload, attempts FROM journal WHERE fragment = ? ORDER BY id LIMIT ?",
+                (fragment, limit or self.batch_size)
+            ).fetchall()
+        return [
+            {"id": row[0], "op_id": row[1], "operation": row[2], "payload": json_util.loads(row[3]), "attempts": row[4]}
+            for row in rows
+        ]
+
+    def pending_payloads(self, fragment, operation):
+        """Payloads of every queued write of one operation for a fragment, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM journal WHERE fragment = ? AND operation = ? ORDER BY id", (fragment, operation)
+            ).fetchall()
+        return [json_util.loads(row[0]) for row in rows]
+
+    def acknowledge(self, entries):
+        """Remove replayed entries from the journal"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM journal WHERE id = ?", [(entry["id"],) for entry in entries])
+            self._conn.commit()
+
+    def _record_attempt(self, entries):
+        with self._lock:
+            self._conn.executemany("UPDATE journal SET attempts = attempts + 1 WHERE id = ?", [(entry["id"],) for entry in entries])
+            self._conn.commit()
+
+    def _record_failure(self, entry, error):
+        """Count a rejected replay of one entry; returns how many times it has been rejected"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE journal SET attempts = attempts + 1, failures = failures + 1, last_error = ? WHERE id = ?",
+                (str(error), entry["id"])
+            )
+            self._conn.commit()
+            return self._conn.execute("SELECT failures FROM journal WHERE id = ?", (entry["id"],)).fetchone()[0]
+
+    def _dead_letter(self, entry, error):
+        """Move an entry the fragment keeps rejecting out of the replay queue"""
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO dead_letters
+                   (id, op_id, fragment, operation, payload, created_at, failed_at, failures, error)
+                   SELECT id, op_id, fragment, operation, payload, created_at, ?, failures, ?
+                   FROM journal WHERE id = ?""",
+                (datetime.now().isoformat(), str(error), entry["id"])
+            )
+            self._conn.execute("DELETE FROM journal WHERE id = ?", (entry["id"],))
+            self._conn.commit()
+
+    def dead_letter_count(self):
+        """Number of writes given up on after repeated rejections"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+
+    def dead_letter_entries(self, fragment=None):
+        """Dead-lettered writes (oldest first) with the error that last rejected them"""
+        with self._lock:
+            if fragment:
+                rows = self._conn.execute(
+                    "SELECT id, op_id, fragment, operation, payload, failures, error FROM dead_letters "
+                    "WHERE fragment = ? ORDER BY id", (fragment,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT id, op_id, fragment, operation, payload, failures, error FROM dead_letters ORDER BY id"
+                ).fetchall()
+        return [
+            {"id": row[0], "op_id": row[1], "fragment": row[2], "operation": row[3],
+             "payload": json_util.loads(row[4]), "failures": row[5], "error": row[6]}
+            for row in rows
+        ]
+
+    def _replay_one_by_one(self, fragment, entries, handler):
+        """Isolate the entry a batch failed on: replay singly until it fails again.
+
+        Returns (number applied, True if replay has to stop for this round: the
+        fragment is unreachable, or the failing entry has retries left).
+        """
+        replayed = 0
+        for entry in entries:
+            try:
+                handler(fragment, [entry])
+            except OFFLINE_ERRORS as e:
+                self._record_attempt([entry])
+                print(f"⏳ {fragment} still unreachable, {self.pending_count(fragment)} write(s) queued: {e}")
+                return replayed, True
+            except JournalConflict as e:
+                self._record_failure(entry, e)
+                self._dead_letter(entry, e)
+                print(f"❌ Dead-lettered journaled {entry['operation']} for {fragment}: {e}")
+                continue
+            except Exception as e:
+                failures = self._record_failure(entry, e)
+                if failures < self.max_failures:
+                    # Keep the queue order: later writes wait behind this one until it is retried or given up
+                    print(f"⚠️ {fragment} rejected journaled {entry['operation']} "
+                          f"({failures}/{self.max_failures}): {e}")
+                    return replayed, True
+                self._dead_letter(entry, e)
+                print(f"❌ Dead-lettered journaled {entry['operation']} for {fragment} "
+                      f"after {failures} rejections: {e}")
+                continue
+            self.acknowledge([entry])
+            replayed += 1
+        return replayed, False
+
+    def replay_pending(self, handler=None):
+        """Replay queued writes fragment by fragment in batches; returns number of writes applied.
+
+        The handler is called as handler(fragment, entries) and must apply the batch
+        in order, raising one of OFFLINE_ERRORS if the fragment is still unreachable.
+        Any other error means an entry was rejected: the batch is then replayed one
+        entry at a time to find it, and it is dead-lettered after max_failures tries.
+        """
+        handler = handler or self._replay_handler
+        if handler is None:
+            return 0
+
+        replayed = 0
+        for fragment in self.pending_fragments():
+            while True:
+                entries = self.pending_entries(fragment)
+                if not entries:
+                    break
+                try:
+                    handler(fragment, entries)
+                except OFFLINE_ERRORS as e:
+                    self._record_attempt(entries)
+                    print(f"⏳ {fragment} still unreachable, {self.pending_count(fragment)} write(s) queued: {e}")
+                    break
+                except Exception:
+                    applied, blocked = self._replay_one_by_one(fragment, entries, handler)
+                    replayed += applied
+                    if blocked:
+                        break
+                    continue
+                self.acknowledge(entries)
+                replayed += len(entries)
+
+            with self._lock:
+                if self.pending_count(fragment) == 0:
+                    self.offline_fragments.discard(fragment)
+                    print(f"✅ {fragment} back online, journal drained")
+
+        return replayed
+
+    def start_replayer(self, handler):
+        """Start the background thread that retries queued writes (no-op if already running)"""
+        with self._lock:
+            if self._replay_handler is None:
+                self._replay_handler = handler
+            if self._replayer and self._replayer.is_alive():
+                return
+            self._stop_event.clear()
+            self._replayer = threading.Thread(target=self._replay_loop, name="dems-journal-replayer", daemon=True)
+            self._replayer.start()
+
+    def _replay_loop(self):
+        while not self._stop_event.wait(self.replay_interval):
+            try:
+                self.replay_pending()
+            except Exception as e:
+                print(f"❌ Journal replay error: {e}")
+            if not self.pending_count() and not self.offline_fragments:
+                break
+
+    def stop_replayer(self):
+        """Stop the background replay thread"""
+        self._stop_event.set()
@@ -0,0 +1,229 @@
+"""Headless command line interface over DatabaseService for scripted batch jobs.
+
+    python -m dems import employees new_hires.csv
+    python -m dems export salaries salaries_2024.csv --from 2024-01-01 --to 2024-12-31
+    python -m dems payroll run --pay-date 2024-06-30
+    python -m dems leaves approve --all-pending --start-before 2024-07-01 --by hr-bot
+    python -m dems stats --rebuild
+    python -m dems rebuild-rollups
+    python -m dems indexes
+    python -m dems replicas --repair
+
+Every command writes one JSON object to stdout ({"ok": ..., "command": ...,
+"result": ...}); progress and diagnostics go to stderr. Exit codes are listed
+below so schedulers can tell failures apart.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2  # argparse's own exit code for bad arguments
+EXIT_UNAVAILABLE = 3  # could not connect to the database
+EXIT_PARTIAL = 4  # the job ran but some records failed
+EXIT_INCOMPLETE = 5  # some fragments did not answer, so the result covers only the others
+
+
+def read_rows(path, fmt=None):
+    """Dict rows from a CSV (with a header line) or JSONL file"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            return [{key: value for key, value in row.items() if value != ""} for row in csv.DictReader(f)]
+        if fmt == "jsonl":
+            return [json.loads(line) for line in f if line.strip()]
+    raise ValueError(f"Unsupported import format: {fmt or path}")
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def availability_code(unavailable, total):
+    """Exit code for a read that some (or all) fragments did not answer, or None if all did"""
+    if not unavailable:
+        return None
+    return EXIT_UNAVAILABLE if len(unavailable) >= total else EXIT_INCOMPLETE
+
+
+# Commands: each takes (service, args) and returns (exit code, result)
+def cmd_import_employees(service, args):
+    rows = read_rows(args.file, args.format)
+    report = service.import_employees(rows, batch_size=args.batch_size)
+    code = EXIT_PARTIAL if report["errors"] else EXIT_OK
+    return code, {"rows": len(rows), **report}
+
+
+def cmd_export(service, args):
+    if args.what == "employees":
+        ok, message = service.export_employees(args.path, args.format, args.department)
+    else:
+        ok, message = service.export_salary_history(args.path, args.format, args.emp_id, args.department,
+                                                    args.from_date, args.to_date)
+    return (EXIT_OK if ok else EXIT_FAILED), {"path": args.path, "message": message}
+
+
+def cmd_payroll_run(service, args):
+    report = service.run_payroll(args.pay_date, args.department, args.allowances, args.deductions)
+    return (EXIT_PARTIAL if report["errors"] else EXIT_OK), report
+
+
+def cmd_leaves_pending(service, args):
+    leaves = service.find_pending_leaves(args.department, args.start_before, args.leave_type)
+    code = availability_code(leaves.unavailable, len(service.db_manager.databases))
+    return code or EXIT_OK, {"count": len(leaves), "leaves": leaves, "unavailable": leaves.unavailable}
+
+
+def cmd_leaves_approve(service, args):
+    unavailable = []
+    if args.ids:
+        leave_ids = args.ids
+    else:
+        pending = service.find_pending_leaves(args.department, args.start_before, args.leave_type)
+        unavailable = pending.unavailable
+        if len(unavailable) >= len(service.db_manager.databases):
+            return EXIT_UNAVAILABLE, {"message": "No fragment answered the pending-leave lookup",
+                                      "unavailable": unavailable}
+        leave_ids = [leave["_id"] for leave in pending]
+    report = service.approve_leaves(leave_ids, args.by)
+    code = EXIT_OK if not report["failed"] else (EXIT_PARTIAL if report["approved"] else EXIT_FAILED)
+    if code == EXIT_OK and unavailable:
+        # Pending leaves on the unreachable fragments were never seen, let alone approved
+        code = EXIT_INCOMPLETE
+    return code, {"requested": len(leave_ids), **report, "unavailable": unavailable}
+
+
+def cmd_stats(service, args):
+    if args.rebuild and not service.rebuild_dashboard_stats():
+        return EXIT_FAILED, {"message": "Failed to rebuild dashboard stats"}
+    stats = service.get_dashboard_stats()
+    code = availability_code(stats.get("unavailable"), len(service.db_manager.databases))
+    return code or EXIT_OK, stats
+
+
+def cmd_rebuild_rollups(service, args):
+    ok = service.rebuild_payroll_rollups()
+    return (EXIT_OK if ok else EXIT_FAILED), {"rebuilt": ok}
+
+
+def cmd_indexes(service, args):
+    ok = service.ensure_indexes()
+    if ok and args.backfill:
+        service.backfill_leave_departments()
+    return (EXIT_OK if ok else EXIT_FAILED), {"indexes": ok}
+
+
+def cmd_replicas(service, args):
+    reports = service.check_replicas(repair=args.repair)
+    if not reports:
+        return EXIT_FAILED, {"message": "Replica check failed"}
+    consistent = all(report["consistent"] or report.get("repaired") for report in reports)
+    return (EXIT_OK if consistent else EXIT_FAILED), reports
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m dems", description="DEMS batch operations")
+    parser.add_argument("--pretty", action="store_true", help="indent the JSON output")
+    parser.add_argument("--profile", action="store_true", help="include query counts and timings in the output")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("import", help="bulk import records")
+    imports.add_argument("what", choices=["employees"])
+    imports.add_argument("file", help="CSV with a header line, or JSONL")
+    imports.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    imports.add_argument("--batch-size", type=int, default=1000)
+    imports.set_defaults(handler=cmd_import_employees)
+
+    export = commands.add_parser("export", help="stream employees or salary history to a file")
+    export.add_argument("what", choices=["employees", "salaries"])
+    export.add_argument("path")
+    export.add_argument("--format", choices=["csv", "jsonl", "xlsx"], help="default: from the file extension")
+    export.add_argument("--department")
+    export.add_argument("--emp-id", type=int, help="salaries only")
+    export.add_argument("--from", dest="from_date", type=parse_date, help="salaries only, YYYY-MM-DD")
+    export.add_argument("--to", dest="to_date", type=parse_date, help="salaries only, YYYY-MM-DD")
+    export.set_defaults(handler=cmd_export)
+
+    payroll = commands.add_parser("payroll", help="payroll runs")
+    payroll_commands = payroll.add_subparsers(dest="payroll_command", required=True)
+    run = payroll_commands.add_parser("run", help="pay every active employee for a month (skips those already paid)")
+    run.add_argument("--pay-date", type=parse_date, required=True, help="YYYY-MM-DD")
+    run.add_argument("--department")
+    run.add_argument("--allowances", type=float, default=0)
+    run.add_argument("--deductions", type=float, default=0)
+    run.set_defaults(handler=cmd_payroll_run)
+
+    leaves = commands.add_parser("leaves", help="leave requests")
+    leave_commands = leaves.add_subparsers(dest="leaves_command", required=True)
+    for name, handler, help_text in [("pending", cmd_leaves_pending, "list pending requests"),
+                                     ("approve", cmd_leaves_approve, "approve requests in bulk")]:
+        sub = leave_commands.add_parser(name, help=help_text)
+        sub.add_argument("--department")
+        sub.add_argument("--start-before", help="only leaves starting on or before YYYY-MM-DD")
+        sub.add_argument("--type", dest="leave_type")
+        sub.set_defaults(handler=handler)
+        if name == "approve":
+            target = sub.add_mutually_exclusive_group(required=True)
+            target.add_argument("--ids", nargs="+", help="leave _ids to approve")
+            target.add_argument("--all-pending", action="store_true", help="every pending leave matching the filters")
+            sub.add_argument("--by", default="cli", help="recorded as approved_by")
+
+    stats = commands.add_parser("stats", help="dashboard statistics")
+    stats.add_argument("--rebuild", action="store_true", help="recount from the collections first")
+    stats.set_defaults(handler=cmd_stats)
+
+    rollups = commands.add_parser("rebuild-rollups", help="recompute the payroll rollups from the salary records")
+    rollups.set_defaults(handler=cmd_rebuild_rollups)
+
+    indexes = commands.add_parser("indexes", help="create the service indexes in every fragment")
+    indexes.add_argument("--backfill", action="store_true", help="also backfill leave departments")
+    indexes.set_defaults(handler=cmd_indexes)
+
+    replicas = commands.add_parser("replicas", help="check users/departments replicas across fragments")
+    replicas.add_argument("--repair", action="store_true")
+    replicas.set_defaults(handler=cmd_replicas)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    command = " ".join(part for part in [args.command, getattr(args, "what", None),
+                                         getattr(args, "payroll_command", None),
+                                         getattr(args, "leaves_command", None)] if part)
+
+    profile = None
+    # Service chatter (connection banners, per-record errors) goes to stderr, keeping stdout parseable
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            from database.services import DatabaseService
+            service = DatabaseService()
+        except Exception as e:
+            code, result = EXIT_UNAVAILABLE, {"message": f"Database unavailable: {e}"}
+            service = None
+
+        if service is not None:
+            from database.instrumentation import get_query_monitor, track_service_calls
+            monitor = track_service_calls(service, get_query_monitor())
+            with monitor.action(f"cli {command}") as action:
+                try:
+                    code, result = args.handler(service, args)
+                except ConnectionFailure as e:
+                    code, result = EXIT_UNAVAILABLE, {"message": f"Database unavailable: {e}"}
+                except (OSError, ValueError, PyMongoError) as e:
+                    code, result = EXIT_FAILED, {"message": str(e)}
+            if args.profile and action is not None:
+                profile = action.summary()
+
+    output = {"ok": code == EXIT_OK, "command": command, "exit_code": code, "result": result}
+    if profile is not None:
+        output["profile"] = profile
+    json.dump(output, out, indent=2 if args.pretty else None, default=str)
+    out.write("\n")
+    return code
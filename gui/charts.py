@@ -0,0 +1,92 @@
+import tkinter as tk
+
+# Series colours, matching the dashboard card palette
+CHART_COLORS = ["#3b82f6", "#10b981", "#f59e0b", "#8b5cf6", "#ef4444", "#06b6d4", "#ec4899", "#84cc16"]
+
+MARGIN_LEFT = 60
+MARGIN_RIGHT = 15
+MARGIN_TOP = 35
+MARGIN_BOTTOM = 45
+
+
+def _format_amount(value):
+    if value >= 1_000_000:
+        return f"{value / 1_000_000:.1f}M"
+    if value >= 1_000:
+        return f"{value / 1_000:.1f}k"
+    return f"{value:g}"
+
+
+def _draw_axes(canvas, title, labels, max_value, width, height):
+    """Title, horizontal grid lines with value ticks, and (thinned) month labels"""
+    canvas.create_text(MARGIN_LEFT, 15, text=title, anchor="w", font=("Arial", 12, "bold"))
+    plot_height = height - MARGIN_TOP - MARGIN_BOTTOM
+    for step in range(5):
+        value = max_value * step / 4
+        y = height - MARGIN_BOTTOM - plot_height * step / 4
+        canvas.create_line(MARGIN_LEFT, y, width - MARGIN_RIGHT, y, fill="#e5e7eb")
+        canvas.create_text(MARGIN_LEFT - 6, y, text=_format_amount(value), anchor="e", font=("Arial", 8))
+
+    slot = (width - MARGIN_LEFT - MARGIN_RIGHT) / max(len(labels), 1)
+    every = max(1, int(len(labels) / ((width - MARGIN_LEFT) / 55)) + 1)
+    for index, label in enumerate(labels):
+        if index % every == 0:
+            x = MARGIN_LEFT + slot * (index + 0.5)
+            canvas.create_text(x, height - MARGIN_BOTTOM + 12, text=label, font=("Arial", 8))
+    return slot, plot_height
+
+
+def _draw_legend(canvas, names, width, height):
+    x = MARGIN_LEFT
+    for index, name in enumerate(names):
+        color = CHART_COLORS[index % len(CHART_COLORS)]
+        canvas.create_rectangle(x, height - 14, x + 10, height - 4, fill=color, outline="")
+        canvas.create_text(x + 14, height - 9, text=name, anchor="w", font=("Arial", 8))
+        x += 22 + 7 * len(str(name))
+        if x > width - 60:
+            break
+
+
+def line_chart(parent, title, labels, series, width=420, height=240):
+    """Canvas with one line per named series (series: {name: [values]})"""
+    canvas = tk.Canvas(parent, width=width, height=height, bg="white", highlightthickness=0)
+    max_value = max([max(values) for values in series.values() if values] + [1])
+    slot, plot_height = _draw_axes(canvas, title, labels, max_value, width, height)
+
+    for index, (name, values) in enumerate(series.items()):
+        points = []
+        for position, value in enumerate(values):
+            points.append(MARGIN_LEFT + slot * (position + 0.5))
+            points.append(height - MARGIN_BOTTOM - plot_height * value / max_value)
+        color = CHART_COLORS[index % len(CHART_COLORS)]
+        if len(points) >= 4:
+            canvas.create_line(*points, fill=color, width=2)
+        elif points:
+            canvas.create_oval(points[0] - 3, points[1] - 3, points[0] + 3, points[1] + 3, fill=color, outline="")
+
+    _draw_legend(canvas, list(series), width, height)
+    return canvas
+
+
+def stacked_bar_chart(parent, title, labels, series, width=420, height=240):
+    """Canvas with one bar per label, stacked by named series (series: {name: [values]})"""
+    canvas = tk.Canvas(parent, width=width, height=height, bg="white", highlightthickness=0)
+    totals = [sum(values) for values in zip(*series.values())] if series else []
+    max_value = max(totals + [1])
+    slot, plot_height = _draw_axes(canvas, title, labels, max_value, width, height)
+
+    bar_width = max(2, slot * 0.7)
+    for position in range(len(labels)):
+        x = MARGIN_LEFT + slot * (position + 0.5)
+        base = height - MARGIN_BOTTOM
+        for index, values in enumerate(series.values()):
+            bar_height = plot_height * values[position] / max_value
+            if bar_height > 0:
+                canvas.create_rectangle(
+                    x - bar_width / 2, base - bar_height, x + bar_width / 2, base,
+                    fill=CHART_COLORS[index % len(CHART_COLORS)], outline=""
+                )
+                base -= bar_height
+
+    _draw_legend(canvas, list(series), width, height)
+    return canvas
@@ -1,14 +1,36 @@
 import customtkinter as ctk
-from tkinter import messagebox, ttk
+from tkinter import messagebox, ttk, filedialog
 import tkinter as tk
+import threading
+import asyncio
+from concurrent.futures import Future
 from database.services import DatabaseService
+from database.async_connection import async_available
+from database.async_services import AsyncDatabaseService
+from utils.event_loop_thread import EventLoopThread
+from utils.leave_calendar import LeaveCalendar
+from gui.charts import line_chart, stacked_bar_chart
+from gui.perf_hud import PerfHUD
+from database.instrumentation import track_actions, track_service_calls
 from datetime import datetime
 
+# MainWindow methods whose queries are reported as one action by the query monitor
+ACTION_PREFIXES = ("show_", "refresh_", "load_", "filter_", "search_", "approve_", "reject_",
+                   "delete_", "add_", "edit_", "export_", "rebuild_", "clear_", "on_", "set_leave_filter")
+
 class MainWindow:
     def __init__(self, user):
         self.user = user
         self.db_service = DatabaseService()
+        self.leave_calendar = LeaveCalendar()
+        # Tag every query with the view/action that issued it (before buttons capture the methods)
+        self.query_monitor = track_actions(self, ACTION_PREFIXES)
+        track_service_calls(self.db_service, self.query_monitor)
+        # Multi-fragment reads are gathered concurrently on an event loop thread, started on first use
+        self.async_runner = None
+        self._async_service = None
         self.setup_window()
+        self.perf_hud = PerfHUD(self.root, self.query_monitor)
         self.create_widgets()
         self.show_dashboard()
         
@@ -25,6 +47,9 @@ class MainWindow:
             self.root.bind('<Control-n>', lambda e: self.show_add_employee_dialog())
             self.root.bind('<Control-N>', lambda e: self.show_add_employee_dialog())
         
+        # F12 toggles the performance overlay (also available in Settings)
+        self.root.bind('<F12>', lambda e: self.toggle_perf_hud())
+        
         # Center window
         self.root.update_idletasks()
         x = (self.root.winfo_screenwidth() // 2) - (1200 // 2)
@@ -109,6 +134,52 @@ class MainWindow:
             hover_color="darkred"
         )
         logout_btn.pack(side="bottom", pady=20, padx=15, fill="x")
+        
+        # Offline journal status (writes queued while the database is unreachable)
+        self.sync_status_label = ctk.CTkLabel(
+            self.sidebar,
+            text="",
+            font=ctk.CTkFont(size=11),
+            wraplength=210
+        )
+        self.sync_status_label.pack(side="bottom", pady=(0, 5), padx=15, fill="x")
+        self.update_sync_status()
+    
+    def update_sync_status(self):
+        """Refresh the queued-writes indicator and reschedule itself"""
+        pending = self.db_service.get_pending_write_count()
+        unavailable = self.db_service.fragment_health.unavailable_fragments()
+        if unavailable:
+            self.sync_status_label.configure(
+                text=f"🔌 {', '.join(unavailable)} unavailable" + (f", {pending} change(s) waiting to sync" if pending else ""),
+                text_color="#ef4444"
+            )
+        elif pending:
+            self.sync_status_label.configure(
+                text=f"⏳ Offline: {pending} change(s) waiting to sync",
+                text_color="#f59e0b"
+            )
+        else:
+            self.sync_status_label.configure(text="☁️ All changes synced", text_color="gray")
+        self.root.after(3000, self.update_sync_status)
+    
+    def update_partial_banner(self, unavailable):
+        """Warn at the top of the view when some fragments did not answer (results are partial)"""
+        banner = getattr(self, 'partial_banner', None)
+        if banner is not None and banner.winfo_exists():
+            banner.destroy()
+        self.partial_banner = None
+        if not unavailable:
+            return
+        self.partial_banner = ctk.CTkLabel(
+            self.content_frame,
+            text=f"⚠️ Partial results: {', '.join(unavailable)} unavailable - showing data from the other databases",
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#fef3c7",
+            text_color="#92400e",
+            corner_radius=6
+        )
+        self.partial_banner.place(relx=0.5, y=4, anchor="n")
     
     def clear_content(self):
         for widget in self.content_frame.winfo_children():
@@ -159,10 +230,29 @@ class MainWindow:
         )
         title.pack(pady=(30, 20))
         
+        # Counters are maintained on every write; recount only if they drift
+        ctk.CTkButton(
+            self.content_frame,
+            text="🔄 Recount Statistics",
+            command=self.rebuild_dashboard_stats,
+            height=30,
+            width=160,
+            fg_color="gray",
+            hover_color="darkgray"
+        ).place(relx=1.0, x=-20, y=30, anchor="ne")
+        
         stats = self.db_service.get_dashboard_stats()
+        self.update_partial_banner(stats.get('unavailable'))
+        
+        # Counters on the first tab; trend charts are only drawn when their tab is opened
+        tabview = ctk.CTkTabview(self.content_frame, command=lambda: self.on_dashboard_tab_change(tabview))
+        tabview.pack(fill="both", expand=True, padx=30, pady=(0, 20))
+        overview = tabview.add("Overview")
+        self.trends_tab = tabview.add("Trends")
+        self.trends_loaded = False
         
         # First row - Employee and Department stats
-        row1_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        row1_frame = ctk.CTkFrame(overview, fg_color="transparent")
         row1_frame.pack(pady=10, padx=40, fill="x")
         
         # Total Employees card
@@ -184,7 +274,7 @@ class MainWindow:
         ).pack(side="left", padx=10, fill="both", expand=True)
         
         # Second row - Leave statistics
-        row2_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        row2_frame = ctk.CTkFrame(overview, fg_color="transparent")
         row2_frame.pack(pady=10, padx=40, fill="x")
         
         # Leave Applied card
@@ -206,7 +296,7 @@ class MainWindow:
         ).pack(side="left", padx=10, fill="both", expand=True)
         
         # Third row - More leave statistics
-        row3_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        row3_frame = ctk.CTkFrame(overview, fg_color="transparent")
         row3_frame.pack(pady=10, padx=40, fill="x")
         
         # Leave Pending card
@@ -227,6 +317,67 @@ class MainWindow:
             "#ef4444"  # Red
         ).pack(side="left", padx=10, fill="both", expand=True)
     
+    def on_dashboard_tab_change(self, tabview):
+        if tabview.get() == "Trends" and not self.trends_loaded:
+            self.show_workforce_trends()
+    
+    def show_workforce_trends(self, months=None, refresh=False):
+        """Draw headcount, hires and payroll charts for the selected period"""
+        for widget in self.trends_tab.winfo_children():
+            widget.destroy()
+        self.trends_loaded = True
+        
+        period_names = {"Last 12 Months": 12, "Last 24 Months": 24, "Last 36 Months": 36, "Last 60 Months": 60}
+        months = months or getattr(self, 'trends_period', "Last 12 Months")
+        self.trends_period = months
+        
+        controls = ctk.CTkFrame(self.trends_tab, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=(5, 0))
+        
+        period_combo = ctk.CTkComboBox(
+            controls,
+            values=list(period_names),
+            height=30,
+            width=170,
+            command=lambda value: self.show_workforce_trends(value)
+        )
+        period_combo.set(months)
+        period_combo.pack(side="left")
+        
+        ctk.CTkButton(
+            controls,
+            text="🔄 Refresh",
+            command=lambda: self.show_workforce_trends(months, refresh=True),
+            height=30,
+            width=100
+        ).pack(side="left", padx=10)
+        
+        now = datetime.now()
+        end = (now.year, now.month)
+        start_index = now.year * 12 + now.month - period_names[months]
+        start = (start_index // 12, start_index % 12 + 1)
+        trends = self.db_service.get_workforce_trends(start, end, refresh=refresh)
+        if not trends:
+            ctk.CTkLabel(self.trends_tab, text="Trend data is unavailable").pack(pady=40)
+            return
+        
+        charts = tk.Frame(self.trends_tab, bg="white")
+        charts.pack(fill="both", expand=True, padx=10, pady=10)
+        for column in range(2):
+            charts.grid_columnconfigure(column, weight=1)
+        
+        line_chart(charts, "Headcount", trends['months'], {"All Departments": trends['totals']['headcount']}).grid(row=0, column=0, padx=5, pady=5)
+        stacked_bar_chart(charts, "Hires by Department", trends['months'], trends['hires']).grid(row=0, column=1, padx=5, pady=5)
+        stacked_bar_chart(charts, "Payroll Cost (net) by Department", trends['months'], trends['payroll']).grid(row=1, column=0, padx=5, pady=5)
+        line_chart(charts, "Headcount by Department", trends['months'], trends['headcount']).grid(row=1, column=1, padx=5, pady=5)
+    
+    def rebuild_dashboard_stats(self):
+        """Recount the dashboard counters from the underlying collections"""
+        if self.db_service.rebuild_dashboard_stats():
+            self.show_dashboard()
+        else:
+            messagebox.showerror("Error", "Failed to recount statistics")
+    
     def show_employee_dashboard(self):
         """Employee Dashboard with personal information and leave statistics"""
         # Title
@@ -364,6 +515,35 @@ class MainWindow:
             "Leave Rejected",
             "#ef4444"  # Red
         ).pack(side="left", padx=10, fill="both", expand=True)
+        
+        # Leave Balance Section (one cached balance document per employee)
+        ctk.CTkLabel(
+            self.content_frame,
+            text="🧾 Leave Balance (working days)",
+            font=ctk.CTkFont(size=20, weight="bold")
+        ).pack(pady=(20, 10))
+        
+        balance_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        balance_frame.pack(pady=10, padx=40, fill="x")
+        
+        balances = self.db_service.get_leave_balance(emp_id)
+        for leave_type, days in balances.items():
+            card = ctk.CTkFrame(balance_frame, fg_color="#64748b", corner_radius=10)
+            card.pack(side="left", padx=5, fill="both", expand=True)
+            
+            ctk.CTkLabel(
+                card,
+                text=f"{days:g}",
+                font=ctk.CTkFont(size=22, weight="bold"),
+                text_color="white"
+            ).pack(pady=(10, 0))
+            
+            ctk.CTkLabel(
+                card,
+                text=leave_type,
+                font=ctk.CTkFont(size=11),
+                text_color="white"
+            ).pack(pady=(0, 10))
     
     def show_employees(self):
         if self.user['role'] != 'admin':
@@ -400,6 +580,25 @@ class MainWindow:
         add_btn.pack(side="right", pady=15, padx=15)
         print("DEBUG: Add Employee button created and packed")
         
+        # Type-ahead search over name, email, position, department and ID
+        search_frame = ctk.CTkFrame(self.content_frame)
+        search_frame.pack(pady=(0, 10), padx=20, fill="x")
+        
+        ctk.CTkLabel(
+            search_frame,
+            text="🔍 Search:",
+            font=ctk.CTkFont(size=12, weight="bold")
+        ).pack(side="left", padx=(15, 10), pady=10)
+        
+        self.employee_search_entry = ctk.CTkEntry(
+            search_frame,
+            placeholder_text="Name, email, position, department or ID...",
+            height=35,
+            width=350
+        )
+        self.employee_search_entry.pack(side="left", padx=(0, 10), pady=10)
+        self.employee_search_entry.bind('<KeyRelease>', lambda e: self.refresh_employee_list())
+        
         # Employee list
         list_frame = ctk.CTkFrame(self.content_frame)
         list_frame.pack(pady=10, padx=20, fill="both", expand=True)
@@ -494,14 +693,28 @@ class MainWindow:
             hover_color="darkorange",
             font=ctk.CTkFont(size=11)
         ).pack(side="left", padx=5)
+        
+        ctk.CTkButton(
+            btn_frame,
+            text="⬇️ Export",
+            command=self.export_employee_list,
+            height=35
+        ).pack(side="right", padx=5)
     
     def refresh_employee_list(self):
         # Clear existing items
         for item in self.employee_tree.get_children():
             self.employee_tree.delete(item)
         
-        # Load employees from all databases
-        employees = self.db_service.get_all_employees()
+        # Ranked search results while a query is typed, otherwise all employees from all databases
+        search_query = self.employee_search_entry.get().strip() if hasattr(self, 'employee_search_entry') else ""
+        if search_query:
+            matches = self.db_service.search_employees(search_query, limit=50)
+            # The index holds only the searchable fields, so fetch the rows in one batch per fragment
+            employees = self.db_service.get_employees([m['emp_id'] for m in matches])
+        else:
+            employees = self.db_service.get_all_employees()
+        self.update_partial_banner(getattr(employees, 'unavailable', None))
         
         serial_number = 1
         for emp in employees:
@@ -703,51 +916,85 @@ class MainWindow:
         self.root.wait_window(dialog.dialog)
         self.refresh_departments()
     
-    def refresh_departments(self):
-        """Refresh the department list"""
-        # Clear existing items
-        for item in self.department_tree.get_children():
-            self.department_tree.delete(item)
-        
-        # Load all departments
-        departments = self.db_service.get_all_departments()
-        
-        serial_number = 1
-        for dept in departments:
-            # Get total members count for this department
-            total_members = self.db_service.get_department_member_count(dept['name'])
-            
-            self.department_tree.insert("", "end", values=(
-                serial_number,
-                dept['name'],
-                total_members
-            ), tags=(dept['dept_id'],))
-            serial_number += 1
+    @property
+    def async_service(self):
+        """AsyncDatabaseService on its own event loop thread (and connection pool), or None without an async client"""
+        if self._async_service is None and async_available():
+            self.async_runner = EventLoopThread()
+            self._async_service = self.async_runner.call(AsyncDatabaseService, None, self.db_service)
+        return self._async_service
     
-    def filter_departments(self):
-        """Filter departments based on search query"""
-        search_query = self.dept_search_entry.get().strip().lower()
+    def run_async(self, coro, on_done):
+        """Run an AsyncDatabaseService coroutine on the event loop thread; on_done(result) runs on the Tk thread"""
+        return self._deliver(self.async_runner.submit(coro), on_done)
+    
+    def run_in_background(self, fn, on_done):
+        """Run fn() on a worker thread; on_done(result) runs on the Tk thread"""
+        future = Future()
         
-        # Clear existing items
-        for item in self.department_tree.get_children():
-            self.department_tree.delete(item)
+        def worker():
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
         
-        # Load all departments
-        departments = self.db_service.get_all_departments()
+        threading.Thread(target=worker, daemon=True).start()
+        return self._deliver(future, on_done)
+    
+    def _deliver(self, future, on_done):
+        def deliver(_):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error in background query: {e}")
+                return
+            try:
+                self.root.after(0, lambda: on_done(result))
+            except (RuntimeError, tk.TclError):
+                pass  # Window closed while the query was running
         
-        # Filter departments
-        serial_number = 1
-        for dept in departments:
-            if search_query in dept['name'].lower():
-                # Get total members count for this department
-                total_members = self.db_service.get_department_member_count(dept['name'])
-                
+        future.add_done_callback(deliver)
+        return future
+    
+    async def _load_departments(self, search_query=""):
+        """Departments matching the query, with every member count gathered concurrently"""
+        departments = [dept for dept in await self.async_service.get_all_departments()
+                       if search_query in dept['name'].lower()]
+        counts = await asyncio.gather(*(self.async_service.get_department_member_count(dept['name'])
+                                        for dept in departments))
+        return list(zip(departments, counts))
+    
+    def _load_departments_sync(self, search_query=""):
+        """_load_departments on the sync service, for installs without an async MongoDB client"""
+        departments = [dept for dept in self.db_service.get_all_departments()
+                       if search_query in dept['name'].lower()]
+        return [(dept, self.db_service.get_department_member_count(dept['name'])) for dept in departments]
+    
+    def _populate_departments(self, search_query=""):
+        def fill(rows):
+            if not self.department_tree.winfo_exists():
+                return  # Navigated away before the counts arrived
+            for item in self.department_tree.get_children():
+                self.department_tree.delete(item)
+            for serial_number, (dept, total_members) in enumerate(rows, start=1):
                 self.department_tree.insert("", "end", values=(
                     serial_number,
                     dept['name'],
                     total_members
                 ), tags=(dept['dept_id'],))
-                serial_number += 1
+        
+        if self.async_service is not None:
+            self.run_async(self._load_departments(search_query), fill)
+        else:
+            self.run_in_background(lambda: self._load_departments_sync(search_query), fill)
+    
+    def refresh_departments(self):
+        """Refresh the department list"""
+        self._populate_departments()
+    
+    def filter_departments(self):
+        """Filter departments based on search query"""
+        self._populate_departments(self.dept_search_entry.get().strip().lower())
     
     def edit_department(self):
         """Edit selected department"""
@@ -813,16 +1060,16 @@ class MainWindow:
         search_filter_frame = ctk.CTkFrame(self.content_frame)
         search_filter_frame.pack(pady=(0, 10), padx=20, fill="x")
         
-        # Search by Emp ID
+        # Search by Emp ID, or fuzzy match on name/email/position/department
         ctk.CTkLabel(
             search_filter_frame,
-            text="🔍 Search by Emp ID:",
+            text="🔍 Search:",
             font=ctk.CTkFont(size=12, weight="bold")
         ).pack(side="left", padx=(15, 10), pady=10)
         
         self.leave_search_entry = ctk.CTkEntry(
             search_filter_frame,
-            placeholder_text="Enter Employee ID...",
+            placeholder_text="Employee ID or name...",
             height=35,
             width=200
         )
@@ -889,6 +1136,65 @@ class MainWindow:
             width=100
         ).pack(side="right", padx=15, pady=10)
         
+        # Who's out: leaves overlapping a date range, optionally for one department
+        range_frame = ctk.CTkFrame(self.content_frame)
+        range_frame.pack(pady=(0, 10), padx=20, fill="x")
+        
+        ctk.CTkLabel(
+            range_frame,
+            text="📅 Who's Out From:",
+            font=ctk.CTkFont(size=12, weight="bold")
+        ).pack(side="left", padx=(15, 10), pady=10)
+        
+        self.leave_range_start_entry = ctk.CTkEntry(
+            range_frame,
+            placeholder_text="YYYY-MM-DD",
+            height=35,
+            width=120
+        )
+        self.leave_range_start_entry.pack(side="left", padx=(0, 10), pady=10)
+        
+        ctk.CTkLabel(
+            range_frame,
+            text="To:",
+            font=ctk.CTkFont(size=12, weight="bold")
+        ).pack(side="left", padx=(0, 10), pady=10)
+        
+        self.leave_range_end_entry = ctk.CTkEntry(
+            range_frame,
+            placeholder_text="YYYY-MM-DD",
+            height=35,
+            width=120
+        )
+        self.leave_range_end_entry.pack(side="left", padx=(0, 10), pady=10)
+        
+        departments = self.db_service.get_all_departments()
+        self.leave_range_dept_combo = ctk.CTkComboBox(
+            range_frame,
+            values=["All Departments"] + [dept['name'] for dept in departments],
+            height=35,
+            width=170
+        )
+        self.leave_range_dept_combo.pack(side="left", padx=(0, 10), pady=10)
+        self.leave_range_dept_combo.set("All Departments")
+        
+        ctk.CTkButton(
+            range_frame,
+            text="Show",
+            command=self.refresh_leaves,
+            height=35,
+            width=80
+        ).pack(side="left", padx=2, pady=10)
+        
+        ctk.CTkButton(
+            range_frame,
+            text="Clear",
+            command=self.clear_leave_range,
+            height=35,
+            width=80,
+            fg_color="gray"
+        ).pack(side="left", padx=2, pady=10)
+        
         # Leave table frame
         list_frame = ctk.CTkFrame(self.content_frame)
         list_frame.pack(pady=10, padx=20, fill="both", expand=True)
@@ -1131,8 +1437,25 @@ class MainWindow:
         for item in self.leave_tree.get_children():
             self.leave_tree.delete(item)
         
-        # Load all leaves
-        leaves = self.db_service.get_all_leaves()
+        # Load leaves overlapping the who's-out range if one is set, otherwise all leaves
+        range_start = self.leave_range_start_entry.get().strip()
+        range_end = self.leave_range_end_entry.get().strip()
+        if range_start or range_end:
+            try:
+                datetime.strptime(range_start, "%Y-%m-%d")
+                datetime.strptime(range_end, "%Y-%m-%d")
+            except ValueError:
+                messagebox.showerror("Error", "Please enter both range dates in YYYY-MM-DD format")
+                return
+            department = self.leave_range_dept_combo.get()
+            leaves = self.db_service.get_leaves_in_range(
+                range_start,
+                range_end,
+                department=None if department == "All Departments" else department
+            )
+        else:
+            leaves = self.db_service.get_all_leaves()
+        self.update_partial_banner(getattr(leaves, 'unavailable', None))
         
         # Apply status filter
         if self.leave_filter_status != "All":
@@ -1140,19 +1463,26 @@ class MainWindow:
         
         # Apply search filter if any
         search_query = self.leave_search_entry.get().strip()
-        if search_query:
+        if search_query.isdigit():
             leaves = [l for l in leaves if str(l['emp_id']) == search_query]
+        elif search_query:
+            matched_ids = {m['emp_id'] for m in self.db_service.search_employees(search_query, limit=100)}
+            leaves = [l for l in leaves if l['emp_id'] in matched_ids]
+        
+        # Working days for every row in one vectorized call
+        leave_days = self.leave_calendar.working_days_for_leaves(leaves)
+        
+        # Employee details for every row in one query per fragment
+        employees = {employee['emp_id']: employee
+                     for employee in self.db_service.get_employees(dict.fromkeys(l['emp_id'] for l in leaves))}
         
         serial_number = 1
-        for leave in leaves:
-            # Get employee details
+        for leave, days in zip(leaves, leave_days):
             emp_id = leave['emp_id']
-            employee = self.db_service.get_employee(emp_id)
+            employee = employees.get(emp_id)
             emp_name = employee['name'] if employee else "Unknown"
-            department = employee['department'] if employee else "N/A"
-            
-            # Calculate days
-            days = self.calculate_leave_days(leave['start_date'], leave['end_date'])
+            # The department is denormalized onto the leave
+            department = leave.get('department') or (employee['department'] if employee else "N/A")
             
             self.leave_tree.insert("", "end", values=(
                 serial_number,
@@ -1160,7 +1490,7 @@ class MainWindow:
                 emp_name,
                 leave['leave_type'],
                 department,
-                days,
+                int(days),
                 leave['status']
             ), tags=(str(leave['_id']),))
             serial_number += 1
@@ -1176,22 +1506,17 @@ class MainWindow:
         """Filter leaves based on search query"""
         self.refresh_leaves()
     
+    def clear_leave_range(self):
+        """Clear the who's-out range and show all leaves again"""
+        self.leave_range_start_entry.delete(0, "end")
+        self.leave_range_end_entry.delete(0, "end")
+        self.leave_range_dept_combo.set("All Departments")
+        self.refresh_leaves()
+    
     def calculate_leave_days(self, start_date, end_date):
-        """Calculate number of days between two dates"""
+        """Calculate number of working days in a leave (weekends and holidays excluded)"""
         try:
-            from datetime import datetime
-            if isinstance(start_date, str):
-                start = datetime.strptime(start_date, "%Y-%m-%d")
-            else:
-                start = start_date
-            
-            if isinstance(end_date, str):
-                end = datetime.strptime(end_date, "%Y-%m-%d")
-            else:
-                end = end_date
-            
-            delta = end - start
-            return delta.days + 1  # +1 to include both start and end date
+            return self.leave_calendar.count(start_date, end_date)
         except Exception as e:
             print(f"Error calculating days: {e}")
             return 0
@@ -1763,11 +2088,22 @@ class MainWindow:
             filter_frame1,
             values=emp_options,
             height=35,
-            width=250
+            width=250,
+            command=self.filter_salary_history
         )
         self.history_emp_combo.set("All Employees")
         self.history_emp_combo.pack(side="left", padx=(0, 10), pady=10)
         
+        # Type-ahead: narrows the employee list to ranked matches as you type
+        self.history_emp_search = ctk.CTkEntry(
+            filter_frame1,
+            placeholder_text="🔍 Find employee...",
+            height=35,
+            width=180
+        )
+        self.history_emp_search.pack(side="left", padx=(0, 10), pady=10)
+        self.history_emp_search.bind('<KeyRelease>', lambda e: self.search_history_employees())
+        
         # Second filter row - Date range
         filter_frame2 = ctk.CTkFrame(self.content_frame)
         filter_frame2.pack(pady=(0, 10), padx=20, fill="x")
@@ -1839,6 +2175,24 @@ class MainWindow:
             hover_color="darkgray"
         ).pack(side="left", padx=5, pady=10)
         
+        # Refresh button (filters work on the loaded snapshot; this fetches new records)
+        ctk.CTkButton(
+            filter_frame2,
+            text="🔄 Refresh",
+            command=lambda: self.load_salary_history(refresh=True),
+            height=35,
+            width=100
+        ).pack(side="left", padx=5, pady=10)
+        
+        # Export button (streams the filtered history straight to a file)
+        ctk.CTkButton(
+            filter_frame2,
+            text="⬇️ Export",
+            command=self.export_salary_history,
+            height=35,
+            width=100
+        ).pack(side="right", padx=15, pady=10)
+        
         # Statistics frame
         stats_frame = ctk.CTkFrame(self.content_frame)
         stats_frame.pack(pady=10, padx=20, fill="x")
@@ -1964,7 +2318,7 @@ class MainWindow:
         scrollbar.pack(side="right", fill="y")
         
         # Load initial data
-        self.load_salary_history()
+        self.load_salary_history(refresh=True)
     
     def show_employee_salary_history(self):
         """Employee view for viewing own salary history"""
@@ -2402,6 +2756,25 @@ class MainWindow:
         
         self.history_emp_combo.configure(values=emp_options)
         self.history_emp_combo.set("All Employees")
+        self.load_salary_history()
+    
+    def search_history_employees(self):
+        """Narrow the history employee list to search matches (within the selected department)"""
+        query = self.history_emp_search.get().strip()
+        department = self.history_dept_combo.get()
+        if not query:
+            self.on_history_department_change(department)
+            return
+        
+        matches = self.db_service.search_employees(query, limit=20)
+        if department != "All Departments":
+            matches = [m for m in matches if m['department'] == department]
+        self.history_emp_combo.configure(values=["All Employees"] + [f"{m['emp_id']} - {m['name']}" for m in matches])
+        
+        # A single match is unambiguous, so select it right away
+        if len(matches) == 1:
+            self.history_emp_combo.set(f"{matches[0]['emp_id']} - {matches[0]['name']}")
+            self.load_salary_history()
     
     def show_history_date_picker(self, date_type):
         """Show a simple date picker dialog for From or To date"""
@@ -2523,122 +2896,126 @@ class MainWindow:
         self.history_emp_combo.set("All Employees")
         self.history_from_date.delete(0, 'end')
         self.history_to_date.delete(0, 'end')
-        # Reset employee list to all
+        self.history_emp_search.delete(0, 'end')
+        # Reset employee list to all (reloads the history)
         self.on_history_department_change("All Departments")
-        self.load_salary_history()
     
-    def load_salary_history(self):
-        """Load and display salary history"""
-        from datetime import datetime
+    def ask_export_path(self, title, default_name):
+        """Ask where to save an export; the extension picks the format"""
+        return filedialog.asksaveasfilename(
+            title=title,
+            initialfile=default_name,
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Excel Workbook", "*.xlsx")]
+        )
+    
+    def run_export(self, export_fn, *args, **kwargs):
+        """Run an export on a worker thread and report the result back on the Tk thread"""
+        def worker():
+            success, message = export_fn(*args, **kwargs)
+            if success:
+                self.root.after(0, lambda: messagebox.showinfo("Export Complete", message))
+            else:
+                self.root.after(0, lambda: messagebox.showerror("Export Failed", message))
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def export_salary_history(self):
+        """Export the salary history matching the active filters"""
+        emp_selection = self.history_emp_combo.get()
+        department = self.history_dept_combo.get()
+        from_date = self.history_from_date.get().strip() or None
+        to_date = self.history_to_date.get().strip() or None
+        
+        try:
+            for value in (from_date, to_date):
+                if value:
+                    datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            messagebox.showerror("Error", "Please use YYYY-MM-DD format for dates")
+            return
+        
+        path = self.ask_export_path("Export Salary History", "salary_history.csv")
+        if not path:
+            return
+        
+        emp_id = None if emp_selection == "All Employees" else int(emp_selection.split(" - ")[0])
+        self.run_export(
+            self.db_service.export_salary_history,
+            path,
+            emp_id=emp_id,
+            department=None if department == "All Departments" else department,
+            from_date=from_date,
+            to_date=to_date
+        )
+    
+    def export_employee_list(self):
+        """Export the full employee list"""
+        path = self.ask_export_path("Export Employees", "employees.csv")
+        if path:
+            self.run_export(self.db_service.export_employees, path)
+    
+    def load_salary_history(self, refresh=False):
+        """Load and display salary history (filtered in memory on the columnar snapshot).
         
+        Only opening the view or the Refresh button (refresh=True) goes to the database;
+        filter changes mask the snapshot already loaded.
+        """
         # Clear existing items
         for item in self.salary_history_tree.get_children():
             self.salary_history_tree.delete(item)
         
         # Get filter criteria
+        dept_selection = self.history_dept_combo.get()
         emp_selection = self.history_emp_combo.get()
         from_date = self.history_from_date.get().strip()
         to_date = self.history_to_date.get().strip()
         
-        # Determine which employees to get data for
-        if emp_selection == "All Employees":
-            # Get salary records from all databases
-            salary_records = self.db_service.get_all_salary_records()
-        else:
-            # Extract employee ID from selection
+        emp_id = None
+        if emp_selection != "All Employees":
             try:
                 emp_id = int(emp_selection.split(" - ")[0])
-                salary_records = self.db_service.get_employee_salaries(emp_id)
-            except:
-                salary_records = []
-        
-        # Filter by date range
-        filtered_records = []
-        for record in salary_records:
-            pay_date = record.get('pay_date')
-            
-            # Convert to datetime if it's a string
-            if isinstance(pay_date, str):
-                try:
-                    pay_date = datetime.strptime(pay_date, '%Y-%m-%d')
-                except:
-                    continue
-            
-            # Apply date filters
-            include = True
-            if from_date:
-                try:
-                    from_date_obj = datetime.strptime(from_date, '%Y-%m-%d')
-                    if pay_date < from_date_obj:
-                        include = False
-                except:
-                    pass
-            
-            if to_date and include:
-                try:
-                    to_date_obj = datetime.strptime(to_date, '%Y-%m-%d')
-                    if pay_date > to_date_obj:
-                        include = False
-                except:
-                    pass
-            
-            if include:
-                filtered_records.append(record)
+            except ValueError:
+                pass
         
-        # Calculate totals
-        total_basic = 0
-        total_allowances = 0
-        total_deductions = 0
-        total_net = 0
+        # Ignore malformed dates, as the filter always has
+        date_filters = []
+        for value in (from_date, to_date):
+            try:
+                date_filters.append(datetime.strptime(value, '%Y-%m-%d').date() if value else None)
+            except ValueError:
+                date_filters.append(None)
+        
+        # Mask-and-sum over the cached columns (a delta refresh only when asked for)
+        snapshot = self.db_service.get_salary_snapshot(refresh=refresh)
+        selected = snapshot.mask(
+            emp_id=emp_id,
+            department=None if dept_selection == "All Departments" else dept_selection,
+            from_date=date_filters[0],
+            to_date=date_filters[1]
+        )
+        totals = snapshot.totals(selected)
         
         # Display records
-        serial_number = 1
-        for record in filtered_records:
-            emp_id = record['emp_id']
-            employee = self.db_service.get_employee(emp_id)
-            emp_name = employee['name'] if employee else "Unknown"
-            department = employee['department'] if employee else "N/A"
-            
-            # Get salary details
-            basic_salary = record.get('base_salary', 0)
-            allowances = record.get('allowances', record.get('bonus', 0))
-            deductions = record.get('deductions', 0)
-            net_salary = record.get('net_salary', basic_salary + allowances - deductions)
-            
-            # Format pay date
-            pay_date = record.get('pay_date')
-            if isinstance(pay_date, str):
-                pay_date_str = pay_date
-            elif hasattr(pay_date, 'strftime'):
-                pay_date_str = pay_date.strftime('%Y-%m-%d')
-            else:
-                pay_date_str = "N/A"
-            
-            # Add to totals
-            total_basic += basic_salary
-            total_allowances += allowances
-            total_deductions += deductions
-            total_net += net_salary
-            
-            # Insert into tree
+        for serial_number, index in enumerate(snapshot.ordered_rows(selected), start=1):
+            row = snapshot.row(index)
             self.salary_history_tree.insert("", "end", values=(
                 serial_number,
-                emp_id,
-                emp_name,
-                department,
-                pay_date_str,
-                f"${basic_salary:,.2f}",
-                f"${allowances:,.2f}",
-                f"${deductions:,.2f}",
-                f"${net_salary:,.2f}"
+                row['emp_id'],
+                row['name'],
+                row['department'],
+                row['pay_date'],
+                f"${row['base_salary']:,.2f}",
+                f"${row['allowances']:,.2f}",
+                f"${row['deductions']:,.2f}",
+                f"${row['net_salary']:,.2f}"
             ))
-            serial_number += 1
         
         # Update statistics
-        self.total_paid_label.configure(text=f"${total_basic:,.2f}")
-        self.total_allowances_label.configure(text=f"${total_allowances:,.2f}")
-        self.total_deductions_label.configure(text=f"${total_deductions:,.2f}")
-        self.total_net_label.configure(text=f"${total_net:,.2f}")
+        self.total_paid_label.configure(text=f"${totals['base_salary']:,.2f}")
+        self.total_allowances_label.configure(text=f"${totals['allowances']:,.2f}")
+        self.total_deductions_label.configure(text=f"${totals['deductions']:,.2f}")
+        self.total_net_label.configure(text=f"${totals['net_salary']:,.2f}")
     
     def show_add_salary_dialog(self):
         dialog = SalaryDialog(self.root, self.db_service)
@@ -2765,6 +3142,34 @@ class MainWindow:
             font=ctk.CTkFont(size=11),
             text_color="lightgray"
         ).pack(pady=(0, 15))
+        
+        # Performance overlay toggle
+        perf_frame = ctk.CTkFrame(self.content_frame)
+        perf_frame.pack(pady=(0, 20), padx=40, fill="x")
+        
+        self.perf_hud_switch = ctk.CTkSwitch(
+            perf_frame,
+            text="⏱️ Show performance overlay (F12)",
+            command=self.toggle_perf_hud,
+            font=ctk.CTkFont(size=12)
+        )
+        self.perf_hud_switch.pack(side="left", padx=20, pady=15)
+        if self.perf_hud.visible:
+            self.perf_hud_switch.select()
+        
+        ctk.CTkLabel(
+            perf_frame,
+            text="Timings, queries and widget counts of the last screen, for attaching to slowness reports",
+            font=ctk.CTkFont(size=11),
+            text_color="gray"
+        ).pack(side="left", padx=(0, 20))
+    
+    def toggle_perf_hud(self):
+        self.perf_hud.toggle()
+        # Keep the Settings switch in step when the hotkey is used
+        switch = getattr(self, "perf_hud_switch", None)
+        if switch is not None and switch.winfo_exists():
+            switch.select() if self.perf_hud.visible else switch.deselect()
     
     def change_password(self):
         """Handle password change"""
@@ -2808,6 +3213,8 @@ class MainWindow:
     def logout(self):
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
             self.root.destroy()
+            if self.async_runner is not None:
+                self.async_runner.stop()
             from gui.login_window import LoginWindow
             login_app = LoginWindow()
             login_app.run()
@@ -3366,6 +3773,7 @@ class LeaveDialog:
     def __init__(self, parent, db_service, emp_id):
         self.db_service = db_service
         self.emp_id = emp_id
+        self.balances = db_service.get_leave_balance(emp_id)
         
         self.dialog = ctk.CTkToplevel(parent)
         self.dialog.title("Apply for Leave")
@@ -3396,8 +3804,17 @@ class LeaveDialog:
         # Leave type
         ctk.CTkLabel(main_frame, text="Leave Type", font=ctk.CTkFont(size=12)).pack(anchor="w", padx=20)
         leave_types = ["Sick Leave", "Vacation", "Personal", "Emergency", "Maternity/Paternity"]
-        self.leave_type_combo = ctk.CTkComboBox(main_frame, values=leave_types, height=35)
-        self.leave_type_combo.pack(fill="x", padx=20, pady=(5, 10))
+        self.leave_type_combo = ctk.CTkComboBox(
+            main_frame,
+            values=leave_types,
+            height=35,
+            command=self.update_balance_label
+        )
+        self.leave_type_combo.pack(fill="x", padx=20, pady=(5, 0))
+        
+        self.balance_label = ctk.CTkLabel(main_frame, text="", font=ctk.CTkFont(size=11), text_color="gray")
+        self.balance_label.pack(anchor="w", padx=20, pady=(0, 10))
+        self.update_balance_label(self.leave_type_combo.get())
         
         # Start date
         ctk.CTkLabel(main_frame, text="Start Date", font=ctk.CTkFont(size=12)).pack(anchor="w", padx=20)
@@ -3482,6 +3899,13 @@ class LeaveDialog:
         #     ustify="center"
         # ).pack(pady=10)
     
+    def update_balance_label(self, leave_type):
+        """Show the remaining balance for the selected leave type"""
+        if leave_type in self.balances:
+            self.balance_label.configure(text=f"Available balance: {self.balances[leave_type]:g} working day(s)")
+        else:
+            self.balance_label.configure(text="")
+    
     def show_date_picker(self, date_type):
         """Show calendar picker for start or end date"""
         from datetime import datetime
@@ -3610,6 +4034,26 @@ class LeaveDialog:
             messagebox.showerror("Error", "Please use YYYY-MM-DD format for dates")
             return
         
+        if end_date < start_date:
+            messagebox.showerror("Error", "End date cannot be before start date")
+            return
+        
+        overlapping = self.db_service.check_leave_overlap(self.emp_id, start_date, end_date)
+        if overlapping:
+            dates = "\n".join(f"• {l['start_date']} to {l['end_date']} ({l['leave_type']}, {l['status']})" for l in overlapping)
+            messagebox.showerror("Overlapping Leave", f"This request overlaps your existing leave(s):\n\n{dates}")
+            return
+        
+        # Warn (but allow) when the request exceeds the remaining balance
+        days = self.db_service.leave_calendar.count(start_date, end_date)
+        available = self.balances.get(leave_type)
+        if available is not None and days > available:
+            if not messagebox.askyesno(
+                "Insufficient Balance",
+                f"This leave is {days} working day(s) but only {available:g} remain for {leave_type}.\n\nSubmit anyway?"
+            ):
+                return
+        
         if self.db_service.apply_leave(self.emp_id, start_date, end_date, leave_type, reason):
             messagebox.showinfo("Success", "Leave application submitted successfully!")
             self.dialog.destroy()
@@ -0,0 +1,111 @@
+import customtkinter as ctk
+from tkinter import ttk
+
+# Actions that build or refresh a view; the HUD reports the most recent one
+VIEW_ACTION_PREFIXES = ("show_", "refresh_", "load_")
+
+_treeview_counter_installed = False
+
+
+def install_treeview_counter(monitor):
+    """Count ttk.Treeview rows inserted into the current action's "treeview_rows" counter"""
+    global _treeview_counter_installed
+    if _treeview_counter_installed:
+        return
+    original_insert = ttk.Treeview.insert
+
+    def insert(self, *args, **kwargs):
+        monitor.count("treeview_rows")
+        return original_insert(self, *args, **kwargs)
+
+    ttk.Treeview.insert = insert
+    _treeview_counter_installed = True
+
+
+def count_widgets(root):
+    """(CTk widgets, Tk widgets) alive under root, including open dialogs"""
+    ctk_widgets = 0
+    tk_widgets = 0
+    pending = [root]
+    while pending:
+        widget = pending.pop()
+        for child in widget.winfo_children():
+            tk_widgets += 1
+            if isinstance(child, ctk.CTkBaseClass):
+                ctk_widgets += 1
+            pending.append(child)
+    return ctk_widgets, tk_widgets
+
+
+class PerfHUD:
+    """Small overlay in the corner of the main window showing what the last view cost.
+
+    Shows the wall time of the last show_*/refresh_*/load_* action, how much of it
+    was spent inside DatabaseService (the rest is mostly Tk widget creation), the
+    queries it issued, the Treeview rows it inserted and the widgets alive now.
+    """
+
+    def __init__(self, root, monitor, poll_ms=500):
+        self.root = root
+        self.monitor = monitor
+        self.poll_ms = poll_ms
+        self.visible = False
+        self.frame = None
+        self._shown_action = None
+        install_treeview_counter(monitor)
+
+    def toggle(self):
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        if self.visible:
+            return
+        self.frame = ctk.CTkFrame(self.root, fg_color="#111827", corner_radius=8)
+        self.label = ctk.CTkLabel(
+            self.frame,
+            text="⏱️ Waiting for a view...",
+            font=ctk.CTkFont(family="Courier", size=11),
+            text_color="#e5e7eb",
+            justify="left",
+            anchor="w"
+        )
+        self.label.pack(padx=10, pady=8)
+        self.frame.place(relx=1.0, rely=1.0, anchor="se", x=-16, y=-16)
+        self.visible = True
+        self._shown_action = None
+        self._poll()
+
+    def hide(self):
+        self.visible = False
+        if self.frame is not None:
+            self.frame.destroy()
+            self.frame = None
+
+    def _poll(self):
+        if not self.visible:
+            return
+        stats = self.monitor.last_action(prefixes=VIEW_ACTION_PREFIXES)
+        if stats is not None and stats is not self._shown_action:
+            self._shown_action = stats
+            self.label.configure(text=self.describe(stats))
+        # Views are rebuilt under the overlay, so keep it on top
+        self.frame.lift()
+        self.root.after(self.poll_ms, self._poll)
+
+    def describe(self, stats):
+        ctk_widgets, tk_widgets = count_widgets(self.root)
+        wall = stats.wall_ms or 0.0
+        service = min(stats.service_ms, wall)
+        service_share = service / wall * 100 if wall else 0.0
+        return "\n".join([
+            f"⏱️ {stats.name}",
+            f"Wall time      {wall:9.1f} ms",
+            f"DatabaseService{service:9.1f} ms ({service_share:3.0f}%)",
+            f"  queries      {stats.queries:9d}    ({stats.db_ms:.1f} ms, {stats.reply_bytes / 1024:.0f} KB)",
+            f"Tk / widgets   {wall - service:9.1f} ms ({100 - service_share:3.0f}%)",
+            f"Treeview rows  {stats.counters.get('treeview_rows', 0):9d}",
+            f"CTk widgets    {ctk_widgets:9d}    ({tk_widgets} Tk)",
+        ])
@@ -1,8 +1,9 @@
 from datetime import datetime
 
 class Leave:
-    def __init__(self, emp_id, start_date, end_date, leave_type, reason):
+    def __init__(self, emp_id, start_date, end_date, leave_type, reason, department=None):
         self.emp_id = int(emp_id)
+        self.department = department
         self.start_date = start_date
         self.end_date = end_date
         self.leave_type = leave_type
@@ -15,6 +16,7 @@ class Leave:
     def to_dict(self):
         return {
             "emp_id": self.emp_id,
+            "department": self.department,
             "start_date": self.start_date,
             "end_date": self.end_date,
             "leave_type": self.leave_type,
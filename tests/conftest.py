@@ -0,0 +1,70 @@
+"""Shared fixtures: every test runs on the in-memory backend with fault injection, no MongoDB needed"""
+import os
+import sys
+import tempfile
+
+# DatabaseConfig reads the environment when it is first imported, so this has to come first
+os.environ["DEMS_BACKEND"] = "memory"
+os.environ["DEMS_FAULT_INJECTION"] = "1"
+os.environ["DEMS_QUERY_INSTRUMENTATION"] = "0"
+os.environ["DEMS_JOURNAL_PATH"] = os.path.join(tempfile.mkdtemp(prefix="dems-tests-"), "journal.sqlite3")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from datetime import datetime
+from config.database_config import DatabaseConfig
+from database.memory_backend import get_memory_client
+from database.fault_injection import get_fault_injector
+from database.fragment_health import get_fragment_health
+from database.write_journal import WriteJournal
+from database.services import DatabaseService
+
+
+@pytest.fixture
+def faults():
+    """The shared fault injector, with no rules before or after the test"""
+    injector = get_fault_injector()
+    injector.clear()
+    yield injector
+    injector.clear()
+
+
+@pytest.fixture
+def service(tmp_path, faults):
+    """A DatabaseService on empty fragments, with closed breakers and its own journal"""
+    client = get_memory_client()
+    for name in client.list_database_names():
+        client.drop_database(name)
+    get_fragment_health().breakers.clear()
+
+    service = DatabaseService()
+    service.journal = WriteJournal(str(tmp_path / "journal.sqlite3"))
+    yield service
+    service.journal.stop_replayer()
+    get_fragment_health().breakers.clear()
+
+
+def add_employee(service, emp_id, department="Engineering", salary=50000):
+    """Create an employee with placeholder personal details"""
+    created, message = service.create_employee(
+        emp_id, f"Employee {emp_id}", f"emp{emp_id}@example.com", "555-0100",
+        datetime(1990, 1, 1), department, "Engineer", salary
+    )
+    assert created, message
+
+
+def find_leave(service, emp_id, start_date):
+    """The stored leave of an employee starting on start_date"""
+    db = service.db_manager.get_database_for_employee(emp_id)
+    return db[DatabaseConfig.LEAVES_COLLECTION].find_one({"emp_id": emp_id, "start_date": start_date})
+
+
+def rollup_snapshot(service):
+    """Every fragment's rollup buckets, comparable across a rebuild"""
+    snapshot = {}
+    for fragment, db in service.db_manager.databases.items():
+        snapshot[fragment] = sorted(
+            repr(sorted((key, value) for key, value in bucket.items() if key != "_id"))
+            for bucket in db[DatabaseConfig.PAYROLL_ROLLUPS_COLLECTION].find()
+        )
+    return snapshot
@@ -0,0 +1,78 @@
+"""Circuit breakers and deadline-bounded cross-fragment reads"""
+import time
+from pymongo.errors import ServerSelectionTimeoutError
+from config.database_config import DatabaseConfig
+from database.fragment_health import CircuitBreaker, FragmentHealth, CLOSED, OPEN, HALF_OPEN
+from conftest import add_employee
+
+
+def test_breaker_opens_after_threshold_and_resets_after_probe():
+    breaker = CircuitBreaker("db2", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure("timeout")
+    assert breaker.status()["state"] == CLOSED and breaker.allow()
+    breaker.record_failure("timeout")
+    assert breaker.status()["state"] == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.status()["state"] == HALF_OPEN
+    breaker.record_success()
+    assert breaker.status() == {"state": CLOSED, "failures": 0, "last_error": None, "retry_in": None}
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker("db2", failure_threshold=3, reset_timeout=0)
+    for _ in range(3):
+        breaker.record_failure("timeout")
+    assert breaker.allow()
+    breaker.record_failure(ServerSelectionTimeoutError("still down"))
+    assert breaker.status()["state"] == OPEN
+
+
+def test_down_fragment_is_reported_then_skipped(service, faults):
+    for emp_id in (10, 1010, 2010):
+        add_employee(service, emp_id)
+    health = FragmentHealth(deadline_ms=200, failure_threshold=2, reset_timeout=60)
+    service.fragment_health = health
+    faults.take_down("db2")
+
+    for _ in range(2):
+        employees = service.get_all_employees()
+        assert [employee["emp_id"] for employee in employees] == [10, 2010]
+        assert employees.unavailable == ["db2"]
+    assert health.unavailable_fragments() == ["db2"]
+
+    # Open breaker: db2 is not even tried, so bringing it back changes nothing until the cool-down
+    faults.bring_up("db2")
+    assert service.get_all_employees().unavailable == ["db2"]
+    health.breakers["db2"].reset_timeout = 0
+    assert [employee["emp_id"] for employee in service.get_all_employees()] == [10, 1010, 2010]
+    assert health.status()["db2"]["state"] == CLOSED
+
+
+def test_slow_cursor_drain_does_not_trip_the_breaker(service, faults):
+    db = service.db_manager.databases["db2"]
+    db[DatabaseConfig.EMPLOYEES_COLLECTION].insert_many([{"emp_id": 1001 + n} for n in range(150)])
+    health = FragmentHealth(deadline_ms=100, failure_threshold=1, reset_timeout=60)
+    # Only the getMore after the first batch is slow, and slower than the whole deadline
+    faults.add_rule("db2", "getMore", latency_ms=200)
+
+    results, unavailable = health.read_all(
+        {"db2": db}, lambda db: db[DatabaseConfig.EMPLOYEES_COLLECTION].find(), drain=True
+    )
+    assert unavailable == []
+    assert len(results["db2"]) == 150
+    assert health.status()["db2"]["state"] == CLOSED
+
+
+def test_slow_first_reply_trips_the_breaker(service, faults):
+    db = service.db_manager.databases["db2"]
+    health = FragmentHealth(deadline_ms=50, failure_threshold=1, reset_timeout=60)
+    faults.add_rule("db2", "find", latency_ms=200)
+
+    results, unavailable = health.read_all(
+        {"db2": db}, lambda db: db[DatabaseConfig.EMPLOYEES_COLLECTION].find(), drain=True
+    )
+    assert results == {} and unavailable == ["db2"]
+    assert health.status()["db2"]["state"] == OPEN
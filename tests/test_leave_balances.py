@@ -0,0 +1,58 @@
+"""Leave balance bookkeeping: entitlements, approval debits and reversal credits"""
+from datetime import datetime
+from config.leave_config import LeaveConfig
+from conftest import add_employee, find_leave
+
+EMP_ID = 10
+# Monday 2031-07-07 to Tuesday 2031-07-15 spans one weekend: 5 + 2 working days
+START, END = datetime(2031, 7, 7), datetime(2031, 7, 15)
+WORKING_DAYS = 7
+
+
+def ledger_kinds(service):
+    return sorted((entry["kind"], entry["leave_type"], entry["days"]) for entry in service.get_leave_ledger(EMP_ID)
+                  if entry["kind"] != "accrual")
+
+
+def test_new_employee_gets_annual_entitlements(service):
+    add_employee(service, EMP_ID)
+    assert service.get_leave_balance(EMP_ID) == LeaveConfig.ENTITLEMENTS
+    accruals = [entry for entry in service.get_leave_ledger(EMP_ID) if entry["kind"] == "accrual"]
+    assert len(accruals) == len(LeaveConfig.ENTITLEMENTS)
+
+
+def test_approve_debits_working_days_and_reject_credits_them_back(service):
+    add_employee(service, EMP_ID)
+    assert service.apply_leave(EMP_ID, START, END, "Vacation", "")
+    leave_id = find_leave(service, EMP_ID, START)["_id"]
+    entitlement = LeaveConfig.ENTITLEMENTS["Vacation"]
+
+    # Applying alone does not touch the balance
+    assert service.get_leave_balance(EMP_ID)["Vacation"] == entitlement
+
+    assert service.approve_leave(leave_id, "admin")
+    assert service.get_leave_balance(EMP_ID)["Vacation"] == entitlement - WORKING_DAYS
+    assert ledger_kinds(service) == [("approval", "Vacation", -WORKING_DAYS)]
+
+    # Approving twice posts nothing more
+    assert service.approve_leave(leave_id, "admin")
+    assert service.get_leave_balance(EMP_ID)["Vacation"] == entitlement - WORKING_DAYS
+
+    assert service.reject_leave(leave_id, "admin")
+    assert service.get_leave_balance(EMP_ID)["Vacation"] == entitlement
+    assert ledger_kinds(service) == [("approval", "Vacation", -WORKING_DAYS), ("reversal", "Vacation", WORKING_DAYS)]
+
+
+def test_rejecting_a_pending_leave_leaves_the_balance_alone(service):
+    add_employee(service, EMP_ID)
+    assert service.apply_leave(EMP_ID, START, END, "Sick Leave", "")
+    assert service.reject_leave(find_leave(service, EMP_ID, START)["_id"], "admin")
+    assert service.get_leave_balance(EMP_ID) == LeaveConfig.ENTITLEMENTS
+    assert ledger_kinds(service) == []
+
+
+def test_accrual_adjusts_the_balance(service):
+    add_employee(service, EMP_ID)
+    assert service.accrue_leave(EMP_ID, "Personal", 2, "Carry-over")
+    assert service.accrue_leave(EMP_ID, "Personal", -1, "Correction")
+    assert service.get_leave_balance(EMP_ID)["Personal"] == LeaveConfig.ENTITLEMENTS["Personal"] + 1
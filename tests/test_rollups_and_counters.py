@@ -0,0 +1,77 @@
+"""Payroll rollups and dashboard counters kept by the write paths must match a full recount"""
+from datetime import datetime
+from conftest import add_employee, find_leave, rollup_snapshot
+
+DASHBOARD_FIELDS = ("total_employees", "leave_applied", "leave_pending", "leave_approved", "leave_rejected",
+                    "db_distribution")
+
+
+def dashboard_counters(service):
+    stats = service.get_dashboard_stats()
+    return {field: stats[field] for field in DASHBOARD_FIELDS}
+
+
+def test_rollups_match_rebuild_after_salary_writes(service):
+    for emp_id, department in ((10, "Engineering"), (1010, "Sales"), (2010, "Engineering")):
+        add_employee(service, emp_id, department)
+    assert service.add_salary_record(10, "March", 2031, 5000, 500, 250)
+    assert service.add_salary_record(1010, "mar", "2031", 4000)
+    assert service.add_salary_record_with_date(2010, "2031-03-31", 4500, 100, 50)
+    assert service.add_salary_record_with_date(10, "2031-04-30", 5000)
+    report = service.run_payroll("2031-05-31")
+    assert report["paid"] == 3 and not report["errors"]
+
+    live = rollup_snapshot(service)
+    assert service.rebuild_payroll_rollups()
+    assert live == rollup_snapshot(service)
+
+    summary = service.get_department_payroll_summary(year=2031, month=3)
+    assert summary["Engineering"]["records"] == 2
+    assert summary["Engineering"]["net_salary"] == 5250 + 4550
+    assert service.get_employee_payroll_summary(10, year=2031)["records"] == 3
+
+
+def test_invalid_month_leaves_no_salary_record(service):
+    add_employee(service, 10)
+    assert not service.add_salary_record(10, "Smarch", 2031, 5000)
+    assert not service.add_salary_record(10, 13, 2031, 5000)
+    assert service.get_employee_salaries(10) == []
+    assert rollup_snapshot(service)["db1"] == []
+
+
+def test_backfill_builds_only_missing_rollups(service):
+    add_employee(service, 10)
+    add_employee(service, 1010)
+    service.add_salary_record(10, "June", 2031, 3000)
+    service.add_salary_record(1010, "June", 2031, 3000)
+    expected = rollup_snapshot(service)
+
+    # db2's rollups predate the marker a full rebuild writes; db1 has one
+    service._rebuild_fragment_payroll_rollups(service.db_manager.databases["db1"])
+    service.db_manager.databases["db2"]["payroll_rollups"].delete_many({})
+    assert service.backfill_payroll_rollups()
+    assert rollup_snapshot(service) == expected
+
+
+def test_counters_match_rebuild_after_adds_and_deletes(service):
+    service.rebuild_dashboard_stats()
+    for emp_id in (10, 11, 1010, 2010):
+        add_employee(service, emp_id)
+    assert service.delete_employee(11)
+    assert not service.delete_employee(11)
+    assert not service.create_employee(10, "Dup", "dup@example.com", "", datetime(1990, 1, 1), "Sales", "Rep", 1)[0]
+
+    for emp_id in (10, 1010, 2010):
+        assert service.apply_leave(emp_id, datetime(2031, 7, 7), datetime(2031, 7, 8), "Personal", "")
+    assert not service.apply_leave(10, datetime(2031, 7, 8), datetime(2031, 7, 9), "Personal", "")
+    service.approve_leave(find_leave(service, 10, datetime(2031, 7, 7))["_id"], "admin")
+    service.approve_leave(find_leave(service, 1010, datetime(2031, 7, 7))["_id"], "admin")
+    service.reject_leave(find_leave(service, 1010, datetime(2031, 7, 7))["_id"], "admin")
+    service.reject_leave(find_leave(service, 2010, datetime(2031, 7, 7))["_id"], "admin")
+
+    live = dashboard_counters(service)
+    assert live["total_employees"] == 3
+    assert live["db_distribution"] == {"db1": 1, "db2": 1, "db3": 1}
+    assert (live["leave_applied"], live["leave_pending"], live["leave_approved"], live["leave_rejected"]) == (3, 0, 1, 2)
+    assert service.rebuild_dashboard_stats()
+    assert dashboard_counters(service) == live
@@ -0,0 +1,122 @@
+"""Offline write journal: queueing while a fragment is down, replay, conflicts and interrupted replays"""
+from datetime import datetime
+from pymongo.errors import AutoReconnect, OperationFailure
+from config.database_config import DatabaseConfig
+from database.memory_backend import MemoryCollection
+from database.write_journal import WriteJournal
+from conftest import add_employee, find_leave, rollup_snapshot
+
+EMP_ID = 1500  # db2
+
+
+def replay(service):
+    return service.journal.replay_pending(service._replay_journal_batch)
+
+
+def test_writes_queued_while_down_are_replayed(service, faults):
+    add_employee(service, EMP_ID)
+    faults.take_down("db2")
+    assert service.add_salary_record_with_date(EMP_ID, "2031-03-31", 4000, 200, 100)
+    assert service.apply_leave(EMP_ID, datetime(2031, 4, 7), datetime(2031, 4, 9), "Vacation", "Trip")
+    assert service.update_employee(EMP_ID, {"position": "Lead"})
+    assert service.journal.pending_count("db2") == 3
+    assert service.journal.is_offline("db2")
+
+    # Still down: nothing is applied and nothing is lost
+    assert replay(service) == 0
+    assert service.journal.pending_count("db2") == 3
+
+    faults.bring_up("db2")
+    assert replay(service) == 3
+    assert not service.journal.is_offline("db2")
+    assert service.get_employee(EMP_ID)["position"] == "Lead"
+    assert len(service.get_employee_salaries(EMP_ID)) == 1
+    assert find_leave(service, EMP_ID, datetime(2031, 4, 7))["status"] == "Pending"
+
+    live = rollup_snapshot(service)
+    service.rebuild_payroll_rollups()
+    assert live == rollup_snapshot(service)
+
+
+def test_leave_overlapping_a_queued_leave_is_rejected(service, faults):
+    add_employee(service, EMP_ID)
+    faults.take_down("db2")
+    assert service.apply_leave(EMP_ID, datetime(2031, 5, 5), datetime(2031, 5, 9), "Vacation", "")
+    assert not service.apply_leave(EMP_ID, datetime(2031, 5, 8), datetime(2031, 5, 12), "Personal", "")
+    assert service.journal.pending_count("db2") == 1
+
+
+def test_leave_overlapping_one_stored_meanwhile_is_dead_lettered(service, faults):
+    add_employee(service, EMP_ID)
+    add_employee(service, EMP_ID + 1)
+    faults.take_down("db2")
+    assert service.apply_leave(EMP_ID, datetime(2031, 6, 2), datetime(2031, 6, 6), "Vacation", "Queued")
+    assert service.apply_leave(EMP_ID + 1, datetime(2031, 6, 2), datetime(2031, 6, 6), "Vacation", "Queued")
+    faults.bring_up("db2")
+
+    # Another instance (no journal of its own) stored an overlapping leave while this one was offline
+    db = service.db_manager.databases["db2"]
+    service._insert_leave(db, {"_id": "stored", "emp_id": EMP_ID, "start_date": datetime(2031, 6, 4),
+                               "end_date": datetime(2031, 6, 10), "leave_type": "Personal", "status": "Pending"})
+    service.rebuild_dashboard_stats()
+
+    assert replay(service) == 1
+    assert service.journal.pending_count() == 0
+    [dead] = service.journal.dead_letter_entries("db2")
+    assert dead["operation"] == "apply_leave"
+    assert dead["payload"]["document"]["emp_id"] == EMP_ID
+    assert db[DatabaseConfig.LEAVES_COLLECTION].count_documents({"emp_id": EMP_ID}) == 1
+
+    # Only the replayed leave is counted
+    stats = service.get_dashboard_stats()
+    assert stats["leave_applied"] == 2
+    assert stats["leave_pending"] == 2
+
+
+def test_interrupted_replay_keeps_rollups_consistent(service, faults, monkeypatch):
+    emp_ids = list(range(EMP_ID, EMP_ID + 5))
+    for emp_id in emp_ids:
+        add_employee(service, emp_id)
+    faults.take_down("db2")
+    for emp_id in emp_ids:
+        assert service.add_salary_record_with_date(emp_id, "2031-03-31", 1000, 10, 5)
+    faults.bring_up("db2")
+
+    # The connection drops after part of the batch reached the fragment
+    bulk_write = MemoryCollection.bulk_write
+
+    def cut(self, requests, ordered=True, **kwargs):
+        monkeypatch.setattr(MemoryCollection, "bulk_write", bulk_write)
+        bulk_write(self, requests[:2], ordered=ordered, **kwargs)
+        raise AutoReconnect("connection dropped mid-write")
+
+    monkeypatch.setattr(MemoryCollection, "bulk_write", cut)
+    assert replay(service) == 0
+    assert replay(service) == len(emp_ids)
+
+    assert sum(len(service.get_employee_salaries(emp_id)) for emp_id in emp_ids) == len(emp_ids)
+    live = rollup_snapshot(service)
+    service.rebuild_payroll_rollups()
+    assert live == rollup_snapshot(service)
+
+
+def test_rejected_entry_is_dead_lettered_and_the_queue_drains(tmp_path):
+    journal = WriteJournal(str(tmp_path / "journal.sqlite3"), batch_size=10, max_failures=3)
+    for n in range(5):
+        journal.enqueue("db2", "update_employee", {"n": n})
+    applied = []
+
+    def handler(fragment, entries):
+        if any(entry["payload"]["n"] == 2 for entry in entries):
+            raise OperationFailure("bad payload")
+        applied.extend(entry["payload"]["n"] for entry in entries)
+
+    # Entries behind the rejected one wait until it has been given up on
+    for _ in range(3):
+        journal.replay_pending(handler)
+    assert applied == [0, 1, 3, 4]
+    assert journal.pending_count() == 0
+    assert not journal.is_offline("db2")
+    [dead] = journal.dead_letter_entries()
+    assert dead["payload"] == {"n": 2}
+    assert dead["failures"] == 3
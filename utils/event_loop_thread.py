@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+
+class EventLoopThread:
+    """An asyncio event loop running on its own daemon thread.
+
+    Tk owns the main thread, so coroutines (e.g. AsyncDatabaseService calls) are
+    submitted here from the GUI and their results handed back with root.after.
+    """
+
+    def __init__(self, name="dems-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the loop thread and wait for its result (for loop-bound setup)"""
+        async def run():
+            return fn(*args)
+        return self.submit(run()).result()
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
@@ -0,0 +1,75 @@
+import numpy as np
+from datetime import date, datetime
+from functools import lru_cache
+from config.leave_config import LeaveConfig
+
+NAT = np.datetime64('NaT', 'D')
+
+
+def load_configured_holidays():
+    """Read the holiday calendar from LeaveConfig (inline list and/or file)"""
+    holidays = [h.strip() for h in LeaveConfig.HOLIDAYS.split(',') if h.strip()]
+    if LeaveConfig.HOLIDAYS_FILE:
+        try:
+            with open(LeaveConfig.HOLIDAYS_FILE, encoding='utf-8') as f:
+                holidays.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+        except OSError as e:
+            print(f"⚠️ Could not read holiday file {LeaveConfig.HOLIDAYS_FILE}: {e}")
+    return holidays
+
+
+@lru_cache(maxsize=8192)
+def _parse_date_string(value):
+    """Parse a YYYY-MM-DD string once; repeated dates hit the cache"""
+    try:
+        return np.datetime64(value.strip()[:10], 'D')
+    except ValueError:
+        return NAT
+
+
+def to_datetime64(value):
+    """Convert a stored leave date (string, date or datetime) to datetime64[D]"""
+    if isinstance(value, str):
+        return _parse_date_string(value)
+    if isinstance(value, datetime):
+        return np.datetime64(value.date(), 'D')
+    if isinstance(value, date):
+        return np.datetime64(value, 'D')
+    return NAT
+
+
+class LeaveCalendar:
+    """Working-day calculator for leave durations.
+
+    Durations are inclusive of both the start and end date and exclude weekends
+    (per the weekmask) and configured holidays. Whole batches of (start, end)
+    pairs are counted in one vectorized np.busday_count call.
+    """
+
+    def __init__(self, weekmask=None, holidays=None):
+        self.weekmask = weekmask or LeaveConfig.WEEKMASK
+        if holidays is None:
+            holidays = load_configured_holidays()
+        holiday_dates = [to_datetime64(h) for h in holidays]
+        self.holidays = np.array(sorted(h for h in holiday_dates if not np.isnat(h)), dtype='datetime64[D]')
+        self.busdaycal = np.busdaycalendar(weekmask=self.weekmask, holidays=self.holidays)
+
+    def working_days(self, starts, ends):
+        """Working days for each (start, end) pair as an int64 array (0 for invalid or reversed ranges)"""
+        start_dates = np.array([to_datetime64(v) for v in starts], dtype='datetime64[D]')
+        end_dates = np.array([to_datetime64(v) for v in ends], dtype='datetime64[D]')
+        days = np.zeros(len(start_dates), dtype=np.int64)
+        
+        valid = ~(np.isnat(start_dates) | np.isnat(end_dates))
+        if valid.any():
+            # busday_count excludes the end date, so count up to the day after
+            days[valid] = np.busday_count(start_dates[valid], end_dates[valid] + 1, busdaycal=self.busdaycal)
+        return np.maximum(days, 0)
+
+    def working_days_for_leaves(self, leaves):
+        """Working days for a list of leave documents, in the same order"""
+        return self.working_days([l.get('start_date') for l in leaves], [l.get('end_date') for l in leaves])
+
+    def count(self, start_date, end_date):
+        """Working days for a single leave"""
+        return int(self.working_days([start_date], [end_date])[0])
\ No newline at end of file
@@ -0,0 +1,112 @@
+import re
+import threading
+from collections import defaultdict
+
+_TOKEN_RE = re.compile(r"[\w@.+-]+")
+
+
+def _normalize(text):
+    return " ".join(_TOKEN_RE.findall(str(text).lower()))
+
+
+def _trigrams(text, closed=True):
+    """Trigrams of every token, padded at the start so short prefixes still match.
+
+    closed=False leaves the end of the last token unpadded, which is what a
+    query wants: "ali" must match "alice" as a prefix, not only "ali".
+    """
+    grams = set()
+    tokens = _normalize(text).split()
+    for position, token in enumerate(tokens):
+        is_last = position == len(tokens) - 1
+        padded = "  " + token + (" " if closed or not is_last else "")
+        for start in range(len(padded) - 2):
+            grams.add(padded[start:start + 3])
+    return grams
+
+
+class TrigramIndex:
+    """In-memory trigram index for fuzzy, type-ahead search.
+
+    Each document is a dict of text fields; every field is split into padded
+    trigrams that point back to the document key. A query scores candidates by
+    the share of its trigrams they contain, so prefixes and small typos still
+    rank, and exact/prefix hits on the primary field are boosted to the top.
+    """
+
+    def __init__(self, fields, primary_field=None, min_score=0.5):
+        self.fields = fields
+        self.primary_field = primary_field or fields[0]
+        self.min_score = min_score
+        self.documents = {}
+        self._postings = defaultdict(set)
+        self._doc_grams = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, key, document):
+        """Index (or re-index) one document under key"""
+        with self._lock:
+            self.remove(key)
+            grams = set()
+            for field in self.fields:
+                value = document.get(field)
+                if value:
+                    grams |= _trigrams(value)
+            for gram in grams:
+                self._postings[gram].add(key)
+            self._doc_grams[key] = grams
+            self.documents[key] = {field: document.get(field) for field in self.fields}
+
+    def update(self, key, changes):
+        """Re-index a document after some of its fields changed"""
+        with self._lock:
+            document = dict(self.documents.get(key, {}))
+            document.update({field: value for field, value in changes.items() if field in self.fields})
+            self.add(key, document)
+
+    def remove(self, key):
+        with self._lock:
+            for gram in self._doc_grams.pop(key, ()):
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(key)
+                    if not postings:
+                        del self._postings[gram]
+            self.documents.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.documents.clear()
+            self._postings.clear()
+            self._doc_grams.clear()
+
+    def search(self, query, limit=20):
+        """Keys of the best matching documents, best first"""
+        normalized = _normalize(query)
+        if not normalized:
+            return []
+        query_grams = _trigrams(normalized, closed=False)
+
+        with self._lock:
+            hits = defaultdict(int)
+            for gram in query_grams:
+                for key in self._postings.get(gram, ()):
+                    hits[key] += 1
+
+            ranked = []
+            for key, count in hits.items():
+                score = count / len(query_grams)
+                if score < self.min_score:
+                    continue
+                primary = _normalize(self.documents[key].get(self.primary_field) or "")
+                if primary == normalized:
+                    score += 2
+                elif f" {normalized}" in f" {primary}":
+                    score += 1
+                ranked.append((score, key))
+
+        ranked.sort(key=lambda item: (-item[0], str(item[1])))
+        return [key for _, key in ranked[:limit]]